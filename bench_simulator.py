@@ -0,0 +1,886 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator Benchmarks
+Measures engine CPU usage and timing accuracy of the simulator
+"""
+
+import argparse
+import bisect
+import http.client
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+from array import array
+
+import frame_rate_estimator
+import metrics
+import simulator_fleet
+import simulator_web
+import status_bin
+import trace_file
+import vcd_export
+import vsync_sources
+from call_recorder import record_calls, record_fires
+
+
+def percentile(values, fraction):
+    """Get a percentile from a list of numbers (nearest rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench_engine(seconds, fast_enabled):
+    """Measure CPU usage and frame-flip timing error of the real-time engine"""
+    sim = simulator_web.LEDTesterSimulator()
+    sim.update_fast_circle(enabled=fast_enabled)
+
+    # Record when each frame circle flip actually happens
+    flips = record_calls(sim, 'handle_frame_circle', time.perf_counter)
+
+    # Count fast circle steps to compare the achieved step rate
+    steps = record_calls(sim, 'handle_fast_circle', lambda: None)
+
+    time.sleep(0.2)  # Let the engine settle
+    del flips[:], steps[:]
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    sim.stop()
+
+    ideal = sim.frame_interval / 1000.0
+    errors = [abs((b - a) - ideal) * 1000000 for a, b in zip(flips, flips[1:])]
+    return {
+        "cpu_percent": 100.0 * cpu / wall,
+        "flips": len(flips),
+        "fast_steps_per_s": len(steps) / wall,
+        "error_p50_us": percentile(errors, 0.5),
+        "error_mean_us": sum(errors) / len(errors) if errors else 0.0,
+        "error_p99_us": percentile(errors, 0.99),
+        "error_max_us": max(errors) if errors else 0.0,
+    }
+
+
+def cmd_engine(args):
+    """Engine CPU usage and transition-time error"""
+    for fast_enabled in (False, True):
+        label = "fast+frame circle" if fast_enabled else "frame circle only"
+        result = bench_engine(args.seconds, fast_enabled)
+        print(f"{label:18s}: CPU {result['cpu_percent']:5.1f}% | "
+              f"{result['fast_steps_per_s']:4.0f} steps/s | "
+              f"{result['flips']} flips | flip period error "
+              f"mean {result['error_mean_us']:.0f} us, "
+              f"p50 {result['error_p50_us']:.0f} us, "
+              f"p99 {result['error_p99_us']:.0f} us, "
+              f"max {result['error_max_us']:.0f} us")
+
+
+def busy_loop(stop):
+    """Burn CPU (and contend for the GIL) until stop is set"""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def cmd_lateness(args):
+    """Engine transition lateness percentiles with and without competing CPU load"""
+    for load in args.load:
+        sim = simulator_web.LEDTesterSimulator()
+        sim.update_fast_circle(interval=args.interval)
+        stop = threading.Event()
+        threads = [threading.Thread(target=busy_loop, args=(stop,), daemon=True) for _ in range(load)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)  # Let the engine settle
+        sim.reset_timing()
+        time.sleep(args.seconds)
+        report = sim.timing_report()
+        stop.set()
+        sim.stop()
+        for kind, stats in report["lateness"].items():
+            print(f"{load} busy threads, {kind:11s}: {stats['count']:6d} | "
+                  f"p50 {stats['p50Us']:5d} us p99 {stats['p99Us']:6d} us "
+                  f"p99.9 {stats['p999Us']:6d} us max {stats['maxUs']:6d} us "
+                  f"(nominal {report['nominalUs'][kind]} us)")
+
+
+def lock_phase_errors(sim, circle, fires, since_us):
+    """Get (schedule errors, fire errors) in us of circle transitions against their VSYNC edge's grid
+
+    Each transition is matched to the last VSYNC edge at or before its due
+    time and to the nearest step (or flip) of the grid anchored at that edge.
+    The schedule error is the due time's distance from that grid point, the
+    fire error the distance of the clock reading taken when the callback
+    ran, so it includes engine lateness. Both lists are sorted.
+    """
+    interval_us = sim.fast_circle_interval * 1000
+    rate = sim.frame_rate
+    edges = sorted(time_us for _, time_us, kind, value in sim.trace.entries()
+                   if kind == simulator_web.TRACE_VSYNC and value and time_us >= since_us)
+    schedule_errors = []
+    fire_errors = []
+    for due_us, fired_us in fires:
+        index = bisect.bisect_right(edges, due_us) - 1
+        if index < 0:
+            continue
+        edge = edges[index]
+        if circle == "fast":
+            grid_us = edge + round((due_us - edge) / interval_us) * interval_us
+        else:
+            # Flip number tick is due at edge + tick * 1e6 / (2 * frame rate), floored
+            tick = round((due_us - edge) * 2 * rate / 1000000)
+            grid_us = edge + tick * 1000000 * rate.denominator // (2 * rate.numerator)
+        schedule_errors.append(abs(due_us - grid_us))
+        fire_errors.append(abs(fired_us - grid_us))
+    return sorted(schedule_errors), sorted(fire_errors)
+
+
+def cmd_vsynclock(args):
+    """VSYNC lock phase error: circle transitions against the VSYNC edge they were re-anchored to"""
+    for circle in ("fast", "frame"):
+        for virtual in (False, True):
+            sim = simulator_web.LEDTesterSimulator(virtual_time=virtual)
+            fires = record_fires(sim, f"on_{circle}_circle_event")
+            sim.update_fast_circle(enabled=circle == "fast")
+            # 60 fps flips every 8.3 ms, several times per (slower) VSYNC period;
+            # rates that are not multiples of each other move the phase at every edge
+            sim.update_frame_circle(enabled=circle == "frame", frame_rate=60, vsync_lock=True)
+            sim.update_vsync_detection(rate=args.rate)
+            locked_since = sim.now_us()  # earlier edges were not locked
+            if virtual:
+                sim.advance(args.seconds)
+            else:
+                time.sleep(args.seconds)
+                sim.stop()
+            schedule_errors, fire_errors = lock_phase_errors(sim, circle, fires, locked_since)
+            # Off-grid due times ran on the old phase after an edge but
+            # before the edge reached the engine
+            stale = sum(1 for error in schedule_errors if error)
+            p99 = percentile(fire_errors, 0.99)
+            print(f"{circle:5s} circle, {'virtual' if virtual else 'real time':9s}: "
+                  f"{sim.vsync_lock_resets:4d} resets, {len(fire_errors):5d} transitions, {stale} stale | "
+                  f"fire error p50 {percentile(fire_errors, 0.5)} us p99 {p99} us "
+                  f"max {fire_errors[-1] if fire_errors else 0} us "
+                  f"-> {'PASS' if p99 < args.max_error else 'FAIL'} (p99 < {args.max_error} us)")
+
+
+def cmd_pll(args):
+    """Circle reset jitter with a jittery VSYNC reference: hard reset against PLL lock mode"""
+    period = 1000000 / args.rate
+    for mode, bandwidth in [("reset", None)] + [("pll", b) for b in args.bandwidth]:
+        sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+        sim.scheduler.cancel('vsync')  # edges come from the jittered source below
+        sim.update_frame_circle(frame_rate=args.rate, vsync_lock=True, vsync_lock_mode=mode,
+                                pll_bandwidth=bandwidth)
+        rng = random.Random(1)
+        start = sim.now_us() + 1000
+        count = itertools.count()
+
+        def on_edge(due_us):
+            sim.handle_vsync_edge(due_us)
+            while sim.vsync_lock_edges:
+                sim.lock_to_vsync_edge(sim.vsync_lock_edges.popleft())
+            ideal = start + next(count) * period
+            sim.scheduler.schedule('jitter', max(due_us + 1, round(ideal + period + rng.gauss(0, args.jitter))),
+                                   on_edge)
+        sim.scheduler.schedule('jitter', start, on_edge)
+
+        # Circle resets measured against the clean grid the jittered edges came from
+        resets = record_calls(sim, 'apply_vsync_lock')
+        sim.advance(args.seconds)
+
+        settled = resets[len(resets) // 4:]  # skip acquisition
+        errors = [t - start - round((t - start) / period) * period for t in settled]
+        mean = sum(errors) / len(errors)
+        deviation = (sum((e - mean) ** 2 for e in errors) / len(errors)) ** 0.5
+        intervals = [b - a for a, b in zip(settled, settled[1:])]
+        interval_mean = sum(intervals) / len(intervals)
+        interval_deviation = (sum((i - interval_mean) ** 2 for i in intervals) / len(intervals)) ** 0.5
+        status = sim.get_status()
+        label = mode if bandwidth is None else f"pll {bandwidth:g} Hz"
+        print(f"{label:12s}: {len(settled)} resets | phase vs clean grid: mean {mean:7.1f} us, "
+              f"std {deviation:6.1f} us, max {max(map(abs, errors)):6.0f} us | "
+              f"period std {interval_deviation:6.1f} us"
+              + (f" | locked {status['pllLocked']}" if bandwidth is not None else ""))
+
+
+def cmd_framerate(args):
+    """Frame rate estimator: false mismatches against single-interval readings, and per-edge cost"""
+    rng = random.Random(1)
+    period = 1000000 / args.rate
+    edges = []
+    for k in range(args.edges):
+        if rng.random() < args.drop:
+            continue
+        time_us = round(k * period + rng.gauss(0, args.jitter))
+        if rng.random() < args.late:
+            time_us += round(period / 4)  # one late edge
+        edges.append(time_us)
+        if rng.random() < args.duplicate:
+            edges.append(time_us + round(period / 8))
+    estimator = frame_rate_estimator.FrameRateEstimator()
+    single = robust = 0
+    last = None
+    for time_us in edges:
+        if last is not None and frame_rate_estimator.rate_mismatch(1000000 / (time_us - last), args.rate):
+            single += 1
+        last = time_us
+        estimator.add_edge(time_us)
+        if (estimator.count >= frame_rate_estimator.MIN_INTERVALS
+                and frame_rate_estimator.rate_mismatch(estimator.median_rate, args.rate)):
+            robust += 1
+    stats = estimator.stats
+    print(f"{len(edges)} edges at {args.rate:g} fps, {args.jitter:g} us jitter: mismatch flagged on "
+          f"{single} edges from one interval, {robust} from the estimator | "
+          f"missed {stats.missed_pulses}, extra {stats.extra_pulses} | "
+          f"last window mean {stats.mean_us:.1f} us median {stats.median_us} us std {stats.std_us:.1f} us")
+
+    estimator = frame_rate_estimator.FrameRateEstimator()
+    add_edge = estimator.add_edge
+    start = time.perf_counter()
+    for time_us in edges:
+        add_edge(time_us)
+    elapsed = time.perf_counter() - start
+    print(f"add_edge: {elapsed / len(edges) * 1e9:.0f} ns/edge")
+
+
+def source_cases(args, replay_path):
+    """(label, update_vsync_source keywords) for each VSYNC source the vsyncsource bench runs"""
+    return [
+        ("generated", {}),
+        ("gaussian jitter", {"jitter_us": args.jitter, "jitter_model": "gaussian"}),
+        ("uniform jitter", {"jitter_us": args.jitter, "jitter_model": "uniform"}),
+        ("drift", {"drift_ppm": args.drift, "drift_period_s": 60.0}),
+        ("drop+duplicate", {"drop": args.faults, "duplicate": args.faults}),
+        ("replay", {"replay": vsync_sources.ReplaySource(replay_path, "us")}),
+    ]
+
+
+def run_source_case(mode, settings, seconds, virtual_time=True):
+    """Run one VSYNC source against one lock mode; returns (sim, circle reset times, elapsed seconds)"""
+    sim = simulator_web.LEDTesterSimulator(virtual_time=virtual_time)
+    sim.update_frame_circle(vsync_lock=True, vsync_lock_mode=mode)
+    resets = record_calls(sim, 'apply_vsync_lock')
+    sim.update_vsync_source(seed=1, **settings)
+    start = time.perf_counter()
+    if virtual_time:
+        sim.advance(seconds)
+    else:
+        time.sleep(seconds)
+        sim.stop()
+    return sim, resets, time.perf_counter() - start
+
+
+def cmd_vsyncsource(args):
+    """Lock logic against every VSYNC source: generated, jittered, drifting, faulty and replayed"""
+    # A jittery capture long enough that loading it whole would show in memory
+    rng = random.Random(2)
+    period = 1000000 / 24
+    fd, replay_path = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w") as capture:
+        capture.write("# synthetic genlock capture, us\n")
+        for k in range(args.replay_edges):
+            capture.write(f"{round(k * period + rng.gauss(0, args.jitter))}\n")
+    try:
+        # Replay memory must not grow with the capture: stream the whole file
+        replay = vsync_sources.ReplaySource(replay_path, "us")
+        tracemalloc.start()
+        edges = 0
+        while replay.next_edge() is not None:
+            edges += 1
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"replay: {edges} edges from a {os.path.getsize(replay_path) / 1024:.0f} KiB file, "
+              f"peak {peak / 1024:.0f} KiB traced")
+
+        for mode in ("reset", "pll"):
+            for label, settings in source_cases(args, replay_path):
+                sim, resets, elapsed = run_source_case(mode, settings, args.seconds)
+                intervals = [b - a for a, b in zip(resets, resets[1:])][len(resets) // 4:]
+                mean = sum(intervals) / len(intervals)
+                deviation = (sum((i - mean) ** 2 for i in intervals) / len(intervals)) ** 0.5
+                status = sim.get_status()
+                stats = status["vsyncIntervalStats"]
+                report = sim.vsync_source_report()
+                print(f"{mode:5s} {label:15s}: {sim.vsync_edges / elapsed:6.0f} edges/s | "
+                      f"reset period std {deviation:7.1f} us | missed {stats['missedPulses']:4d} "
+                      f"(dropped {report.get('dropped', 0):4d}), extra {stats['extraPulses']:4d} "
+                      f"(duplicated {report.get('duplicated', 0):4d}) | pll locked {status['pllLocked']}")
+
+        # The same sources in real time
+        for label, settings in source_cases(args, replay_path):
+            sim, resets, elapsed = run_source_case("reset", settings, args.real_seconds, virtual_time=False)
+            vsync = sim.timing_report()["lateness"]["vsync"]
+            print(f"real time {label:15s}: {sim.vsync_edges} edges, {len(resets)} resets in {elapsed:.1f} s | "
+                  f"measured {sim.get_status()['measuredFrameRate']:.3f} fps | VSYNC lateness p99 {vsync['p99Us']} us")
+    finally:
+        os.unlink(replay_path)
+
+
+def cmd_field(args):
+    """Interlaced field source: per-edge cost over long runs, and fast circle lateness alongside it"""
+    # Virtual time: the cost per FIELD edge must not grow with the number of edges
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(enabled=False)
+    sim.update_frame_circle(enabled=False)
+    sim.update_vsync_detection(enabled=False)
+    sim.update_field(enabled=True, rate=args.rate, asymmetry_us=64, jitter_us=20)
+    for hour in range(1, args.hours + 1):
+        edges = sim.field_edges
+        start = time.perf_counter()
+        sim.advance(3600)
+        elapsed = time.perf_counter() - start
+        edges = sim.field_edges - edges
+        print(f"virtual hour {hour}: {edges} field edges, {elapsed / edges * 1e9:.0f} ns/edge")
+    report = sim.field_report()
+    for parity in ("odd", "even"):
+        stats = report[parity]
+        print(f"{parity:4s} fields: {stats['count']} | mean {stats['meanUs']} us std {stats['stdUs']} us "
+              f"min {stats['minUs']} us max {stats['maxUs']} us")
+
+    # Real time: fast circle lateness with and without the field source
+    for enabled in (False, True):
+        sim = simulator_web.LEDTesterSimulator()
+        sim.update_field(enabled=enabled, rate=args.rate)
+        time.sleep(0.2)  # Let the engine settle
+        sim.reset_timing()
+        time.sleep(args.seconds)
+        report = sim.timing_report()
+        sim.stop()
+        fast = report["lateness"]["fastCircle"]
+        field = report["lateness"]["field"]
+        print(f"real time, field {'on ' if enabled else 'off'}: fast circle p50 {fast['p50Us']} us "
+              f"p99 {fast['p99Us']} us | {field['count']} field edges, p99 {field['p99Us']} us late")
+
+
+def cmd_ingest(args):
+    """External VSYNC/FIELD edges over Unix and UDP sockets: transit and arrival-to-lock latency, burst batching"""
+    directory = tempfile.mkdtemp()
+    try:
+        for address in (f"unix:{directory}/edges.sock", f"udp:127.0.0.1:{free_port(socket.SOCK_DGRAM)}"):
+            sim = simulator_web.LEDTesterSimulator()
+            sim.update_frame_circle(vsync_lock=True)
+            listener = simulator_web.start_edge_listener(sim, address)
+            kind = address.split(":")[0]
+
+            # Paced edges from the stand-in generator in its own process
+            subprocess.run([sys.executable, "genlock_generator.py", address, "--rate", args.rate, "--field",
+                            "--seconds", str(args.seconds)], check=True, stdout=subprocess.DEVNULL)
+            time.sleep(0.1)
+            report = sim.ingest_report()
+            transit = report["transitUs"]
+            lock = report["ingestToLockUs"]
+            print(f"{kind:4s} paced: {report['edges']['vsync']} VSYNC + {report['edges']['field']} FIELD edges, "
+                  f"lost {report['lost']} | transit p50 {transit['p50Us']} us p99 {transit['p99Us']} us | "
+                  f"arrival to lock p50 {lock['p50Us']} us p99 {lock['p99Us']} us | "
+                  f"{sim.vsync_lock_resets} resets")
+
+            # The same generator unpaced: as many edges as one sender can push,
+            # stamped on arrival (their own stamps would run ahead of the clock)
+            before = dict(report["edges"], lost=report["lost"], batches=listener.batches,
+                          rejected=sum(report["rejected"].values()))
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "genlock_generator.py", address, "--rate", "1000", "--field",
+                            "--seconds", str(args.burst / 1000), "--burst", "--arrival-time"],
+                           check=True, stdout=subprocess.DEVNULL)
+            time.sleep(0.2)
+            elapsed = time.perf_counter() - start - 0.2
+            report = sim.ingest_report()
+            received = sum(report["edges"].values()) - before["vsync"] - before["field"]
+            print(f"{kind:4s} burst: {received} edges in {elapsed:.2f} s including generator startup "
+                  f"({received / elapsed:.0f}/s), lost {report['lost'] - before['lost']}, "
+                  f"rejected {sum(report['rejected'].values()) - before['rejected']} | "
+                  f"{listener.batches - before['batches']} batches, up to {report['maxBatch']} datagrams each")
+            listener.stop()
+            sim.stop()
+    finally:
+        shutil.rmtree(directory)
+
+
+def cmd_step(args):
+    """Per-step cost of the LED state updates run by main_loop"""
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    for label, stmt in (("handle_fast_circle", sim.handle_fast_circle),
+                        ("handle_frame_circle", sim.handle_frame_circle),
+                        ("get_status", sim.get_status),
+                        ("status json.dumps", lambda: json.dumps(sim.get_status())),
+                        ("status_json (cached)", sim.status_json),
+                        ("trace.record", lambda: sim.trace.record(0, 0, 0))):
+        best = min(timeit.repeat(stmt, number=args.number, repeat=5))
+        print(f"{label:20s}: {best / args.number * 1e9:7.0f} ns/call")
+
+    # Whole-engine throughput: one simulated minute at 1 ms per LED
+    start = time.perf_counter()
+    events = sim.advance(60)
+    elapsed = time.perf_counter() - start
+    print(f"{'virtual engine':20s}: {elapsed / events * 1e9:7.0f} ns/event "
+          f"({events} events, {60 / elapsed:.0f}x real time)")
+
+
+def mean_period_report(label, edges, rate):
+    """Print the long-run mean VSYNC period against the target period"""
+    target = 1000000.0 / rate
+    mean = (edges[-1] - edges[0]) / (len(edges) - 1)
+    print(f"{label:22s}: {len(edges)} edges | mean period {mean:.3f} us | "
+          f"target {target:.3f} us | error {(mean - target) * 1000:.1f} ns "
+          f"({(mean - target) / target * 1e6:.2f} ppm)")
+
+
+def cmd_vsync(args):
+    """Long-run mean VSYNC period against the configured rate"""
+    # Real time: edges are observed on the monotonic clock
+    sim = simulator_web.LEDTesterSimulator()
+    sim.update_vsync_detection(rate=args.rate)
+    edges = record_calls(sim, 'handle_vsync_edge', lambda current_time: sim.clock.now_us())
+    time.sleep(args.seconds)
+    sim.stop()
+    mean_period_report(f"real time, {args.seconds:g} s", edges[1:], args.rate)
+
+    # Virtual time: many hours of edges in a few seconds
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(enabled=False)
+    sim.update_frame_circle(enabled=False)
+    sim.update_vsync_detection(rate=args.rate)
+    edges = record_calls(sim, 'handle_vsync_edge', lambda current_time: sim.clock.now_us())
+    sim.advance(args.hours * 3600)
+    mean_period_report(f"virtual time, {args.hours:g} h", edges, args.rate)
+
+
+def free_port(kind=socket.SOCK_STREAM):
+    """Get a free TCP (or UDP) port on localhost"""
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(script="simulator_web.py", extra_args=()):
+    """Start a simulator web server in a subprocess; returns (process, port)"""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, script, "--port", str(port), *extra_args],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('localhost', port), timeout=0.2).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("simulator server did not start")
+
+
+def timed_request(port, method, path, body=None, headers=None, connection=None):
+    """Issue one request and return (latency in seconds, connection to reuse)"""
+    start = time.perf_counter()
+    if connection is None:
+        connection = http.client.HTTPConnection('localhost', port, timeout=30)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    response.read()
+    if response.will_close:
+        connection.close()
+        connection = None
+    return time.perf_counter() - start, connection
+
+
+def run_load(port, clients, seconds, keep_alive=False, interval=0.0):
+    """Poll /api/status from `clients` threads while timing control POSTs
+    
+    With interval 0 every client polls back-to-back (closed loop); otherwise
+    each client polls once per interval like a browser tab would.
+    """
+    stop = threading.Event()
+    status_latencies = []
+    post_latencies = []
+    errors = [0]
+
+    def poller():
+        connection = None
+        next_poll = time.perf_counter()
+        while not stop.is_set():
+            if interval:
+                next_poll += interval
+                stop.wait(max(0.0, next_poll - time.perf_counter()))
+            try:
+                latency, connection = timed_request(port, 'GET', '/api/status', connection=connection)
+                if not keep_alive and connection is not None:
+                    connection.close()
+                    connection = None
+                status_latencies.append(latency)
+            except (OSError, http.client.HTTPException):
+                errors[0] += 1
+                connection = None
+
+    def controller():
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        while not stop.is_set():
+            try:
+                latency, connection = timed_request(port, 'POST', '/api/fastCircle',
+                                                    'enabled=true&interval=1', headers)
+                if connection is not None:
+                    connection.close()
+                post_latencies.append(latency)
+            except (OSError, http.client.HTTPException):
+                errors[0] += 1
+            stop.wait(0.05)
+
+    threads = [threading.Thread(target=poller, daemon=True) for _ in range(clients)]
+    threads.append(threading.Thread(target=controller, daemon=True))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    return {
+        "status_per_s": len(status_latencies) / seconds,
+        "status_p50_ms": percentile(status_latencies, 0.5) * 1000,
+        "status_p99_ms": percentile(status_latencies, 0.99) * 1000,
+        "post_p50_ms": percentile(post_latencies, 0.5) * 1000,
+        "post_p99_ms": percentile(post_latencies, 0.99) * 1000,
+        "errors": errors[0],
+    }
+
+
+def print_load(label, clients, result):
+    """Print one load test result line"""
+    print(f"{label}{clients:4d} clients: {result['status_per_s']:6.0f} status/s | "
+          f"status p50 {result['status_p50_ms']:6.1f} ms p99 {result['status_p99_ms']:7.1f} ms | "
+          f"POST p50 {result['post_p50_ms']:6.1f} ms p99 {result['post_p99_ms']:7.1f} ms | "
+          f"{result['errors']} errors")
+
+
+def cmd_http(args):
+    """Status throughput and control-POST latency as polling clients grow"""
+    process, port = start_server(extra_args=["--workers", str(args.workers)])
+    try:
+        for clients in args.clients:
+            print_load("", clients, run_load(port, clients, args.seconds, interval=args.interval))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def cmd_keepalive(args):
+    """Status requests/s and latency with and without HTTP keep-alive"""
+    process, port = start_server(extra_args=["--workers", str(args.workers)])
+    try:
+        for clients in args.clients:
+            for keep_alive in (False, True):
+                label = "keep-alive " if keep_alive else "new conn   "
+                print_load(label, clients, run_load(port, clients, args.seconds,
+                                                    keep_alive=keep_alive, interval=args.interval))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def poll_route(port, path, decode, seconds):
+    """Poll one route back-to-back on a keep-alive connection, decoding every reply"""
+    connection = http.client.HTTPConnection('localhost', port, timeout=30)
+    latencies = []
+    size = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        connection.request('GET', path)
+        body = connection.getresponse().read()
+        decode(body)
+        latencies.append(time.perf_counter() - start)
+        size = len(body)
+    connection.close()
+    return len(latencies) / seconds, percentile(latencies, 0.5), percentile(latencies, 0.99), size
+
+
+def cmd_statusbin(args):
+    """Polling throughput of /api/status.bin against the JSON /api/status"""
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    state = sim.snapshot()
+    json_body = sim.status_json()
+    bin_body = sim.status_bin()
+    for label, stmt in (("json encode", lambda: simulator_web.encode_status_json(state)),
+                        ("binary encode", lambda: status_bin.encode(state)),
+                        ("json decode", lambda: json.loads(json_body)),
+                        ("binary decode", lambda: status_bin.decode(bin_body))):
+        best = min(timeit.repeat(stmt, number=args.number, repeat=5))
+        print(f"{label:15s}: {best / args.number * 1e9:7.0f} ns/call")
+
+    process, port = start_server()
+    try:
+        for path, decode in (("/api/status", json.loads), ("/api/status.bin", status_bin.decode)):
+            rate, p50, p99, size = poll_route(port, path, decode, args.seconds)
+            print(f"{path:15s}: {rate:6.0f} req/s | p50 {p50 * 1e6:5.0f} us "
+                  f"p99 {p99 * 1e6:6.0f} us | {size} byte body")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def cmd_fleet(args):
+    """Fleet engine events/s, memory and real-time CPU as the device count grows"""
+    for count in args.devices:
+        tracemalloc.start()
+        fleet = simulator_fleet.FleetSimulator(count, virtual_time=True)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        events = fleet.advance(args.hours * 3600 / count)
+        elapsed = time.perf_counter() - start
+        simulated = args.hours * 3600 / count
+        print(f"{count:5d} devices: {events / elapsed:8.0f} events/s | "
+              f"{elapsed / events * 1e6:5.2f} us/event | "
+              f"{100 * elapsed / simulated:5.1f}% of one core in real time | "
+              f"{memory / count:6.0f} bytes/device")
+
+    for count in args.realtime:
+        fleet = simulator_fleet.FleetSimulator(count)
+        time.sleep(0.5)  # Let the engine settle
+        events_start = fleet.scheduler.events_processed
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        time.sleep(args.seconds)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        events = fleet.scheduler.events_processed - events_start
+        fleet.stop()
+        print(f"real time, {count:5d} devices: CPU {100 * cpu / wall:5.1f}% | "
+              f"{events / wall:7.0f} events/s")
+
+
+def cmd_tracefile(args):
+    """Trace file write rate, writer memory over a long capture and reader seek cost"""
+    path = os.path.join(tempfile.mkdtemp(), "capture.trace")
+    try:
+        # Synthetic 1 kHz transition stream, written in the batches the recorder uses
+        writer = trace_file.TraceFileWriter(path, 0)
+        batch = trace_file.BLOCK_RECORDS
+        kinds = array('B', [0]) * batch
+        values = array('I', [1]) * batch
+        start = time.perf_counter()
+        for first in range(0, args.records, batch):
+            writer.add(array('Q', range(first * 1000, (first + batch) * 1000, 1000)), kinds, values)
+        writer.close()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"write       : {args.records / elapsed:8.0f} records/s | "
+              f"{size / elapsed / 1e6:6.1f} MB/s | {size / args.records:.1f} bytes/record")
+
+        # Writer memory through a virtual capture of the real engine
+        sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+        recorder = trace_file.TraceRecorder(sim, trace_file.TraceFileWriter(path, sim.now_us()))
+        tracemalloc.start()
+        for _ in range(2 * sim.recent_states.maxlen):
+            sim.advance(1.0)  # Warm up: fill the bounded state history with traced states
+            recorder.poll()
+        for quarter in range(4):
+            tracemalloc.reset_peak()
+            for _ in range(args.minutes * 15):
+                sim.advance(1.0)
+                recorder.poll()
+            print(f"capture {quarter + 1}/4 : {recorder.sink.records:8d} records | "
+                  f"peak {tracemalloc.get_traced_memory()[1] / 1024:6.0f} KiB")
+        tracemalloc.stop()
+        recorder.close()
+
+        with trace_file.TraceFileReader(path) as reader:
+            first, last = reader.time_span()
+            lookups = [first + (last - first) * i // 1000 for i in range(1000)]
+            start = time.perf_counter()
+            for time_us in lookups:
+                reader.find(time_us)
+            seek = (time.perf_counter() - start) / len(lookups)
+            start = time.perf_counter()
+            records = sum(len(reader.read(time_us, time_us + 1000000)) for time_us in lookups[:100])
+            window = (time.perf_counter() - start) / 100
+            print(f"read        : {len(reader)} records, seek {seek * 1e6:.1f} us, "
+                  f"1 s window {window * 1e3:.2f} ms ({records // 100} records), "
+                  f"numpy {'yes' if trace_file.np is not None else 'no'}")
+    finally:
+        shutil.rmtree(os.path.dirname(path))
+
+
+def cmd_metrics(args):
+    """Hot-path counter cost, per-request HTTP accounting and /metrics render time"""
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.advance(10)
+    streamer = simulator_web.StateStreamer(sim)
+    exporter = metrics.MetricsExporter(sim.metric_families, streamer.metric_families, cache_seconds=0)
+    for route in simulator_web.LEDTesterHTTPHandler.METRIC_ROUTES:
+        exporter.http.observe(route, "GET", 200, 150)
+    cached = metrics.MetricsExporter(sim.metric_families, streamer.metric_families)
+    for label, stmt, number in (
+            ("counter += 1", lambda: timeit.repeat("sim.fast_circle_steps += 1", globals={"sim": sim},
+                                                   number=args.number, repeat=5), args.number),
+            ("http observe", lambda: timeit.repeat(lambda: exporter.http.observe("/api/status", "GET", 200, 150),
+                                                   number=args.number, repeat=5), args.number),
+            ("render", lambda: timeit.repeat(exporter.render, number=200, repeat=5), 200),
+            ("render (cached)", lambda: timeit.repeat(cached.render, number=args.number, repeat=5), args.number)):
+        print(f"{label:16s}: {min(stmt()) / number * 1e9:9.0f} ns/call")
+    print(f"page size       : {len(exporter.render())} bytes")
+
+
+def cmd_vcd(args):
+    """VCD export rate and memory from a recorded trace file"""
+    directory = tempfile.mkdtemp()
+    trace_path = os.path.join(directory, "capture.trace")
+    vcd_path = os.path.join(directory, "capture.vcd")
+    try:
+        # Synthetic fast circle: one LED step per ms, two LED bits change per step
+        writer = trace_file.TraceFileWriter(trace_path, 0)
+        batch = trace_file.BLOCK_RECORDS
+        kinds = array('B', [0]) * batch
+        for first in range(0, args.records, batch):
+            values = array('I', (1 << (index % 12) for index in range(first, first + batch)))
+            writer.add(array('Q', range(first * 1000, (first + batch) * 1000, 1000)), kinds, values)
+        writer.close()
+
+        for traced in (False, True):
+            if traced:
+                tracemalloc.start()
+            start = time.perf_counter()
+            count = vcd_export.export_trace_file(trace_path, vcd_path)
+            elapsed = time.perf_counter() - start
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"export peak memory: {peak / 1024:.0f} KiB for {count} transitions")
+            else:
+                size = os.path.getsize(vcd_path)
+                print(f"export: {count / elapsed:8.0f} transitions/s | {size / elapsed / 1e6:5.1f} MB/s | "
+                      f"{size / count:.1f} bytes/transition")
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description="ESP32 LED Tester Simulator benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    engine = subparsers.add_parser("engine", help=cmd_engine.__doc__)
+    engine.add_argument("--seconds", type=float, default=5.0)
+    engine.set_defaults(func=cmd_engine)
+
+    step = subparsers.add_parser("step", help=cmd_step.__doc__)
+    step.add_argument("--number", type=int, default=200000)
+    step.set_defaults(func=cmd_step)
+
+    vsync = subparsers.add_parser("vsync", help=cmd_vsync.__doc__)
+    vsync.add_argument("--seconds", type=float, default=10.0)
+    vsync.add_argument("--hours", type=float, default=24.0)
+    vsync.add_argument("--rate", type=float, default=24.0)
+    vsync.set_defaults(func=cmd_vsync)
+
+    http_load = subparsers.add_parser("http", help=cmd_http.__doc__)
+    http_load.add_argument("--seconds", type=float, default=5.0)
+    http_load.add_argument("--workers", type=int, default=16)
+    http_load.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    http_load.add_argument("--interval", type=float, default=0.1,
+                           help="seconds between polls per client, 0 = back-to-back")
+    http_load.set_defaults(func=cmd_http)
+
+    keepalive = subparsers.add_parser("keepalive", help=cmd_keepalive.__doc__)
+    keepalive.add_argument("--seconds", type=float, default=5.0)
+    keepalive.add_argument("--workers", type=int, default=16)
+    keepalive.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    keepalive.add_argument("--interval", type=float, default=0.0,
+                           help="seconds between polls per client, 0 = back-to-back")
+    keepalive.set_defaults(func=cmd_keepalive)
+
+    statusbin = subparsers.add_parser("statusbin", help=cmd_statusbin.__doc__)
+    statusbin.add_argument("--seconds", type=float, default=5.0)
+    statusbin.add_argument("--number", type=int, default=100000)
+    statusbin.set_defaults(func=cmd_statusbin)
+
+    fleet = subparsers.add_parser("fleet", help=cmd_fleet.__doc__)
+    fleet.add_argument("--devices", type=int, nargs="+", default=[1, 10, 100, 500, 1000, 2000])
+    fleet.add_argument("--hours", type=float, default=2.0,
+                       help="simulated device-hours per count (split across the devices)")
+    fleet.add_argument("--realtime", type=int, nargs="*", default=[500])
+    fleet.add_argument("--seconds", type=float, default=5.0)
+    fleet.set_defaults(func=cmd_fleet)
+
+    tracefile = subparsers.add_parser("tracefile", help=cmd_tracefile.__doc__)
+    tracefile.add_argument("--records", type=int, default=2000000)
+    tracefile.add_argument("--minutes", type=int, default=20,
+                           help="simulated minutes of engine capture")
+    tracefile.set_defaults(func=cmd_tracefile)
+
+    lateness = subparsers.add_parser("lateness", help=cmd_lateness.__doc__)
+    lateness.add_argument("--seconds", type=float, default=5.0)
+    lateness.add_argument("--interval", type=int, default=1, help="fast circle ms per LED")
+    lateness.add_argument("--load", type=int, nargs="+", default=[0, 1, 4],
+                          help="busy Python threads competing with the engine")
+    lateness.set_defaults(func=cmd_lateness)
+
+    metrics_bench = subparsers.add_parser("metrics", help=cmd_metrics.__doc__)
+    metrics_bench.add_argument("--number", type=int, default=100000)
+    metrics_bench.set_defaults(func=cmd_metrics)
+
+    vcd = subparsers.add_parser("vcd", help=cmd_vcd.__doc__)
+    vcd.add_argument("--records", type=int, default=1000000)
+    vcd.set_defaults(func=cmd_vcd)
+
+    vsynclock = subparsers.add_parser("vsynclock", help=cmd_vsynclock.__doc__)
+    vsynclock.add_argument("--seconds", type=float, default=5.0)
+    vsynclock.add_argument("--rate", type=float, default=23.976, help="simulated VSYNC fps")
+    vsynclock.add_argument("--max-error", type=int, default=100, help="pass threshold for the p99 fire error (us)")
+    vsynclock.set_defaults(func=cmd_vsynclock)
+
+    pll = subparsers.add_parser("pll", help=cmd_pll.__doc__)
+    pll.add_argument("--seconds", type=float, default=600.0, help="simulated seconds")
+    pll.add_argument("--rate", type=float, default=24.0, help="VSYNC and frame fps")
+    pll.add_argument("--jitter", type=float, default=1000.0, help="Gaussian VSYNC jitter, us standard deviation")
+    pll.add_argument("--bandwidth", type=float, nargs="+", default=[5.0, 1.0, 0.2], help="PLL bandwidths (Hz)")
+    pll.set_defaults(func=cmd_pll)
+
+    framerate = subparsers.add_parser("framerate", help=cmd_framerate.__doc__)
+    framerate.add_argument("--edges", type=int, default=100000)
+    framerate.add_argument("--rate", type=float, default=24.0)
+    framerate.add_argument("--jitter", type=float, default=500.0, help="Gaussian edge jitter, us standard deviation")
+    framerate.add_argument("--late", type=float, default=0.001, help="fraction of edges a quarter period late")
+    framerate.add_argument("--drop", type=float, default=0.001, help="fraction of pulses dropped")
+    framerate.add_argument("--duplicate", type=float, default=0.001, help="fraction of pulses doubled")
+    framerate.set_defaults(func=cmd_framerate)
+
+    vsyncsource = subparsers.add_parser("vsyncsource", help=cmd_vsyncsource.__doc__)
+    vsyncsource.add_argument("--seconds", type=float, default=3600.0, help="virtual seconds per case")
+    vsyncsource.add_argument("--real-seconds", type=float, default=3.0, help="real-time seconds per case")
+    vsyncsource.add_argument("--jitter", type=float, default=500.0, help="edge jitter in us")
+    vsyncsource.add_argument("--drift", type=float, default=200.0, help="peak frequency drift in ppm")
+    vsyncsource.add_argument("--faults", type=float, default=0.01, help="fraction of pulses dropped and doubled")
+    vsyncsource.add_argument("--replay-edges", type=int, default=200000, help="edges in the replayed capture")
+    vsyncsource.set_defaults(func=cmd_vsyncsource)
+
+    ingest = subparsers.add_parser("ingest", help=cmd_ingest.__doc__)
+    ingest.add_argument("--rate", default="59.94", help="generator VSYNC rate")
+    ingest.add_argument("--seconds", type=float, default=5.0, help="paced run per socket type")
+    ingest.add_argument("--burst", type=int, default=10000, help="VSYNC pulses in the burst test")
+    ingest.set_defaults(func=cmd_ingest)
+
+    field = subparsers.add_parser("field", help=cmd_field.__doc__)
+    field.add_argument("--rate", type=float, default=120.0, help="fields per second")
+    field.add_argument("--hours", type=int, default=3, help="simulated hours")
+    field.add_argument("--seconds", type=float, default=5.0, help="real-time run per case")
+    field.set_defaults(func=cmd_field)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Call Recorder
+Logs the calls of a simulator method, for tests and benchmarks
+
+record_calls() replaces a method with a recording wrapper on the instance.
+The engine calls its methods through self and looks event callbacks up
+again each time it re-arms a timer, so the wrapper sees every later call
+without any hook in the engine itself.
+"""
+
+
+def record_calls(obj, name, entry=None, calls=None, after=False):
+    """Wrap obj.<name> to log every call; returns the list of entries
+
+    entry(*args) makes the entry for a call (default: its first argument)
+    and calls is the list to append to (default: a new one). With after,
+    the entry is made once the call has returned, to log the state it left.
+    """
+    if calls is None:
+        calls = []
+    method = getattr(obj, name)
+    def recording_method(*args):
+        if not after:
+            calls.append(args[0] if entry is None else entry(*args))
+        result = method(*args)
+        if after:
+            calls.append(args[0] if entry is None else entry(*args))
+        return result
+    setattr(obj, name, recording_method)
+    return calls
+
+
+def record_fires(sim, name, calls=None):
+    """Log (due_us, engine time) for every call of one of sim's event callbacks"""
+    return record_calls(sim, name, lambda due_us: (due_us, sim.clock.now_us()), calls)
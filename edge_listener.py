@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Edge Listener
+Timestamped VSYNC/FIELD edges from another process over a local datagram socket
+
+Each UDP or Unix-domain datagram carries one or more 12-byte records
+(little-endian):
+
+    offset  type     field
+    0       uint8    kind: 1 = VSYNC, 2 = FIELD
+    1       uint8    value: VSYNC 1 = falling edge (pulse start), 0 = rising;
+                     FIELD 1 = odd field, 0 = even field
+    2       uint16   sequence number, +1 per record per sender (wraps)
+    4       int64    edge time in µs on the engine clock (CLOCK_MONOTONIC,
+                     time.monotonic_ns() // 1000); 0 = time of arrival
+
+The listener thread sleeps in select() until the socket is readable, then
+drains it without blocking (up to MAX_BATCH datagrams) and hands the whole
+batch to the simulator under one lock acquisition. Sequence gaps count as
+lost records; edge time to arrival is recorded as transit latency.
+"""
+
+import os
+import selectors
+import socket
+import stat
+import struct
+import threading
+
+from latency_histogram import LatencyHistogram
+
+RECORD = struct.Struct('<BBHq')
+EDGE_VSYNC = 1
+EDGE_FIELD = 2
+EDGE_KINDS = {EDGE_VSYNC: 'vsync', EDGE_FIELD: 'field'}
+
+MAX_BATCH = 256  # datagrams drained per batch
+MAX_DATAGRAM = 65536
+RECEIVE_BUFFER = 1 << 20
+
+
+def encode_edge(kind, value, time_us, sequence):
+    """Pack one edge record"""
+    return RECORD.pack(kind, value, sequence & 0xFFFF, time_us)
+
+
+def parse_address(address):
+    """Get (family, socket address) for 'unix:/path', 'udp:host:port' or 'host:port'"""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    if address.startswith('udp:'):
+        address = address[len('udp:'):]
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"edge address must be unix:/path or [udp:]host:port, not {address!r}")
+    return socket.AF_INET, (host, int(port))
+
+
+def open_socket(address, bind, blocking=False):
+    """Open a datagram socket for address, bound if listening (non-blocking by default)"""
+    family, sockaddr = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        if bind:
+            if family == socket.AF_UNIX and os.path.exists(sockaddr):
+                if not stat.S_ISSOCK(os.stat(sockaddr).st_mode):
+                    raise ValueError(f"{sockaddr} exists and is not a socket")
+                os.unlink(sockaddr)  # stale socket from an earlier run
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+            sock.bind(sockaddr)
+        else:
+            sock.connect(sockaddr)
+        sock.setblocking(blocking)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+class EdgeSender:
+    """Sends edge records to an EdgeListener
+
+    By default a datagram the listener has no room for is refused (counted
+    in `dropped`) so a paced sender never stalls; a blocking sender waits
+    for room on Unix sockets instead (UDP drops it in the kernel either way).
+    """
+
+    def __init__(self, address, blocking=False):
+        self.sock = open_socket(address, bind=False, blocking=blocking)
+        self.sequence = 0
+        self.sent = 0
+        self.dropped = 0  # datagrams refused because the listener's buffer was full
+
+    def send(self, edges):
+        """Send (kind, value, time_us) edges in one datagram"""
+        records = []
+        for kind, value, time_us in edges:
+            records.append(encode_edge(kind, value, time_us, self.sequence))
+            self.sequence += 1
+        try:
+            self.sock.send(b''.join(records))
+            self.sent += len(records)
+        except (BlockingIOError, ConnectionRefusedError, FileNotFoundError):
+            self.dropped += 1
+
+    def close(self):
+        """Close the socket"""
+        self.sock.close()
+
+
+class EdgeListener:
+    """Receives edge records and feeds them to a real-time simulator's ingest_edges()"""
+
+    def __init__(self, simulator, address):
+        if simulator.clock.virtual:
+            raise ValueError("the edge listener needs a real-time simulator")
+        self.simulator = simulator
+        self.clock = simulator.clock
+        self.address = address
+        self.sock = open_socket(address, bind=True)
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.thread = None
+        self.running = False
+
+        self.datagrams = 0
+        self.edges = {kind: 0 for kind in EDGE_KINDS}
+        self.batches = 0
+        self.max_batch = 0  # most datagrams drained in one batch
+        self.malformed = 0  # datagrams that are not whole records, and unknown kinds
+        self.lost = 0  # records missing from sender sequences
+        self.next_sequence = {}  # sender address -> expected sequence
+        self.transit = LatencyHistogram()  # edge time to arrival (µs)
+
+    def start(self):
+        """Start the listener thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the listener thread and close the socket"""
+        self.running = False
+        self.wake_writer.send(b'\0')
+        if self.thread is not None:
+            self.thread.join()
+        self.sock.close()
+        self.wake_reader.close()
+        self.wake_writer.close()
+        family, sockaddr = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+
+    def run(self):
+        """Listener thread: wait for datagrams and pass them on in batches"""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.sock, selectors.EVENT_READ)
+            selector.register(self.wake_reader, selectors.EVENT_READ)
+            while self.running:
+                selector.select()
+                batch = self.read_batch()
+                if batch:
+                    self.simulator.ingest_edges(batch)
+
+    def read_batch(self):
+        """Drain waiting datagrams; returns [(kind, value, time_us, received_us)]"""
+        edges = []
+        datagrams = 0
+        while datagrams < MAX_BATCH:
+            try:
+                data, sender = self.sock.recvfrom(MAX_DATAGRAM)
+            except BlockingIOError:
+                break
+            received_us = self.clock.now_us()
+            datagrams += 1
+            if not data or len(data) % RECORD.size:
+                self.malformed += 1
+                continue
+            for kind, value, sequence, time_us in RECORD.iter_unpack(data):
+                expected = self.next_sequence.get(sender)
+                if expected is not None:
+                    gap = (sequence - expected) & 0xFFFF
+                    if gap < 0x8000:  # larger gaps are late or repeated records
+                        self.lost += gap
+                self.next_sequence[sender] = (sequence + 1) & 0xFFFF
+                if kind not in EDGE_KINDS:
+                    self.malformed += 1
+                    continue
+                if time_us <= 0:
+                    time_us = received_us
+                else:
+                    self.transit.record(received_us - time_us)
+                self.edges[kind] += 1
+                edges.append((kind, value, time_us, received_us))
+        if datagrams:
+            self.datagrams += datagrams
+            self.batches += 1
+            self.max_batch = max(self.max_batch, datagrams)
+        return edges
+
+    def report(self):
+        """Get the listener counters and transit latency for /api/ingest"""
+        return {
+            "listening": True,
+            "address": self.address,
+            "datagrams": self.datagrams,
+            "edges": {name: self.edges[kind] for kind, name in EDGE_KINDS.items()},
+            "batches": self.batches,
+            "maxBatch": self.max_batch,
+            "malformed": self.malformed,
+            "lost": self.lost,
+            "transitUs": self.transit.summary(),
+        }
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Event Scheduler
+Discrete-event timer heap driven by either a wall clock or a virtual clock
+"""
+
+import heapq
+import itertools
+import time
+
+
+class MonotonicClock:
+    """Real time source in integer microseconds (like micros() on the ESP32)"""
+    virtual = False
+
+    def now_us(self):
+        """Get current monotonic time in microseconds"""
+        return time.monotonic_ns() // 1000
+
+
+class VirtualClock:
+    """Simulated time source that only moves when the scheduler advances it"""
+    virtual = True
+
+    def __init__(self, start_us=0):
+        self._now_us = start_us
+
+    def now_us(self):
+        """Get current virtual time in microseconds"""
+        return self._now_us
+
+    def advance_to(self, t_us):
+        """Move virtual time forward (never backwards)"""
+        if t_us > self._now_us:
+            self._now_us = t_us
+
+
+class EventScheduler:
+    """Named one-shot timers kept on a heap
+
+    Each timer name has at most one pending event: scheduling a name again
+    replaces the earlier event, which is then skipped lazily when popped.
+    Callbacks receive the time (µs) the event was due at.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._heap = []
+        self._pending = {}  # name -> sequence number of the live heap entry
+        self._sequence = itertools.count()
+        self.events_processed = 0
+
+    def schedule(self, name, due_us, callback):
+        """Schedule (or re-schedule) timer `name` to fire at `due_us`"""
+        seq = next(self._sequence)
+        self._pending[name] = seq
+        heapq.heappush(self._heap, (due_us, seq, name, callback))
+
+    def cancel(self, name):
+        """Cancel timer `name` if it is pending"""
+        self._pending.pop(name, None)
+
+    def is_pending(self, name):
+        """Check whether timer `name` has a pending event"""
+        return name in self._pending
+
+    def _drop_stale(self):
+        """Discard heap entries that were cancelled or re-scheduled"""
+        heap = self._heap
+        while heap and self._pending.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+
+    def next_due(self):
+        """Get the due time of the earliest pending event, or None"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_us):
+        """Pop the earliest event if it is due at or before `now_us`"""
+        self._drop_stale()
+        if self._heap and self._heap[0][0] <= now_us:
+            due_us, _, name, callback = heapq.heappop(self._heap)
+            del self._pending[name]
+            return due_us, callback
+        return None
+
+    def run_due(self, now_us):
+        """Run every event due at or before `now_us`, in time order"""
+        count = 0
+        while True:
+            event = self.pop_due(now_us)
+            if event is None:
+                break
+            due_us, callback = event
+            callback(due_us)
+            count += 1
+        self.events_processed += count
+        return count
+
+    def run_until(self, t_us):
+        """Advance a virtual clock to `t_us`, firing events at their due times"""
+        clock = self.clock
+        count = 0
+        while True:
+            event = self.pop_due(t_us)
+            if event is None:
+                break
+            due_us, callback = event
+            clock.advance_to(due_us)
+            callback(due_us)
+            count += 1
+        clock.advance_to(t_us)
+        self.events_processed += count
+        return count
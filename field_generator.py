@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Field Generator
+Interlaced FIELD signal source and per-field duration statistics
+
+Edge k starts field k; even k are odd fields (the first field is odd).
+Edges sit on an integer-µs grid of the field rate, with the odd field
+`asymmetry_us` longer than the even one (half added to each odd field, half
+taken from each even field) and optional Gaussian jitter on every edge.
+Durations are measured edge to edge as src/main.cpp's fieldISR does and
+summarised per parity with Welford statistics since the last reset, plus the
+most recent durations; each edge costs the same however long the run.
+"""
+
+import random
+from collections import deque, namedtuple
+from fractions import Fraction
+
+DEFAULT_FIELD_RATE = Fraction(60000, 1001)  # NTSC fields per second
+HISTORY = 120  # recent durations kept per parity
+
+FieldStats = namedtuple('FieldStats', ['count', 'last_us', 'mean_us', 'std_us', 'min_us', 'max_us'])
+EMPTY_FIELD_STATS = FieldStats(0, 0, 0.0, 0.0, 0, 0)
+
+
+def field_stats_to_dict(stats):
+    """Convert FieldStats to the /api/status dictionary (µs)"""
+    return {
+        "count": stats.count,
+        "lastUs": stats.last_us,
+        "meanUs": round(stats.mean_us, 1),
+        "stdUs": round(stats.std_us, 1),
+        "minUs": stats.min_us,
+        "maxUs": stats.max_us,
+    }
+
+
+class FieldDurationStats:
+    """Streaming statistics and recent history of one field parity's durations"""
+
+    def __init__(self, history=HISTORY):
+        self.history = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        """Forget every duration"""
+        self.history.clear()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = 0
+        self.max = 0
+        self.stats = EMPTY_FIELD_STATS
+
+    def add(self, duration_us):
+        """Record one field duration"""
+        self.history.append(duration_us)
+        self.count += 1
+        delta = duration_us - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (duration_us - self.mean)
+        if self.count == 1 or duration_us < self.min:
+            self.min = duration_us
+        if duration_us > self.max:
+            self.max = duration_us
+        std = (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+        self.stats = FieldStats(self.count, duration_us, self.mean, std, self.min, self.max)
+
+
+class FieldGenerator:
+    """Interlaced field edge times: rate (fields/s), asymmetry and jitter in µs"""
+
+    def __init__(self, rate=DEFAULT_FIELD_RATE, asymmetry_us=0, jitter_us=0, seed=None):
+        self.rate = rate
+        self.asymmetry_us = asymmetry_us
+        self.jitter_us = jitter_us
+        self.random = random.Random(seed)
+        self.reset(0)
+
+    def reset(self, anchor_us):
+        """Start a new edge grid with edge 0 (an odd field) at anchor_us"""
+        self.anchor_us = anchor_us
+        self.index = 0
+        self.last_edge_us = None
+
+    def nominal_edge(self, index):
+        """Get the time (µs) of edge number index without jitter"""
+        rate = self.rate
+        time_us = self.anchor_us + index * 1000000 * rate.denominator // rate.numerator
+        if index % 2:
+            time_us += self.asymmetry_us // 2
+        return time_us
+
+    def next_edge(self):
+        """Get (time_us, odd) of the next edge and move past it"""
+        time_us = self.nominal_edge(self.index)
+        if self.jitter_us:
+            time_us += round(self.random.gauss(0, self.jitter_us))
+        # Jitter never reorders edges or moves the first one before the anchor
+        if self.last_edge_us is None:
+            time_us = max(time_us, self.anchor_us)
+        elif time_us <= self.last_edge_us:
+            time_us = self.last_edge_us + 1
+        odd = self.index % 2 == 0
+        self.index += 1
+        self.last_edge_us = time_us
+        return time_us, odd
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Frame Rate Estimator
+Streaming VSYNC interval statistics over a fixed window of recent edges
+
+Intervals go into a ring of `window` values. Mean and variance are kept with
+Welford's update, run in reverse for the interval leaving the ring (and
+recomputed exactly once per lap to shed rounding drift); a sorted copy of
+the window gives median, min and max. Each edge costs O(1) arithmetic plus
+a bisect and a short memmove in the sorted copy.
+
+Intervals are judged against the window median: about k medians (k >= 2)
+means k - 1 pulses went missing and the interval is recorded as a single
+sample of interval / k (so a gap counts once, not k times, in the window);
+under half a median is an extra pulse and the edge is ignored.
+MIN_INTERVALS such judgements in a row mean the rate itself changed, and the
+window starts over.
+"""
+
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+DEFAULT_WINDOW = 32
+MIN_INTERVALS = 4  # intervals needed before pulses are judged or a mismatch is reported
+EXTRA_FRACTION = 0.5  # intervals shorter than this many medians are extra pulses
+MISSED_FRACTION = 1.5  # intervals longer than this many medians contain missed pulses
+MISMATCH_TOLERANCE_FPS = 0.5
+
+IntervalStats = namedtuple('IntervalStats', [
+    'count', 'mean_us', 'median_us', 'min_us', 'max_us', 'std_us',
+    'missed_pulses', 'extra_pulses',
+])
+EMPTY_STATS = IntervalStats(0, 0.0, 0.0, 0, 0, 0.0, 0, 0)
+
+
+def stats_to_dict(stats):
+    """Convert IntervalStats to the /api/status dictionary (µs)"""
+    return {
+        "count": stats.count,
+        "meanUs": round(stats.mean_us, 1),
+        "medianUs": stats.median_us,
+        "minUs": stats.min_us,
+        "maxUs": stats.max_us,
+        "stdUs": round(stats.std_us, 1),
+        "missedPulses": stats.missed_pulses,
+        "extraPulses": stats.extra_pulses,
+    }
+
+
+def rate_mismatch(measured_fps, expected_fps, tolerance=MISMATCH_TOLERANCE_FPS):
+    """Whether a measured frame rate is off the expected one (0 = nothing measured)"""
+    return measured_fps > 0 and abs(measured_fps - float(expected_fps)) > tolerance
+
+
+class FrameRateEstimator:
+    """VSYNC interval statistics over the last `window` intervals"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Forget every edge and the pulse counters"""
+        self.missed_pulses = 0
+        self.extra_pulses = 0
+        self.clear_window()
+        self.last_edge_us = None
+        self.stats = EMPTY_STATS
+
+    def clear_window(self):
+        """Forget the intervals (the counters stay)"""
+        self.ring = [0] * self.window
+        self.position = 0  # next ring slot to write
+        self.count = 0
+        self.sorted = []
+        self.median_us = 0  # median interval of the window (µs, 0 when empty)
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.anomalies = 0  # missed or extra pulse judgements in a row
+        self.run_pulses = (0, 0)  # (missed, extra) counted during that run
+        self.after_extra = False  # last edge was an extra pulse
+
+    @property
+    def rate(self):
+        """Frame rate (fps) from the mean interval, 0 until an interval is known"""
+        return 1000000.0 / self.mean if self.count else 0.0
+
+    @property
+    def median_rate(self):
+        """Frame rate (fps) from the median interval, which ignores outliers"""
+        median = self.median_us
+        return 1000000.0 / median if median else 0.0
+
+    def add_edge(self, time_us):
+        """Record one VSYNC edge; returns False if it was judged an extra pulse"""
+        last = self.last_edge_us
+        if last is None:
+            self.last_edge_us = time_us
+            return True
+        interval = time_us - last
+        if interval <= 0:
+            self.extra_pulses += 1
+            self.stats = self.stats._replace(extra_pulses=self.extra_pulses)
+            return False
+        if self.count >= MIN_INTERVALS:
+            median = self.median_us
+            if interval < EXTRA_FRACTION * median or interval > MISSED_FRACTION * median:
+                self.anomalies += 1
+                if self.anomalies >= MIN_INTERVALS:
+                    # Not a glitch: the rate changed, so the run was no pulses
+                    # missed or extra; start over from this edge
+                    self.missed_pulses -= self.run_pulses[0]
+                    self.extra_pulses -= self.run_pulses[1]
+                    self.clear_window()
+                    self.last_edge_us = time_us
+                    self.stats = EMPTY_STATS._replace(missed_pulses=self.missed_pulses,
+                                                      extra_pulses=self.extra_pulses)
+                    return True
+            elif not self.after_extra:
+                # (the interval after an extra pulse spans it, so it does not end a run)
+                self.anomalies = 0
+                self.run_pulses = (0, 0)
+            self.after_extra = interval < EXTRA_FRACTION * median
+            if self.after_extra:
+                self.extra_pulses += 1
+                self.run_pulses = (self.run_pulses[0], self.run_pulses[1] + 1)
+                self.stats = self.stats._replace(extra_pulses=self.extra_pulses)
+                return False
+            if interval > MISSED_FRACTION * median:
+                periods = round(interval / median)
+                self.missed_pulses += periods - 1
+                self.run_pulses = (self.run_pulses[0] + periods - 1, self.run_pulses[1])
+                interval = round(interval / periods)
+        self.last_edge_us = time_us
+        self.add_interval(interval)
+        return True
+
+    def add_interval(self, interval):
+        """Push one interval (µs) into the window and refresh the statistics"""
+        position = self.position
+        if self.count == self.window:
+            old = self.ring[position]
+            del self.sorted[bisect_left(self.sorted, old)]
+            # Welford in reverse, then forward for the new value
+            delta = old - self.mean
+            self.mean -= delta / (self.count - 1) if self.count > 1 else self.mean
+            self.m2 -= delta * (old - self.mean)
+            self.count -= 1
+        self.ring[position] = interval
+        values = self.sorted
+        insort(values, interval)
+        middle = len(values) // 2
+        self.median_us = values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+        self.count += 1
+        delta = interval - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (interval - self.mean)
+        self.position = (position + 1) % self.window
+        if self.position == 0:
+            # Once per lap: recompute exactly so rounding never accumulates
+            self.mean = sum(self.ring) / self.count
+            self.m2 = sum((value - self.mean) ** 2 for value in self.ring)
+
+        variance = max(0.0, self.m2) / (self.count - 1) if self.count > 1 else 0.0
+        self.stats = IntervalStats(self.count, self.mean, self.median_us, values[0], values[-1],
+                                   variance ** 0.5, self.missed_pulses, self.extra_pulses)
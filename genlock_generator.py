@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Genlock Generator
+Stand-in for a genlock generator: sends timestamped VSYNC/FIELD edges to a simulator
+
+Edges follow the same sources as the simulator's internal VSYNC
+(vsync_sources.py), so the pulse train can be jittered, drifted or faulty.
+Each falling edge is sent when it is due, stamped with its edge time on the
+shared monotonic clock, with the FIELD edge of the new field (--field) in
+the same datagram; the rising edge follows after the pulse width.
+
+    python3 simulator_web.py --edge-listen unix:/tmp/ledtester-edges.sock
+    python3 genlock_generator.py unix:/tmp/ledtester-edges.sock --rate 59.94 --field
+"""
+
+import argparse
+import time
+
+from edge_listener import EDGE_FIELD, EDGE_VSYNC, EdgeSender
+from simulator_web import parse_frame_rate
+from vsync_sources import JITTER_MODELS, NO_IMPAIRMENTS, GridSource, check_impairments, impair
+
+START_DELAY_US = 100000  # first edge this long after startup
+PULSE_WIDTH_US = 1000
+
+
+def now_us():
+    """Get the shared monotonic clock in microseconds (the simulator's engine clock)"""
+    return time.monotonic_ns() // 1000
+
+
+def sleep_until(deadline_us):
+    """Sleep until the monotonic clock reaches deadline_us"""
+    delay = deadline_us - now_us()
+    if delay > 0:
+        time.sleep(delay / 1000000.0)
+
+
+def run(sender, source, seconds=None, field=False, arrival_time=False, burst=False):
+    """Send edges from source until seconds have passed (forever if None); returns VSYNC pulses sent
+
+    With burst, edges are sent as fast as possible instead of when they are
+    due, for throughput tests.
+    """
+    wait = (lambda time_us: None) if burst else sleep_until
+    start = now_us() + START_DELAY_US
+    source.reset(start)
+    end = None if seconds is None else start + int(seconds * 1000000)
+    stamp = (lambda time_us: 0) if arrival_time else (lambda time_us: time_us)
+    odd = True
+    rise_us = None  # end of the current pulse
+    falls = 0
+    while True:
+        fall_us = source.next_edge()
+        if fall_us is None or (end is not None and fall_us > end):
+            break
+        if rise_us is not None and rise_us <= fall_us:
+            wait(rise_us)
+            sender.send([(EDGE_VSYNC, 0, stamp(rise_us))])
+        # (a pulse that starts before the last one ended stretches it)
+        wait(fall_us)
+        edges = [(EDGE_VSYNC, 1, stamp(fall_us))]
+        if field:
+            edges.insert(0, (EDGE_FIELD, int(odd), stamp(fall_us)))
+            odd = not odd
+        sender.send(edges)
+        falls += 1
+        rise_us = fall_us + PULSE_WIDTH_US
+    if rise_us is not None:
+        wait(rise_us)
+        sender.send([(EDGE_VSYNC, 0, stamp(rise_us))])
+    return falls
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('address', help='Simulator edge listener: unix:/path or [udp:]host:port')
+    parser.add_argument('--rate', default='24', help='VSYNC rate in fps, e.g. 59.94 or 60000/1001 (default: 24)')
+    parser.add_argument('--field', action='store_true', help='Toggle FIELD (odd/even) with every VSYNC edge')
+    parser.add_argument('--seconds', type=float, help='Stop after this long (default: run until Ctrl+C; required with --burst)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Edge jitter in us')
+    parser.add_argument('--jitter-model', choices=JITTER_MODELS, default='gaussian')
+    parser.add_argument('--drift-ppm', type=float, default=0.0, help='Peak frequency drift in ppm')
+    parser.add_argument('--drift-period', type=float, default=NO_IMPAIRMENTS.drift_period_s,
+                        help='Drift period in seconds (0 = constant offset)')
+    parser.add_argument('--drop', type=float, default=0.0, help='Probability of dropping a pulse')
+    parser.add_argument('--duplicate', type=float, default=0.0, help='Probability of doubling a pulse')
+    parser.add_argument('--seed', type=int, help='Random seed for jitter and faults')
+    parser.add_argument('--arrival-time', action='store_true',
+                        help='Send time 0 so the simulator stamps edges on arrival')
+    parser.add_argument('--burst', action='store_true',
+                        help='Send the edges of --seconds as fast as possible, waiting for room in the '
+                             'listener\'s queue (throughput test; with --arrival-time, as the '
+                             'stamps run ahead of the clock)')
+    args = parser.parse_args()
+    if args.burst and args.seconds is None:
+        parser.error("--burst needs --seconds")
+
+    impairments = NO_IMPAIRMENTS._replace(jitter_us=args.jitter, jitter_model=args.jitter_model,
+                                          drift_ppm=args.drift_ppm, drift_period_s=args.drift_period,
+                                          drop=args.drop, duplicate=args.duplicate)
+    try:
+        check_impairments(impairments)
+        rate = parse_frame_rate(args.rate)
+        source = impair(GridSource(rate), impairments, args.seed)
+    except (ValueError, ZeroDivisionError) as error:
+        parser.error(str(error))
+    try:
+        sender = EdgeSender(args.address, blocking=args.burst)
+    except (OSError, ValueError) as error:
+        parser.error(f"cannot send to {args.address}: {error}")
+    print(f"Sending {float(rate):.3f} fps VSYNC"
+          f"{' and FIELD' if args.field else ''} edges to {args.address}; Ctrl+C to stop")
+    try:
+        falls = run(sender, source, args.seconds, args.field, args.arrival_time, args.burst)
+    except KeyboardInterrupt:
+        falls = None
+    finally:
+        sender.close()
+    print(f"{sender.sent} records sent" + (f" ({falls} VSYNC pulses)" if falls is not None else "")
+          + f", {sender.dropped} datagrams refused")
+
+
+if __name__ == "__main__":
+    main()
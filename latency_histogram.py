@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Latency Histogram
+Log-bucketed histogram of integer µs latencies with O(1) recording
+
+Bucketing follows HDR Histogram: values below 2**SIGNIFICANT_BITS get one
+bucket each, and every power-of-two range above that is split into
+2**(SIGNIFICANT_BITS - 1) equal buckets, so any recorded value is known to
+within 1/64 of itself. Counts live in one preallocated array; recording is a
+bit_length(), a shift and an increment.
+"""
+
+from array import array
+
+SIGNIFICANT_BITS = 7
+SUB_BUCKETS = 1 << (SIGNIFICANT_BITS - 1)
+MAX_SHIFT = 40 - SIGNIFICANT_BITS  # values up to 2**40 µs (~12 days)
+BUCKETS = (MAX_SHIFT + 2) * SUB_BUCKETS
+MAX_VALUE = (1 << 40) - 1
+
+
+def bucket_index(value):
+    """Get the bucket of a non-negative value"""
+    shift = value.bit_length() - SIGNIFICANT_BITS
+    if shift <= 0:
+        return value
+    return (shift << (SIGNIFICANT_BITS - 1)) + (value >> shift)
+
+
+def bucket_range(index):
+    """Get the (lowest, highest) value that falls into bucket index"""
+    if index < 2 * SUB_BUCKETS:
+        return index, index
+    shift = (index >> (SIGNIFICANT_BITS - 1)) - 1
+    mantissa = index - (shift << (SIGNIFICANT_BITS - 1))
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Counts of latencies in µs; negative values (early) are recorded as 0"""
+
+    def __init__(self):
+        self.counts = array('Q', [0]) * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        """Add one latency"""
+        if value < 0:
+            value = 0
+        elif value > MAX_VALUE:
+            value = MAX_VALUE
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def reset(self):
+        """Forget every recorded value"""
+        self.counts = array('Q', [0]) * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def cumulative(self, bounds):
+        """Get the number of values at or below each bound (ascending, µs), then the total
+
+        A bound inside a bucket counts the whole bucket, so a count may
+        include values up to 1/64 above its bound.
+        """
+        counts = self.counts
+        results = []
+        running = start = 0
+        for bound in bounds:
+            stop = bucket_index(min(bound, MAX_VALUE)) + 1
+            running += sum(counts[start:stop])
+            results.append(running)
+            start = stop
+        results.append(running + sum(counts[start:]))
+        return results
+
+    def percentiles(self, fractions):
+        """Get the value at each fraction (0-1, ascending) of the recorded count
+
+        Each result is the highest value of its bucket, capped at the maximum
+        recorded value, so it never understates the latency.
+        """
+        counts = self.counts  # consistent enough without a lock; see summary()
+        total = sum(counts)
+        results = []
+        if not total:
+            return [0] * len(fractions)
+        seen = 0
+        targets = iter(fractions)
+        fraction = next(targets)
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            seen += count
+            while seen >= fraction * total:
+                results.append(min(bucket_range(index)[1], self.max))
+                fraction = next(targets, None)
+                if fraction is None:
+                    return results
+        while len(results) < len(fractions):
+            results.append(self.max)
+        return results
+
+    def summary(self):
+        """Get count, mean, p50, p99, p99.9 and max (µs) as a dictionary
+
+        Safe to call while another thread records: the figures may straddle
+        one or two concurrent updates but are never torn.
+        """
+        count = self.count
+        p50, p99, p999 = self.percentiles((0.5, 0.99, 0.999))
+        return {
+            "count": count,
+            "meanUs": round(self.total / count, 1) if count else 0,
+            "p50Us": p50,
+            "p99Us": p99,
+            "p999Us": p999,
+            "maxUs": self.max,
+        }
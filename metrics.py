@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Metrics
+Prometheus text exposition for /metrics
+
+Sources are callables returning metric families as
+(name, type, help, samples) tuples, where samples are (labels dict, value)
+pairs. Histogram values are (cumulative counts per LATENCY_BOUNDS_US and
++Inf, sum in µs), see histogram_value(). Sources read plain counters that
+their owners bump with `+= 1`; all formatting happens at scrape time, and
+a rendered page is reused for scrapes within `cache_seconds`.
+"""
+
+import threading
+import time
+
+from latency_histogram import LatencyHistogram
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Histogram bucket bounds (µs), exported in seconds
+LATENCY_BOUNDS_US = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000,
+                     100000, 250000, 500000, 1000000, 2500000, 5000000, 10000000)
+
+
+def histogram_value(histogram, bounds=LATENCY_BOUNDS_US):
+    """Freeze a LatencyHistogram into a histogram sample value"""
+    return histogram.cumulative(bounds), histogram.total
+
+
+def format_labels(labels):
+    """Format a labels dict as {name="value",...} (empty string for no labels)"""
+    if not labels:
+        return ''
+    escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for name, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def format_value(value):
+    """Format a sample value"""
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+
+def render_families(families, bounds=LATENCY_BOUNDS_US):
+    """Render metric families in the Prometheus text format"""
+    lines = []
+    le = [repr(bound / 1000000) for bound in bounds] + ['+Inf']
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if kind != 'histogram':
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                continue
+            cumulative, total_us = value
+            for bound, count in zip(le, cumulative):
+                lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total_us / 1000000!r}")
+            lines.append(f"{name}_count{format_labels(labels)} {cumulative[-1]}")
+    lines.append('')
+    return '\n'.join(lines).encode()
+
+
+class HTTPMetrics:
+    """Request counts and latency histograms per route"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (route, method, status code) -> count
+        self.latency = {}   # route -> LatencyHistogram
+
+    def observe(self, route, method, code, latency_us):
+        """Count one finished request"""
+        with self.lock:
+            key = (route, method, code)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get(route)
+            if histogram is None:
+                histogram = self.latency[route] = LatencyHistogram()
+            histogram.record(latency_us)
+
+    def metric_families(self):
+        """Get the HTTP metric families"""
+        with self.lock:
+            requests = sorted(self.requests.items())
+            latency = [(route, histogram_value(histogram)) for route, histogram in sorted(self.latency.items())]
+        return [
+            ('ledtester_http_requests_total', 'counter', 'HTTP requests by route, method and status',
+             [({'route': route, 'method': method, 'code': code}, count)
+              for (route, method, code), count in requests]),
+            ('ledtester_http_request_duration_seconds', 'histogram', 'HTTP request handling time by route',
+             [({'route': route}, value) for route, value in latency]),
+        ]
+
+
+class MetricsExporter:
+    """Collects metric families from its sources and renders them for /metrics"""
+
+    def __init__(self, *sources, cache_seconds=1.0):
+        self.http = HTTPMetrics()
+        self.sources = sources + (self.http.metric_families, self.metric_families)
+        self.cache_seconds = cache_seconds
+        self.lock = threading.Lock()
+        self.body = None
+        self.rendered_at = 0.0
+        self.scrapes = 0
+        self.renders = 0
+
+    def metric_families(self):
+        """Get the exporter's own metric families"""
+        return [
+            ('ledtester_metrics_scrapes_total', 'counter', '/metrics requests', [({}, self.scrapes)]),
+            ('ledtester_metrics_renders_total', 'counter', '/metrics pages rendered (the rest were cached)',
+             [({}, self.renders)]),
+        ]
+
+    def render(self):
+        """Get the exposition text, re-rendered at most once per cache interval"""
+        with self.lock:
+            self.scrapes += 1
+            now = time.monotonic()
+            if self.body is None or now - self.rendered_at >= self.cache_seconds:
+                self.renders += 1
+                self.body = render_families(family for source in self.sources for family in source())
+                self.rendered_at = now
+            return self.body
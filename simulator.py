@@ -4,309 +4,19 @@ ESP32 LED Tester Simulator
 Simulates the ESP32 LED tester without hardware
 """
 
-import time
 import threading
-import json
-import random
-from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
 import tkinter as tk
-from tkinter import ttk
 import math
 
-class LEDTesterSimulator:
-    def __init__(self):
-        # LED GPIO Mappings (12 o'clock position = LED1, clockwise)
-        self.LED_PINS = [13, 14, 27, 26, 25, 33, 32, 16, 17, 18, 19, 23]
-        
-        # Control Variables
-        self.fast_circle_interval = 1  # ms per LED
-        self.frame_rate = 24  # fps
-        self.fast_circle_enabled = True
-        self.frame_circle_enabled = True
-        self.d4_output_enabled = False
-        self.vsync_lock_enabled = False
-        
-        # VSYNC and Field Detection Variables
-        self.vsync_active = False
-        self.last_vsync_time = 0
-        self.vsync_interval = 0
-        self.measured_frame_rate = 0.0
-        self.field_odd = False
-        self.last_field_change_time = 0
-        self.odd_field_duration = 0
-        self.even_field_duration = 0
-        self.vsync_detected = False
-        self.vsync_lock_trigger = False
-        
-        # Timing Variables
-        self.last_fast_circle_update = 0
-        self.last_frame_circle_update = 0
-        self.current_fast_led = 0
-        self.frame_circle_phase = False  # false = LED1&6, true = LED4&10
-        
-        # LED States (True = ON, False = OFF)
-        self.led_states = [False] * 12
-        self.d4_output_state = False
-        
-        # Frame timing
-        self.frame_interval = 1000 / (self.frame_rate * 2)  # Half frame duration
-        
-        # VSYNC simulation
-        self.vsync_simulation_running = False
-        self.vsync_thread = None
-        
-        # Start the main loop in a separate thread
-        self.running = True
-        self.main_thread = threading.Thread(target=self.main_loop, daemon=True)
-        self.main_thread.start()
-        
-        # Start VSYNC simulation
-        self.start_vsync_simulation()
-    
-    def start_vsync_simulation(self):
-        """Start VSYNC signal simulation"""
-        if not self.vsync_simulation_running:
-            self.vsync_simulation_running = True
-            self.vsync_thread = threading.Thread(target=self.vsync_simulation_loop, daemon=True)
-            self.vsync_thread.start()
-    
-    def vsync_simulation_loop(self):
-        """Simulate VSYNC signals at 24fps"""
-        while self.vsync_simulation_running:
-            # Simulate VSYNC falling edge
-            current_time = time.time() * 1000000  # Convert to microseconds
-            if self.last_vsync_time > 0:
-                self.vsync_interval = current_time - self.last_vsync_time
-                self.measured_frame_rate = 1000000.0 / self.vsync_interval
-            self.last_vsync_time = current_time
-            self.vsync_active = True
-            self.vsync_detected = True
-            
-            # Trigger circle reset if VSYNC lock is enabled
-            if self.vsync_lock_enabled:
-                self.vsync_lock_trigger = True
-            
-            # Simulate VSYNC rising edge after a short time
-            time.sleep(0.001)  # 1ms
-            self.vsync_active = False
-            
-            # Wait for next frame (24fps = ~41.67ms)
-            time.sleep(1.0 / 24.0)
-    
-    def update_frame_interval(self):
-        """Update frame interval based on frame rate"""
-        self.frame_interval = 1000 / (self.frame_rate * 2)
-    
-    def main_loop(self):
-        """Main simulation loop"""
-        while self.running:
-            current_time = time.time() * 1000  # Convert to milliseconds
-            
-            # Handle VSYNC lock trigger
-            if self.vsync_lock_trigger:
-                self.vsync_lock_trigger = False
-                
-                # Reset both circles to start position
-                if self.fast_circle_enabled:
-                    self.current_fast_led = 0
-                    self.last_fast_circle_update = current_time
-                
-                if self.frame_circle_enabled:
-                    self.frame_circle_phase = False
-                    self.last_frame_circle_update = current_time
-            
-            # Handle fast circle animation
-            if self.fast_circle_enabled and (current_time - self.last_fast_circle_update >= self.fast_circle_interval):
-                self.handle_fast_circle()
-                self.last_fast_circle_update = current_time
-            
-            # Handle frame circle animation
-            if self.frame_circle_enabled and (current_time - self.last_frame_circle_update >= self.frame_interval):
-                self.handle_frame_circle()
-                self.last_frame_circle_update = current_time
-            
-            time.sleep(0.001)  # 1ms delay to prevent excessive CPU usage
-    
-    def handle_fast_circle(self):
-        """Handle fast circle LED animation"""
-        # Turn off all LEDs first
-        for i in range(12):
-            self.led_states[i] = False
-        
-        # Turn on current LED
-        self.led_states[self.current_fast_led] = True
-        
-        # Move to next LED
-        self.current_fast_led = (self.current_fast_led + 1) % 12
-    
-    def handle_frame_circle(self):
-        """Handle frame circle LED animation"""
-        # Turn off frame circle LEDs
-        self.led_states[0] = False   # LED1
-        self.led_states[6] = False   # LED7
-        self.led_states[3] = False   # LED4
-        self.led_states[9] = False   # LED10
-        
-        if self.frame_circle_phase:
-            # Phase 2: LED4 and LED10
-            self.led_states[3] = True   # LED4
-            self.led_states[9] = True   # LED10
-            # D4 output: LOW during LED4&10 phase
-            if self.d4_output_enabled:
-                self.d4_output_state = False
-        else:
-            # Phase 1: LED1 and LED7
-            self.led_states[0] = True   # LED1
-            self.led_states[6] = True   # LED7
-            # D4 output: HIGH during LED1&7 phase
-            if self.d4_output_enabled:
-                self.d4_output_state = True
-        
-        self.frame_circle_phase = not self.frame_circle_phase
-    
-    def get_status(self):
-        """Get current status as dictionary"""
-        return {
-            "fastCircleEnabled": self.fast_circle_enabled,
-            "frameCircleEnabled": self.frame_circle_enabled,
-            "d4OutputEnabled": self.d4_output_enabled,
-            "vsyncLockEnabled": self.vsync_lock_enabled,
-            "fastCircleInterval": self.fast_circle_interval,
-            "frameRate": self.frame_rate,
-            "currentFastLED": self.current_fast_led,
-            "frameCirclePhase": self.frame_circle_phase,
-            "vsyncActive": self.vsync_active,
-            "vsyncDetected": self.vsync_detected,
-            "measuredFrameRate": self.measured_frame_rate,
-            "fieldOdd": self.field_odd,
-            "oddFieldDuration": self.odd_field_duration,
-            "evenFieldDuration": self.even_field_duration,
-            "ledStates": self.led_states,
-            "d4OutputState": self.d4_output_state
-        }
-    
-    def update_fast_circle(self, enabled=None, interval=None):
-        """Update fast circle settings"""
-        if enabled is not None:
-            self.fast_circle_enabled = enabled
-        if interval is not None:
-            self.fast_circle_interval = max(1, interval)
-    
-    def update_frame_circle(self, enabled=None, frame_rate=None, d4_output=None, vsync_lock=None):
-        """Update frame circle settings"""
-        if enabled is not None:
-            self.frame_circle_enabled = enabled
-        if frame_rate is not None:
-            self.frame_rate = max(1, min(120, frame_rate))
-            self.update_frame_interval()
-        if d4_output is not None:
-            self.d4_output_enabled = d4_output
-        if vsync_lock is not None:
-            self.vsync_lock_enabled = vsync_lock
-    
-    def stop(self):
-        """Stop the simulator"""
-        self.running = False
-        self.vsync_simulation_running = False
-
+# The engine and HTTP server are shared with the web-only simulator
+import simulator_web
+from simulator_web import LEDTesterSimulator
 
-class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
-    def __init__(self, simulator, *args, **kwargs):
-        self.simulator = simulator
-        super().__init__(*args, **kwargs)
-    
-    def do_GET(self):
-        """Handle GET requests"""
-        parsed_path = urlparse(self.path)
-        
-        if parsed_path.path == '/':
-            self.serve_main_page()
-        elif parsed_path.path == '/api/status':
-            self.serve_status()
-        else:
-            self.send_error(404)
-    
-    def do_POST(self):
-        """Handle POST requests"""
-        parsed_path = urlparse(self.path)
-        
-        if parsed_path.path == '/api/fastCircle':
-            self.handle_fast_circle_update()
-        elif parsed_path.path == '/api/frameCircle':
-            self.handle_frame_circle_update()
-        else:
-            self.send_error(404)
-    
-    def serve_main_page(self):
-        """Serve the main HTML page"""
-        html = self.get_main_page_html()
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(html.encode())
-    
-    def serve_status(self):
-        """Serve status API"""
-        status = self.simulator.get_status()
-        response = json.dumps(status)
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(response.encode())
+class LEDTesterHTTPHandler(simulator_web.LEDTesterHTTPHandler):
+    """Same routes as the web-only simulator, serving the ESP32 page"""
     
-    def handle_fast_circle_update(self):
-        """Handle fast circle update request"""
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length).decode('utf-8')
-        params = parse_qs(post_data)
-        
-        enabled = None
-        interval = None
-        
-        if 'enabled' in params:
-            enabled = params['enabled'][0] == 'true'
-        if 'interval' in params:
-            interval = int(params['interval'][0])
-        
-        self.simulator.update_fast_circle(enabled, interval)
-        
-        response = '{"status":"ok"}'
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(response.encode())
-    
-    def handle_frame_circle_update(self):
-        """Handle frame circle update request"""
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length).decode('utf-8')
-        params = parse_qs(post_data)
-        
-        enabled = None
-        frame_rate = None
-        d4_output = None
-        vsync_lock = None
-        
-        if 'enabled' in params:
-            enabled = params['enabled'][0] == 'true'
-        if 'frameRate' in params:
-            frame_rate = int(params['frameRate'][0])
-        if 'd4Output' in params:
-            d4_output = params['d4Output'][0] == 'true'
-        if 'vsyncLock' in params:
-            vsync_lock = params['vsyncLock'][0] == 'true'
-        
-        self.simulator.update_frame_circle(enabled, frame_rate, d4_output, vsync_lock)
-        
-        response = '{"status":"ok"}'
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(response.encode())
-    
-    def get_main_page_html(self):
+    @classmethod
+    def get_main_page_html(cls):
         """Get the main page HTML (same as ESP32 version)"""
         return '''<!DOCTYPE html>
 <html>
@@ -496,18 +206,9 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
                 document.getElementById('measuredFrameRate').textContent = 
                     data.measuredFrameRate.toFixed(2) + ' fps';
                 
-                // Check for frame rate mismatch
-                const frameRateError = document.getElementById('frameRateError');
-                if (data.vsyncDetected && data.measuredFrameRate > 0) {
-                    const difference = Math.abs(data.measuredFrameRate - data.frameRate);
-                    if (difference > 0.5) { // Allow 0.5 fps tolerance
-                        frameRateError.textContent = `MISMATCH! (Measured: ${data.measuredFrameRate.toFixed(2)} fps)`;
-                    } else {
-                        frameRateError.textContent = '';
-                    }
-                } else {
-                    frameRateError.textContent = '';
-                }
+                // Frame rate mismatch is decided by the server
+                document.getElementById('frameRateError').textContent = data.frameRateMismatch ?
+                    `MISMATCH! (Measured: ${data.measuredFrameRate.toFixed(2)} fps)` : '';
                 
                 // Update field status
                 const fieldStatus = data.fieldOdd ? 'ODD' : 'EVEN';
@@ -601,20 +302,21 @@ class LEDVisualizer:
     
     def update_display(self):
         """Update the LED display"""
-        status = self.simulator.get_status()
+        # One snapshot per frame so LEDs and labels always agree
+        state = self.simulator.snapshot()
         
         # Update LED states
-        for i, led_state in enumerate(status['ledStates']):
-            color = 'red' if led_state else 'gray'
+        for i in range(12):
+            color = 'red' if state.led_mask >> i & 1 else 'gray'
             self.canvas.itemconfig(self.led_circles[i], fill=color)
         
         # Update status labels
-        self.fast_led_label.config(text=f"Fast LED: {status['currentFastLED'] + 1}")
+        self.fast_led_label.config(text=f"Fast LED: {state.current_fast_led + 1}")
         
-        phase_text = "LED4&10" if status['frameCirclePhase'] else "LED1&7"
+        phase_text = "LED4&10" if state.frame_circle_phase else "LED1&7"
         self.frame_phase_label.config(text=f"Frame Phase: {phase_text}")
         
-        d4_text = "ON" if status['d4OutputState'] else "OFF"
+        d4_text = "ON" if state.d4_output_state else "OFF"
         self.d4_output_label.config(text=f"D4 Output: {d4_text}")
         
         # Schedule next update
@@ -627,24 +329,26 @@ class LEDVisualizer:
 
 def create_handler(simulator):
     """Create HTTP handler with simulator reference"""
-    def handler(*args, **kwargs):
-        return LEDTesterHTTPHandler(simulator, *args, **kwargs)
-    return handler
+    return simulator_web.create_handler(simulator, LEDTesterHTTPHandler)
 
 
 def main():
     """Main function"""
+    args = simulator_web.parse_server_args("ESP32 LED Tester Simulator")
     print("Starting ESP32 LED Tester Simulator...")
     
     # Create simulator
     simulator = LEDTesterSimulator()
+    simulator_web.start_vsync_replay(simulator, args)
+    listener = simulator_web.start_edge_listener(simulator, args.edge_listen)
+    recorders = simulator_web.start_recorders(simulator, args)
     
     # Start web server
-    port = 8080
-    handler = create_handler(simulator)
-    httpd = HTTPServer(('localhost', port), handler)
+    httpd = simulator_web.create_server(simulator, args.host, args.port, args.workers,
+                                        args.max_streams, LEDTesterHTTPHandler)
+    port = httpd.server_address[1]
     
-    print(f"Web server starting on http://localhost:{port}")
+    print(f"Web server starting on http://{args.host}:{port}")
     print("Press Ctrl+C to stop")
     
     # Start web server in a separate thread
@@ -657,11 +361,14 @@ def main():
         visualizer.run()
     except KeyboardInterrupt:
         print("\nShutting down...")
+        if listener is not None:
+            listener.stop()
         simulator.stop()
+        for recorder in recorders:
+            recorder.close()
         httpd.shutdown()
+        httpd.server_close()
 
 
 if __name__ == "__main__":
     main()
-
-
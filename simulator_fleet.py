@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Fleet Version
+Hosts many simulated LED testers in one process on one port
+
+All devices share one clock, one EventScheduler and one engine thread. Per-
+device state lives in arrays indexed by device id rather than in per-object
+attributes. The fast and frame circles are computed in closed form from each
+device's anchors (last step time, LED index, phase), so a device costs no
+events between reconfigurations; only VSYNC edges are scheduled, one pending
+heap entry per device with VSYNC detection enabled.
+
+Each device is served under /device/<id>/api/... with the same routes as
+simulator_web.py; GET /api/fleet summarises every device. Transitions due on
+the same microsecond can resolve in a different order than in the
+event-driven LEDTesterSimulator, whose order follows its scheduling history.
+"""
+
+import json
+import re
+import threading
+from array import array
+from fractions import Fraction
+
+from event_scheduler import EventScheduler, MonotonicClock, VirtualClock
+import metrics
+import simulator_web
+import status_bin
+from simulator_web import (
+    FRAME_CIRCLE_CLEAR, FRAME_PHASE_MASKS, LED_COUNT, MAX_PENDING_CONFIGS,
+    SimulatorState, encode_status_json, parse_frame_rate, status_from_state,
+)
+from vsync_pll import DEFAULT_BANDWIDTH_HZ, MAX_BANDWIDTH_HZ, MIN_BANDWIDTH_HZ
+from frame_rate_estimator import EMPTY_STATS, rate_mismatch
+from field_generator import DEFAULT_FIELD_RATE, EMPTY_FIELD_STATS
+from vsync_sources import NO_IMPAIRMENTS
+
+# Device flag bits
+FAST_CIRCLE = 1 << 0
+FRAME_CIRCLE = 1 << 1
+D4_OUTPUT = 1 << 2
+VSYNC_LOCK = 1 << 3
+VSYNC_DETECTION = 1 << 4
+VSYNC_DETECTED = 1 << 5
+D4_STATE = 1 << 6     # D4 level at the frame anchor
+FRAME_PHASE = 1 << 7  # next frame phase at the frame anchor
+
+DEFAULT_FLAGS = FAST_CIRCLE | FRAME_CIRCLE | VSYNC_DETECTION
+# Both circles start with a step and a flip at time 0, like LEDTesterSimulator
+START_FLAGS = DEFAULT_FLAGS | FRAME_PHASE
+START_MASK = (1 << 0 & FRAME_CIRCLE_CLEAR) | FRAME_PHASE_MASKS[0]
+
+
+def clamp_rate(rate):
+    """Parse and clamp a frame or VSYNC rate to 1-120 fps"""
+    return max(Fraction(1), min(Fraction(120), parse_frame_rate(rate)))
+
+
+class FleetSimulator:
+    """N LED testers driven by one scheduler, with array-backed state"""
+
+    def __init__(self, count, virtual_time=False, batch_interval=0.005):
+        self.count = count
+        self.virtual_time = virtual_time
+        # The engine thread wakes at most once per batch interval; events
+        # still fire at their exact due times and readers catch up first
+        self.batch_us = int(batch_interval * 1000000)
+        self.clock = VirtualClock() if virtual_time else MonotonicClock()
+        self.scheduler = EventScheduler(self.clock)
+        self.vsync_pulse_width = 1000  # us
+
+        # Guards all device arrays; notified to wake main_loop early
+        self.wakeup = threading.Condition()
+
+        now = self.clock.now_us()
+        self.flags = array('B', [START_FLAGS]) * count
+        self.base_mask = array('H', [START_MASK]) * count  # LED mask at the anchors
+        self.base_version = array('Q', [2]) * count        # state version at the anchors
+
+        # Fast circle: step k lights LED (fast_led + k - 1) at fast_anchor + k * interval
+        self.fast_interval = array('I', [1]) * count      # ms per LED
+        self.fast_anchor = array('q', [now]) * count      # us
+        self.fast_led = array('B', [1]) * count           # next LED to light after the anchor
+
+        # Frame circle: flip k at frame_anchor + k half frames (exact rate);
+        # flips up to frame_tick are folded into the base state
+        self.frame_num = array('q', [24]) * count
+        self.frame_den = array('q', [1]) * count
+        self.frame_anchor = array('q', [now]) * count
+        self.frame_tick = array('q', [0]) * count
+
+        # VSYNC: edge k at vsync_start + k periods (exact rate)
+        self.vsync_num = array('q', [24]) * count
+        self.vsync_den = array('q', [1]) * count
+        self.vsync_start = array('q', [0]) * count
+        self.vsync_count = array('q', [0]) * count        # edges since vsync_start
+        self.last_edge = array('q', [0]) * count
+        self.vsync_interval = array('q', [0]) * count
+        # Devices lock in 'reset' mode only; the bandwidth is kept for /api/status
+        self.pll_bandwidth = array('d', [DEFAULT_BANDWIDTH_HZ]) * count
+
+        # /api/config batches waiting for VSYNC (device -> list) or a timestamp
+        self.vsync_configs = {}
+        self.timed_configs = array('H', [0]) * count
+        self.config_sequence = 0
+
+        self.status_cache = {}  # (device, encoder) -> (version, serialized status)
+
+        # Counters for /metrics (plain ints, bumped under the engine lock)
+        self.engine_iterations = 0
+        self.engine_timer_wakeups = 0
+        self.engine_notify_wakeups = 0
+        self.vsync_edges = 0
+        self.vsync_lock_resets = 0
+
+        self.vsync_callbacks = [self.vsync_edge_callback(i) for i in range(count)]
+        self.devices = [FleetDevice(self, i) for i in range(count)]
+
+        # Spread the devices' VSYNC edges across one period
+        period = 1000000 // 24
+        for i in range(count):
+            self.vsync_start[i] = now + i * period // count
+            self.schedule_vsync(i)
+
+        self.running = not virtual_time
+        if not virtual_time:
+            self.engine_thread = threading.Thread(target=self.main_loop, daemon=True)
+            self.engine_thread.start()
+
+    def now_us(self):
+        """Get current engine time in microseconds"""
+        return self.clock.now_us()
+
+    def main_loop(self):
+        """Engine loop: fire due events in batches of at most batch_us"""
+        with self.wakeup:
+            while self.running:
+                self.engine_iterations += 1
+                self.scheduler.run_due(self.clock.now_us())
+                next_due = self.scheduler.next_due()
+                if next_due is None:
+                    self.wakeup.wait()
+                    self.engine_notify_wakeups += 1
+                else:
+                    delay = max(next_due - self.clock.now_us(), self.batch_us)
+                    if self.wakeup.wait(delay / 1000000.0):
+                        self.engine_notify_wakeups += 1
+                    else:
+                        self.engine_timer_wakeups += 1
+
+    def catch_up(self):
+        """Fire events the batching engine has not reached yet (call with the lock held)"""
+        if not self.virtual_time:
+            self.scheduler.run_due(self.clock.now_us())
+
+    def advance(self, seconds):
+        """Run a virtual-time fleet forward; returns number of events fired"""
+        if not self.virtual_time:
+            raise RuntimeError("advance() requires FleetSimulator(virtual_time=True)")
+        with self.wakeup:
+            return self.scheduler.run_until(self.clock.now_us() + int(round(seconds * 1000000)))
+
+    def stop(self):
+        """Stop the engine thread"""
+        with self.wakeup:
+            self.running = False
+            self.wakeup.notify()
+
+    # Closed-form circle state
+
+    def frame_deadline(self, i, tick):
+        """Get the absolute time (us) of frame flip number tick of device i"""
+        return self.frame_anchor[i] + tick * 1000000 * self.frame_den[i] // (2 * self.frame_num[i])
+
+    def frame_flips(self, i, now_us):
+        """Count device i's frame flips since its base state, up to now_us"""
+        elapsed = now_us - self.frame_anchor[i]
+        if not self.flags[i] & FRAME_CIRCLE or elapsed < 0:
+            return 0
+        # Largest k with k * 1e6 * den // (2 * num) <= elapsed
+        tick = ((elapsed + 1) * 2 * self.frame_num[i] - 1) // (1000000 * self.frame_den[i])
+        return max(0, tick - self.frame_tick[i])
+
+    def fast_steps(self, i, now_us):
+        """Count device i's fast circle steps since its anchor, up to now_us"""
+        elapsed = now_us - self.fast_anchor[i]
+        if not self.flags[i] & FAST_CIRCLE or elapsed < 0:
+            return 0
+        return elapsed // (self.fast_interval[i] * 1000)
+
+    def outputs(self, i, now_us):
+        """Get (fast steps, frame flips, LED mask, D4 state, next frame phase) of device i"""
+        flags = self.flags[i]
+        steps = self.fast_steps(i, now_us)
+        flips = self.frame_flips(i, now_us)
+        mask = self.base_mask[i]
+        d4 = bool(flags & D4_STATE)
+        phase = bool(flags & FRAME_PHASE)
+
+        fast_time = None
+        if steps:
+            # A fast step lights one LED and clears the rest
+            fast_time = self.fast_anchor[i] + steps * self.fast_interval[i] * 1000
+            mask = 1 << (self.fast_led[i] + steps - 1) % LED_COUNT
+        if flips:
+            shown = phase ^ (not flips & 1)
+            phase ^= bool(flips & 1)
+            if fast_time is None or self.frame_deadline(i, self.frame_tick[i] + flips) > fast_time:
+                mask = (mask & FRAME_CIRCLE_CLEAR) | FRAME_PHASE_MASKS[shown]
+            if flags & D4_OUTPUT:
+                d4 = not shown
+        return steps, flips, mask, d4, phase
+
+    def freeze(self, i, now_us):
+        """Fold device i's steps and flips up to now_us into its base state"""
+        steps, flips, mask, d4, phase = self.outputs(i, now_us)
+        self.fast_anchor[i] += steps * self.fast_interval[i] * 1000
+        self.fast_led[i] = (self.fast_led[i] + steps) % LED_COUNT
+        self.frame_tick[i] += flips
+        self.base_mask[i] = mask
+        self.base_version[i] += steps + flips
+        self.flags[i] = (self.flags[i] & ~(D4_STATE | FRAME_PHASE)
+                         | (D4_STATE if d4 else 0) | (FRAME_PHASE if phase else 0))
+
+    def snapshot(self, i):
+        """Build a SimulatorState for device i at the current engine time"""
+        with self.wakeup:
+            self.catch_up()
+            now = self.clock.now_us()
+            flags = self.flags[i]
+            steps, flips, mask, d4, phase = self.outputs(i, now)
+            active = bool(flags & VSYNC_DETECTION and flags & VSYNC_DETECTED
+                          and now < self.last_edge[i] + self.vsync_pulse_width)
+            interval = self.vsync_interval[i]
+            fps = 1000000.0 / interval if interval else 0.0  # single interval: no estimator per device
+            # Versions count every transition; an edge adds two (fall and rise)
+            version = self.base_version[i] + steps + flips - active
+            return SimulatorState(
+                version, now,
+                bool(flags & FAST_CIRCLE), bool(flags & FRAME_CIRCLE), bool(flags & D4_OUTPUT),
+                bool(flags & VSYNC_LOCK), bool(flags & VSYNC_DETECTION),
+                Fraction(self.vsync_num[i], self.vsync_den[i]), self.fast_interval[i],
+                Fraction(self.frame_num[i], self.frame_den[i]),
+                (self.fast_led[i] + steps) % LED_COUNT, phase, mask, d4,
+                active, bool(flags & VSYNC_DETECTED),
+                fps,
+                False, 0, 0,
+                'reset', self.pll_bandwidth[i], False, 0.0, 0.0,
+                EMPTY_STATS, rate_mismatch(fps, Fraction(self.frame_num[i], self.frame_den[i])),
+                False, DEFAULT_FIELD_RATE, 0, 0, EMPTY_FIELD_STATS, EMPTY_FIELD_STATS,
+                'generated', NO_IMPAIRMENTS,
+            )
+
+    # VSYNC edges
+
+    def vsync_deadline(self, i, edge_index):
+        """Get the absolute time (us) of VSYNC edge number edge_index of device i"""
+        return self.vsync_start[i] + edge_index * 1000000 * self.vsync_den[i] // self.vsync_num[i]
+
+    def schedule_vsync(self, i):
+        """Arm device i's next VSYNC edge, or cancel it while detection is off"""
+        if self.flags[i] & VSYNC_DETECTION:
+            self.scheduler.schedule(i, self.vsync_deadline(i, self.vsync_count[i]), self.vsync_callbacks[i])
+        else:
+            self.scheduler.cancel(i)
+
+    def vsync_edge_callback(self, i):
+        """Make the scheduler callback for device i's VSYNC edges"""
+        def on_vsync_edge(due_us):
+            self.handle_vsync_edge(i, due_us)
+        return on_vsync_edge
+
+    def handle_vsync_edge(self, i, edge_us):
+        """VSYNC falling edge of device i (runs on the engine thread)"""
+        if self.last_edge[i] > 0:
+            self.vsync_interval[i] = edge_us - self.last_edge[i]
+        self.last_edge[i] = edge_us
+        self.flags[i] |= VSYNC_DETECTED
+        self.base_version[i] += 2
+        self.vsync_count[i] += 1
+        self.vsync_edges += 1
+
+        # VSYNC lock restarts both circles from this edge
+        flags = self.flags[i]
+        if flags & VSYNC_LOCK:
+            # Steps and flips due on the edge itself are replaced by the restart
+            self.vsync_lock_resets += 1
+            self.freeze(i, edge_us - 1)
+            if flags & FAST_CIRCLE:
+                self.fast_anchor[i] = edge_us
+                self.fast_led[i] = 0
+            if flags & FRAME_CIRCLE:
+                self.frame_anchor[i] = edge_us
+                self.frame_tick[i] = 0
+                self.flags[i] &= ~FRAME_PHASE
+
+        configs = self.vsync_configs.pop(i, None)
+        if configs:
+            for config in configs:
+                self.configure(i, edge_us, config)
+        self.schedule_vsync(i)
+
+    # Configuration
+
+    def configure(self, i, now_us, config):
+        """Apply parsed settings to device i at now_us (call with the lock held)"""
+        self.freeze(i, now_us)
+        self.base_version[i] += 1
+        flags = self.flags[i]
+
+        fast = config.get('fast_circle', {})
+        if fast.get('interval') is not None:
+            self.fast_interval[i] = max(1, fast['interval'])
+        if fast.get('enabled') is not None:
+            flags = flags | FAST_CIRCLE if fast['enabled'] else flags & ~FAST_CIRCLE
+        # Too long since the last step (or just enabled): step now
+        if flags & FAST_CIRCLE and self.fast_anchor[i] + self.fast_interval[i] * 1000 < now_us:
+            self.fast_anchor[i] = now_us
+            self.base_mask[i] = 1 << self.fast_led[i]
+            self.fast_led[i] = (self.fast_led[i] + 1) % LED_COUNT
+            self.base_version[i] += 1
+
+        frame = config.get('frame_circle', {})
+        if frame.get('frame_rate') is not None or not flags & FRAME_CIRCLE:
+            # Restart the flip grid at the last flip, as LEDTesterSimulator
+            # does on a rate change or when the frame timer is not running
+            self.frame_anchor[i] = self.frame_deadline(i, self.frame_tick[i])
+            self.frame_tick[i] = 0
+        if frame.get('frame_rate') is not None:
+            rate = clamp_rate(frame['frame_rate'])
+            self.frame_num[i], self.frame_den[i] = rate.numerator, rate.denominator
+        for key, bit in (('enabled', FRAME_CIRCLE), ('d4_output', D4_OUTPUT), ('vsync_lock', VSYNC_LOCK)):
+            if frame.get(key) is not None:
+                flags = flags | bit if frame[key] else flags & ~bit
+        if frame.get('pll_bandwidth') is not None:
+            self.pll_bandwidth[i] = min(MAX_BANDWIDTH_HZ, max(MIN_BANDWIDTH_HZ, frame['pll_bandwidth']))
+        self.flags[i] = flags
+        if flags & FRAME_CIRCLE and self.frame_deadline(i, self.frame_tick[i] + 1) < now_us:
+            # Too long since the last flip: flip now and start a new grid
+            self.frame_anchor[i] = now_us
+            self.frame_tick[i] = 0
+            shown = bool(flags & FRAME_PHASE)
+            self.base_mask[i] = (self.base_mask[i] & FRAME_CIRCLE_CLEAR) | FRAME_PHASE_MASKS[shown]
+            if flags & D4_OUTPUT:
+                flags = flags & ~D4_STATE if shown else flags | D4_STATE
+            self.flags[i] = flags ^ FRAME_PHASE
+            self.base_version[i] += 1
+
+        vsync = config.get('vsync', {})
+        if vsync.get('rate') is not None:
+            rate = clamp_rate(vsync['rate'])
+            # Re-anchor the edge grid at the last edge
+            if self.vsync_count[i] > 0:
+                self.vsync_start[i] = self.vsync_deadline(i, self.vsync_count[i] - 1)
+                self.vsync_count[i] = 1
+            self.vsync_num[i], self.vsync_den[i] = rate.numerator, rate.denominator
+        if vsync.get('enabled') is not None:
+            if vsync['enabled'] and not flags & VSYNC_DETECTION:
+                self.vsync_start[i] = now_us
+                self.vsync_count[i] = 0
+            self.flags[i] = flags | VSYNC_DETECTION if vsync['enabled'] else flags & ~VSYNC_DETECTION
+        self.schedule_vsync(i)
+
+    def update_config(self, i, config, apply='now'):
+        """Apply a parsed configuration to device i (see LEDTesterSimulator.update_config)"""
+        if config.get('frame_circle', {}).get('vsync_lock_mode') not in (None, 'reset'):
+            raise ValueError("Fleet devices support only the 'reset' VSYNC lock mode")
+        with self.wakeup:
+            self.catch_up()
+            now = self.clock.now_us()
+            if apply == 'now' or (apply != 'vsync' and apply <= now):
+                self.configure(i, now, config)
+                self.wakeup.notify()
+                return True, now
+            pending = self.vsync_configs.get(i, ())
+            if len(pending) + self.timed_configs[i] >= MAX_PENDING_CONFIGS:
+                raise ValueError("Too many pending configurations")
+            if apply == 'vsync':
+                if not self.flags[i] & VSYNC_DETECTION:
+                    raise ValueError("VSYNC detection is disabled")
+                self.vsync_configs.setdefault(i, []).append(config)
+                return False, None
+
+            self.timed_configs[i] += 1
+            def on_config_event(due_us):
+                self.timed_configs[i] -= 1
+                self.configure(i, due_us, config)
+            self.config_sequence += 1
+            self.scheduler.schedule(('config', self.config_sequence), apply, on_config_event)
+            self.wakeup.notify()
+            return False, apply
+
+    def summary(self):
+        """Get a compact status of every device for /api/fleet"""
+        with self.wakeup:
+            self.catch_up()
+            now = self.clock.now_us()
+            devices = []
+            for i in range(self.count):
+                _, _, mask, d4, _ = self.outputs(i, now)
+                interval = self.vsync_interval[i]
+                devices.append([i, mask, int(d4), round(1000000.0 / interval, 3) if interval else 0.0])
+            return {
+                "devices": self.count,
+                "engineTimeUs": now,
+                "eventsProcessed": self.scheduler.events_processed,
+                # [device id, LED bitmask, D4 state, measured VSYNC fps]
+                "state": devices,
+            }
+
+    def metric_families(self):
+        """Get fleet-wide counters and gauges for /metrics (see metrics.py)"""
+        return [
+            ('ledtester_fleet_devices', 'gauge', 'Simulated devices', [({}, self.count)]),
+            ('ledtester_engine_loop_iterations_total', 'counter', 'Real-time engine loop passes',
+             [({}, self.engine_iterations)]),
+            ('ledtester_engine_wakeups_total', 'counter', 'Engine wake-ups: deadline reached or notified early',
+             [({'reason': 'timer'}, self.engine_timer_wakeups),
+              ({'reason': 'notify'}, self.engine_notify_wakeups)]),
+            ('ledtester_engine_events_total', 'counter', 'Scheduler events fired',
+             [({}, self.scheduler.events_processed)]),
+            ('ledtester_vsync_edges_total', 'counter', 'VSYNC falling edges handled, all devices',
+             [({}, self.vsync_edges)]),
+            ('ledtester_vsync_lock_resets_total', 'counter', 'Circle resets triggered by VSYNC lock, all devices',
+             [({}, self.vsync_lock_resets)]),
+        ]
+
+
+class FleetDevice:
+    """One fleet device behind the LEDTesterSimulator interface the HTTP handler uses"""
+
+    def __init__(self, fleet, index):
+        self.fleet = fleet
+        self.index = index
+
+    @property
+    def running(self):
+        return self.fleet.running
+
+    @property
+    def virtual_time(self):
+        return self.fleet.virtual_time
+
+    def now_us(self):
+        """Get current engine time in microseconds"""
+        return self.fleet.now_us()
+
+    def snapshot(self):
+        """Get this device's current state"""
+        return self.fleet.snapshot(self.index)
+
+    def get_status(self):
+        """Get current status as dictionary"""
+        return status_from_state(self.snapshot())
+
+    def encoded_status(self, encoder, state=None):
+        """Get a serialized status, encoded once per state version and format"""
+        if state is None:
+            state = self.snapshot()
+        key = (self.index, encoder)
+        version, body = self.fleet.status_cache.get(key, (None, b''))
+        if version != state.version:
+            body = encoder(state)
+            self.fleet.status_cache[key] = (state.version, body)
+        return body
+
+    def status_json(self, state=None):
+        """Get the serialized /api/status body"""
+        return self.encoded_status(encode_status_json, state)
+
+    def status_bin(self, state=None):
+        """Get the packed /api/status.bin record"""
+        return self.encoded_status(status_bin.encode, state)
+
+    def update_config(self, config, apply='now'):
+        """Apply a parsed configuration atomically"""
+        return self.fleet.update_config(self.index, config, apply)
+
+    def update_fast_circle(self, enabled=None, interval=None):
+        """Update fast circle settings"""
+        self.update_config({'fast_circle': {'enabled': enabled, 'interval': interval}})
+
+    def update_frame_circle(self, enabled=None, frame_rate=None, d4_output=None, vsync_lock=None,
+                            vsync_lock_mode=None, pll_bandwidth=None):
+        """Update frame circle settings (raises ValueError for the 'pll' lock mode)"""
+        self.update_config({'frame_circle': {'enabled': enabled, 'frame_rate': frame_rate,
+                                             'd4_output': d4_output, 'vsync_lock': vsync_lock,
+                                             'vsync_lock_mode': vsync_lock_mode,
+                                             'pll_bandwidth': pll_bandwidth}})
+
+    def update_vsync_detection(self, enabled=None, rate=None):
+        """Update VSYNC detection settings and simulated VSYNC rate"""
+        self.update_config({'vsync': {'enabled': enabled, 'rate': rate}})
+
+
+class FleetHTTPHandler(simulator_web.LEDTesterHTTPHandler):
+    """Serves each device's API under /device/<id>/api/..."""
+
+    DEVICE_PATH = re.compile(r'/device/(\d+)(/api/.*)$')
+    METRIC_ROUTES = simulator_web.LEDTesterHTTPHandler.METRIC_ROUTES | {'/api/fleet'}
+
+    def __init__(self, fleet, *args, **kwargs):
+        self.fleet = fleet
+        super().__init__(None, *args, **kwargs)
+
+    def parse_request(self):
+        """Parse the request line and headers; no device is routed yet"""
+        self.device_routed = False
+        return super().parse_request()
+
+    def route_device(self):
+        """Point the handler at the device named in the path; False if there is none"""
+        match = self.DEVICE_PATH.match(self.path)
+        if match is None or int(match.group(1)) >= self.fleet.count:
+            return False
+        self.simulator = self.fleet.devices[int(match.group(1))]
+        self.path = match.group(2)
+        self.device_routed = True
+        return True
+
+    def metric_route(self):
+        """Get the route label for /metrics, with the device id folded into {id}"""
+        route = super().metric_route()
+        if getattr(self, 'device_routed', False) and route != 'other':
+            return '/device/{id}' + route
+        return route
+
+    def do_GET(self):
+        """Handle GET requests"""
+        if self.path == '/api/fleet':
+            self.send_body(json.dumps(self.fleet.summary()).encode(), 'application/json')
+        elif self.path == '/metrics' and self.metrics is not None:
+            self.send_body(self.metrics.render(), metrics.CONTENT_TYPE)
+        elif self.route_device():
+            super().do_GET()
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        """Handle POST requests"""
+        if self.route_device():
+            super().do_POST()
+        else:
+            self.send_error(404)
+
+
+def create_fleet_server(fleet, host='localhost', port=8080, workers=16):
+    """Create a pooled HTTP server for every device in the fleet"""
+    exporter = metrics.MetricsExporter(fleet.metric_families)
+    def handler(*args, **kwargs):
+        return FleetHTTPHandler(fleet, *args, metrics=exporter, **kwargs)
+    return simulator_web.PooledHTTPServer((host, port), handler, workers=workers)
+
+
+def main():
+    """Main function"""
+    # Streams, recorders and VSYNC sources are per-device features the fleet does not have
+    parser = simulator_web.http_arg_parser("ESP32 LED Tester Simulator (Fleet Version)")
+    parser.add_argument('--devices', type=int, default=100, help='Number of simulated devices (default: 100)')
+    args = parser.parse_args()
+    print(f"Starting ESP32 LED Tester fleet with {args.devices} devices...")
+
+    fleet = FleetSimulator(args.devices)
+    httpd = create_fleet_server(fleet, args.host, args.port, args.workers)
+    port = httpd.server_address[1]
+
+    print(f"Device APIs on http://{args.host}:{port}/device/<0-{args.devices - 1}>/api/...")
+    print(f"Fleet summary on http://{args.host}:{port}/api/fleet")
+    print("Press Ctrl+C to stop")
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        fleet.stop()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,24 +7,251 @@ Simulates the ESP32 LED tester without hardware, using only web interface
 import time
 import threading
 import json
+import queue
+import argparse
+import selectors
+import socket
+import gzip
+import hashlib
+import itertools
 import random
 from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import math
+from collections import deque, namedtuple
+from fractions import Fraction
+
+from event_scheduler import EventScheduler, MonotonicClock, VirtualClock
+import status_bin
+from transition_trace import TransitionTrace, TRACE_LED, TRACE_D4, TRACE_VSYNC, TRACE_FIELD, TRACE_KINDS
+from trace_file import TraceRecorder, TraceFileWriter
+from latency_histogram import LatencyHistogram
+from metrics import MetricsExporter, histogram_value, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from vcd_export import VCDWriter
+from vsync_pll import VsyncPLL, MIN_BANDWIDTH_HZ, MAX_BANDWIDTH_HZ
+from frame_rate_estimator import FrameRateEstimator, MIN_INTERVALS, rate_mismatch, stats_to_dict
+from field_generator import FieldGenerator, FieldDurationStats, field_stats_to_dict
+from edge_listener import EdgeListener, EDGE_KINDS, EDGE_FIELD
+from vsync_sources import (ExternalSource, GridSource, ReplaySource, NO_IMPAIRMENTS, REPLAY_UNITS, check_impairments, impair,
+                           impairments_to_dict)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# LED bank bitmask: bit i = LED(i+1)
+LED_COUNT = 12
+FRAME_PHASE_MASKS = (
+    (1 << 0) | (1 << 6),  # Phase 1: LED1 and LED7
+    (1 << 3) | (1 << 9),  # Phase 2: LED4 and LED10
+)
+FRAME_CIRCLE_CLEAR = ((1 << LED_COUNT) - 1) & ~(FRAME_PHASE_MASKS[0] | FRAME_PHASE_MASKS[1])
+
+# Bool lists for each 6-bit half of the mask, joined at the API edge
+_LED_HALF_STATES = [[bool(m >> i & 1) for i in range(6)] for m in range(64)]
+
+
+def led_mask_to_list(mask):
+    """Convert an LED bitmask to the 12-bool list used by the JSON API"""
+    return _LED_HALF_STATES[mask & 63] + _LED_HALF_STATES[mask >> 6]
+
+
+# Transition types whose lateness behind their scheduled time is measured
+LATENESS_KINDS = ('fastCircle', 'frameCircle', 'vsync', 'field')
+SKIP_KINDS = ('fastCircle', 'frameCircle', 'vsync')  # events dropped after a host stall
+
+# Immutable engine state record. The engine publishes a complete new record
+# after every transition (under the engine lock) and readers take the current
+# one without locking, so all fields of a record belong together.
+SimulatorState = namedtuple('SimulatorState', [
+    'version', 'time_us',
+    'fast_circle_enabled', 'frame_circle_enabled', 'd4_output_enabled',
+    'vsync_lock_enabled', 'vsync_detection_enabled', 'vsync_rate',
+    'fast_circle_interval', 'frame_rate',
+    'current_fast_led', 'frame_circle_phase', 'led_mask', 'd4_output_state',
+    'vsync_active', 'vsync_detected', 'measured_frame_rate',
+    'field_odd', 'odd_field_duration', 'even_field_duration',
+    'vsync_lock_mode', 'pll_bandwidth', 'pll_locked', 'pll_phase_error_us', 'pll_frequency_offset_ppm',
+    'vsync_interval_stats', 'frame_rate_mismatch',
+    'field_enabled', 'field_rate', 'field_asymmetry_us', 'field_jitter_us', 'odd_field_stats', 'even_field_stats',
+    'vsync_source', 'vsync_impairments',
+])
+
+
+def status_from_state(state):
+    """Convert a SimulatorState to the /api/status dictionary"""
+    return {
+        "version": state.version,
+        "timeUs": state.time_us,
+        "fastCircleEnabled": state.fast_circle_enabled,
+        "frameCircleEnabled": state.frame_circle_enabled,
+        "d4OutputEnabled": state.d4_output_enabled,
+        "vsyncLockEnabled": state.vsync_lock_enabled,
+        "vsyncDetectionEnabled": state.vsync_detection_enabled,
+        "vsyncRate": float(state.vsync_rate),
+        "vsyncRateExact": format_frame_rate(state.vsync_rate),
+        "fastCircleInterval": state.fast_circle_interval,
+        "frameRate": float(state.frame_rate),
+        "frameRateExact": format_frame_rate(state.frame_rate),
+        "currentFastLED": state.current_fast_led,
+        "frameCirclePhase": state.frame_circle_phase,
+        "vsyncActive": state.vsync_active,
+        "vsyncDetected": state.vsync_detected,
+        "measuredFrameRate": state.measured_frame_rate,
+        "vsyncIntervalStats": stats_to_dict(state.vsync_interval_stats),
+        "vsyncSource": state.vsync_source,
+        "vsyncImpairments": impairments_to_dict(state.vsync_impairments),
+        "frameRateMismatch": state.frame_rate_mismatch,
+        "fieldOdd": state.field_odd,
+        "oddFieldDuration": state.odd_field_duration,
+        "evenFieldDuration": state.even_field_duration,
+        "fieldEnabled": state.field_enabled,
+        "fieldRate": float(state.field_rate),
+        "fieldRateExact": format_frame_rate(state.field_rate),
+        "fieldAsymmetryUs": state.field_asymmetry_us,
+        "fieldJitterUs": state.field_jitter_us,
+        "oddFieldStats": field_stats_to_dict(state.odd_field_stats),
+        "evenFieldStats": field_stats_to_dict(state.even_field_stats),
+        "vsyncLockMode": state.vsync_lock_mode,
+        "pllBandwidth": state.pll_bandwidth,
+        "pllLocked": state.pll_locked,
+        "pllPhaseErrorUs": state.pll_phase_error_us,
+        "pllFrequencyOffsetPpm": state.pll_frequency_offset_ppm,
+        "ledStates": led_mask_to_list(state.led_mask),
+        "d4OutputState": state.d4_output_state
+    }
+
+
+def encode_status_json(state):
+    """Serialize a SimulatorState as the /api/status JSON body"""
+    return json.dumps(status_from_state(state)).encode()
+
+
+# /api/config keys (named as in /api/status) -> (settings group, keyword, type)
+CONFIG_FIELDS = {
+    "fastCircleEnabled": ('fast_circle', 'enabled', bool),
+    "fastCircleInterval": ('fast_circle', 'interval', int),
+    "frameCircleEnabled": ('frame_circle', 'enabled', bool),
+    "frameRate": ('frame_circle', 'frame_rate', Fraction),
+    "d4OutputEnabled": ('frame_circle', 'd4_output', bool),
+    "vsyncLockEnabled": ('frame_circle', 'vsync_lock', bool),
+    "vsyncLockMode": ('frame_circle', 'vsync_lock_mode', str),
+    "pllBandwidth": ('frame_circle', 'pll_bandwidth', float),
+    "vsyncDetectionEnabled": ('vsync', 'enabled', bool),
+    "vsyncRate": ('vsync', 'rate', Fraction),
+}
+MAX_PENDING_CONFIGS = 64
+
+# VSYNC lock modes: hard circle reset at every edge, or follow a PLL (vsync_pll.py)
+VSYNC_LOCK_MODES = ('reset', 'pll')
+
+# VSYNC edge sources: the generated pulse train, a replayed capture, or none
+# while edges arrive through the edge listener (vsync_sources.py)
+VSYNC_SOURCES = ('generated', 'replay', 'external')
+VSYNC_POLL_S = 0.1  # longest VSYNC thread sleep, so source changes apply promptly
+
+# Ingested edges are accepted from this long before now to one VSYNC period after
+MAX_EDGE_AGE_US = 1000000
+INGEST_REJECT_REASONS = ('stale', 'future', 'reordered')
+
+
+def parse_config(document):
+    """Validate an /api/config document
+    
+    Returns (config, apply): config maps settings groups to keyword
+    arguments for LEDTesterSimulator.configure_*, apply is 'now', 'vsync'
+    or an engine timestamp in microseconds. Raises ValueError on bad input.
+    """
+    if not isinstance(document, dict):
+        raise ValueError("Configuration must be a JSON object")
+    config = {}
+    apply = 'now'
+    for key, value in document.items():
+        if key == 'apply':
+            if value in ('now', 'vsync'):
+                apply = value
+            elif isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+                apply = value
+            else:
+                raise ValueError("apply must be \"now\", \"vsync\" or an engine time in microseconds")
+            continue
+        if key not in CONFIG_FIELDS:
+            raise ValueError(f"Unknown setting {key}")
+        group, keyword, kind = CONFIG_FIELDS[key]
+        if kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{key} must be true or false")
+        elif kind is int:
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ValueError(f"{key} must be a positive integer")
+        elif kind is str:
+            if value not in VSYNC_LOCK_MODES:
+                raise ValueError(f"{key} must be one of {', '.join(VSYNC_LOCK_MODES)}")
+        elif kind is float:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0:
+                raise ValueError(f"{key} must be a positive number")
+            value = float(value)
+        else:
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"{key} must be a number or a ratio like \"24000/1001\"")
+            try:
+                value = parse_frame_rate(value)
+            except (ValueError, ZeroDivisionError, OverflowError):
+                raise ValueError(f"Invalid {key}") from None
+            if value <= 0:
+                raise ValueError(f"{key} must be positive")
+        config.setdefault(group, {})[keyword] = value
+    return config, apply
+
+
+def parse_frame_rate(value):
+    """Parse a frame rate into an exact Fraction
+    
+    Accepts numbers, "24000/1001" style ratios and decimals. Decimals close to
+    an NTSC-family rate (n * 1000/1001, e.g. 23.976, 29.97, 59.94) snap to it.
+    """
+    if isinstance(value, Fraction):
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        rate = Fraction(value)
+        if '/' in value:
+            return rate
+    elif isinstance(value, int):
+        return Fraction(value)
+    else:
+        rate = Fraction(str(value))
+    
+    if rate.denominator != 1:
+        ntsc = Fraction(round(rate * Fraction(1001, 1000)) * 1000, 1001)
+        if abs(rate - ntsc) < Fraction(1, 200):
+            return ntsc
+        rate = rate.limit_denominator(1001)
+    return rate
+
+
+def format_frame_rate(rate):
+    """Format an exact frame rate as 24 or 24000/1001"""
+    if rate.denominator == 1:
+        return str(rate.numerator)
+    return f"{rate.numerator}/{rate.denominator}"
+
 
 class LEDTesterSimulator:
-    def __init__(self):
+    def __init__(self, virtual_time=False, trace_capacity=65536):
         # LED GPIO Mappings (12 o'clock position = LED1, clockwise)
         self.LED_PINS = [13, 14, 27, 26, 25, 33, 32, 16, 17, 18, 19, 23]
         
         # Control Variables
         self.fast_circle_interval = 1  # ms per LED
-        self.frame_rate = 24  # fps
+        self.frame_rate = Fraction(24)  # fps (exact, see parse_frame_rate)
         self.fast_circle_enabled = True
         self.frame_circle_enabled = True
         self.d4_output_enabled = False
         self.vsync_lock_enabled = False
+        self.vsync_lock_mode = 'reset'  # see VSYNC_LOCK_MODES
         self.vsync_detection_enabled = True
         
         # VSYNC and Field Detection Variables
@@ -32,12 +259,20 @@ class LEDTesterSimulator:
         self.last_vsync_time = 0
         self.vsync_interval = 0
         self.measured_frame_rate = 0.0
+        self.frame_rate_estimator = FrameRateEstimator()  # interval statistics over recent edges
+        self.frame_rate_mismatch = False
         self.field_odd = False
-        self.last_field_change_time = 0
+        self.last_field_change_time = None
         self.odd_field_duration = 0
         self.even_field_duration = 0
+        
+        # Interlaced FIELD source (off by default) and duration statistics per parity
+        self.field_enabled = False
+        self.field_generator = FieldGenerator()
+        self.next_field_odd = True  # parity of the scheduled FIELD edge
+        self.field_stats = {True: FieldDurationStats(), False: FieldDurationStats()}
         self.vsync_detected = False
-        self.vsync_lock_trigger = False
+        self.vsync_lock_edges = deque()  # VSYNC edge times (us) waiting for a lock reset
         
         # Timing Variables
         self.last_fast_circle_update = 0
@@ -45,19 +280,97 @@ class LEDTesterSimulator:
         self.current_fast_led = 0
         self.frame_circle_phase = False  # false = LED1&6, true = LED4&10
         
-        # LED States (True = ON, False = OFF)
-        self.led_states = [False] * 12
+        # LED States as a bitmask (bit i = LED i+1 ON) plus the D4 bit
+        self.led_mask = 0
         self.d4_output_state = False
         
-        # Frame timing
-        self.frame_interval = 1000 / (self.frame_rate * 2)  # Half frame duration
+        # Frame timing: flip k is due at frame_anchor_time + k half frames,
+        # computed from integer tick counts so rational rates never drift
+        self.frame_interval = float(Fraction(1000) / (self.frame_rate * 2))  # Half frame duration (ms)
+        self.frame_anchor_time = 0  # us
+        self.frame_tick = 0
+        
+        # PLL lock mode: VSYNC edges steer an oscillator whose edges reset
+        # the circles, so reference jitter is filtered out
+        self.pll = VsyncPLL(1000000 / self.frame_rate)
         
         # VSYNC simulation
         self.vsync_simulation_running = False
         self.vsync_thread = None
+        self.vsync_pulse_width = 1000  # us
+        self.vsync_rate = Fraction(24)  # simulated VSYNC fps (exact)
+        
+        # VSYNC edge stream (vsync_sources.py): the generated pulse train or a
+        # replay, wrapped in any impairments; edges are pulled one at a time
+        self.vsync_grid = GridSource(self.vsync_rate)
+        self.vsync_replay = None  # ReplaySource given to update_vsync_source
+        self.vsync_external = ExternalSource()
+        self.vsync_source_kind = 'generated'  # see VSYNC_SOURCES
+        self.vsync_impairments = NO_IMPAIRMENTS
+        self.vsync_seed = None
+        self.vsync_source = self.vsync_grid
+        self.next_vsync_us = None  # pending falling edge (None: the source ran out)
+        self.last_vsync_fall_us = None  # last edge taken from the source
+        
+        # Engine clock and scheduler. Virtual time runs without threads and
+        # only moves when advance() is called; real time follows the
+        # monotonic clock and sleeps until the next due event.
+        self.virtual_time = virtual_time
+        self.clock = VirtualClock() if virtual_time else MonotonicClock()
+        self.scheduler = EventScheduler(self.clock)
+        
+        # Guards engine state; notified to wake main_loop early
+        self.wakeup = threading.Condition()
+        
+        # Published state snapshot (see SimulatorState); advance() defers
+        # publishing to once per call since nothing can read mid-run
+        self.state = None
+        self.state_version = 0
+        self.publish_deferred = False
+        self.recent_states = deque(maxlen=256)  # for streaming subscribers
+        
+        # Every LED, D4 and VSYNC edge with its engine timestamp
+        self.trace = TransitionTrace(trace_capacity)
+        
+        # /api/config batches waiting for the next VSYNC edge or a timestamp
+        self.vsync_configs = []
+        self.timed_configs = 0
+        self.config_sequence = itertools.count()
+        self.status_cache = {}  # encoder -> (version, serialized status)
+        
+        # How late transitions fire behind their deadlines (real time only;
+        # in virtual time every event runs exactly at its due time)
+        self.lateness = {kind: LatencyHistogram() for kind in LATENESS_KINDS}
+        self.track_lateness = not virtual_time
+        # Deadlines dropped because the host stalled for longer than a period
+        self.skipped_events = {kind: 0 for kind in SKIP_KINDS}
+        
+        # Edges from other processes (edge_listener.py): arrival times of
+        # ingested VSYNC edges waiting for their lock, and arrival to lock
+        self.edge_listener = None
+        self.ingest_pending = deque()
+        self.ingest_latency = LatencyHistogram()
+        self.last_ingest_us = {}  # edge kind -> time of the last accepted edge
+        self.ingest_rejected = {reason: 0 for reason in INGEST_REJECT_REASONS}
+        
+        # Counters for /metrics (plain ints, bumped under the engine lock)
+        self.engine_iterations = 0
+        self.engine_timer_wakeups = 0
+        self.engine_notify_wakeups = 0
+        self.fast_circle_steps = 0
+        self.frame_circle_flips = 0
+        self.d4_toggles = 0
+        self.vsync_edges = 0
+        self.vsync_lock_resets = 0
+        self.field_edges = 0
+        
+        self.running = not virtual_time
+        self.start_engine()
+        self.publish_state()
+        if virtual_time:
+            return
         
         # Start the main loop in a separate thread
-        self.running = True
         self.main_thread = threading.Thread(target=self.main_loop, daemon=True)
         self.main_thread.start()
         
@@ -72,169 +385,1147 @@ class LEDTesterSimulator:
             self.vsync_thread.start()
     
     def vsync_simulation_loop(self):
-        """Simulate VSYNC signals at 24fps"""
+        """Simulate VSYNC pulses at the edge times the VSYNC source hands out"""
+        with self.wakeup:
+            self.start_vsync_source(self.clock.now_us())
+        
+        rise_us = None  # end of the current pulse
         while self.vsync_simulation_running:
-            # Skip VSYNC simulation if detection is disabled
-            if not self.vsync_detection_enabled:
-                time.sleep(1.0 / 24.0)
-                continue
-                
-            # Simulate VSYNC falling edge
-            current_time = time.time() * 1000000  # Convert to microseconds
-            if self.last_vsync_time > 0:
-                self.vsync_interval = current_time - self.last_vsync_time
-                self.measured_frame_rate = 1000000.0 / self.vsync_interval
-            self.last_vsync_time = current_time
-            self.vsync_active = True
-            self.vsync_detected = True
-            
-            # Trigger circle reset if VSYNC lock is enabled
-            if self.vsync_lock_enabled:
-                self.vsync_lock_trigger = True
-            
-            # Simulate VSYNC rising edge after a short time
-            time.sleep(0.001)  # 1ms
-            self.vsync_active = False
+            # Wait for the next falling edge or the end of the pulse
+            with self.wakeup:
+                due = self.next_vsync_us
+            if rise_us is not None and (due is None or rise_us <= due):
+                due = rise_us
+            delay = VSYNC_POLL_S * 1000000 if due is None else due - self.clock.now_us()
+            if delay > 0:
+                time.sleep(min(delay / 1000000.0, VSYNC_POLL_S))
+            if not self.vsync_simulation_running:
+                break
             
-            # Wait for next frame (24fps = ~41.67ms)
-            time.sleep(1.0 / 24.0)
+            with self.wakeup:
+                now = self.clock.now_us()
+                self.skip_missed_vsync_edges(now)
+                deadline = self.next_vsync_us
+                if rise_us is not None and rise_us <= now and (deadline is None or rise_us <= deadline):
+                    # Simulate VSYNC rising edge after the pulse width
+                    self.lateness['vsync'].record(now - rise_us)
+                    self.handle_vsync_release(rise_us)
+                    self.publish_state()
+                    rise_us = None
+                    continue
+                if deadline is None or deadline > now:
+                    continue  # Not due yet, or the source changed while sleeping
+                self.take_vsync_edge(deadline)
+                
+                # Skip VSYNC simulation if detection is disabled
+                if not self.vsync_detection_enabled:
+                    continue
+                
+                # Simulate VSYNC falling edge; a pulse that starts before the
+                # last one ended stretches it
+                self.lateness['vsync'].record(now - deadline)
+                self.handle_vsync_edge(deadline)
+                self.publish_state(deadline)
+                rise_us = deadline + self.vsync_pulse_width
+                if self.vsync_lock_edges:
+                    self.wakeup.notify()
+    
+    def start_vsync_source(self, start_us):
+        """Restart the VSYNC source with its first edge at start_us"""
+        self.vsync_source.reset(start_us)
+        self.last_vsync_fall_us = None
+        self.schedule_vsync()
+    
+    def schedule_vsync(self):
+        """Pull the next edge from the VSYNC source (in virtual time, arm its timer)"""
+        edge_us = self.vsync_source.next_edge()
+        if edge_us is not None and self.last_vsync_fall_us is not None:
+            # Jitter never reorders edges
+            edge_us = max(edge_us, self.last_vsync_fall_us + 1)
+        self.next_vsync_us = edge_us
+        if self.virtual_time:
+            if edge_us is None:
+                self.scheduler.cancel('vsync')
+            else:
+                self.scheduler.schedule('vsync', edge_us, self.on_vsync_fall_event)
+    
+    def take_vsync_edge(self, edge_us):
+        """Move past the pending source edge at edge_us"""
+        self.last_vsync_fall_us = edge_us
+        self.schedule_vsync()
+    
+    def vsync_period_us(self):
+        """Get the VSYNC source's period, or the nominal one until it is known"""
+        return self.vsync_source.period_us or 1000000 / self.vsync_rate
+    
+    def skip_missed_vsync_edges(self, now_us):
+        """Drop edges more than one period in the past (host stalled)"""
+        period = self.vsync_period_us()
+        while self.next_vsync_us is not None and now_us - self.next_vsync_us > period:
+            self.take_vsync_edge(self.next_vsync_us)
+            self.skipped_events['vsync'] += 1
+    
+    def handle_vsync_edge(self, current_time):
+        """Handle a VSYNC falling edge (current_time in microseconds)"""
+        if self.last_vsync_time > 0:
+            self.vsync_interval = current_time - self.last_vsync_time
+        self.frame_rate_estimator.add_edge(current_time)
+        self.measured_frame_rate = self.frame_rate_estimator.rate
+        self.update_frame_rate_mismatch()
+        self.last_vsync_time = current_time
+        self.vsync_active = True
+        self.vsync_detected = True
+        self.vsync_edges += 1
+        self.trace.record(current_time, TRACE_VSYNC, 1)
+        
+        # Configurations waiting for this edge
+        if self.vsync_configs:
+            configs, self.vsync_configs = self.vsync_configs, []
+            for config in configs:
+                self.apply_config(config, current_time)
+        
+        # Queue a circle reset at this edge if VSYNC lock is enabled
+        if self.vsync_lock_enabled:
+            self.vsync_lock_edges.append(current_time)
+    
+    def update_frame_rate_mismatch(self):
+        """Compare the median VSYNC rate with the frame rate setting"""
+        estimator = self.frame_rate_estimator
+        self.frame_rate_mismatch = (estimator.count >= MIN_INTERVALS
+                                    and rate_mismatch(estimator.median_rate, self.frame_rate))
+    
+    def handle_vsync_release(self, current_time):
+        """Handle the VSYNC rising edge that ends the pulse (current_time in microseconds)"""
+        self.vsync_active = False
+        self.trace.record(current_time, TRACE_VSYNC, 0)
+    
+    def ingest_edges(self, edges):
+        """Handle a batch of (kind, value, time_us, received_us) edges from the edge listener
+        
+        Edges stamped more than MAX_EDGE_AGE_US ago or more than one VSYNC
+        period ahead of the engine clock, and edges earlier than the last one
+        of their kind, are counted in ingest_rejected and dropped.
+        """
+        with self.wakeup:
+            now_us = self.clock.now_us()
+            earliest_us = now_us - MAX_EDGE_AGE_US
+            latest_us = now_us + self.vsync_period_us()
+            for kind, value, time_us, received_us in edges:
+                reason = self.reject_edge(kind, time_us, earliest_us, latest_us)
+                if reason is not None:
+                    self.ingest_rejected[reason] += 1
+                    continue
+                self.last_ingest_us[kind] = time_us
+                if kind == EDGE_FIELD:
+                    self.handle_field_edge(time_us, bool(value))
+                elif not self.vsync_detection_enabled:
+                    continue
+                elif value:
+                    queued = len(self.vsync_lock_edges)
+                    self.handle_vsync_edge(time_us)
+                    if len(self.vsync_lock_edges) > queued:
+                        self.ingest_pending.append(received_us)
+                else:
+                    self.handle_vsync_release(time_us)
+                self.publish_state(time_us)
+            if self.vsync_lock_edges:
+                self.wakeup.notify()
+    
+    def reject_edge(self, kind, time_us, earliest_us, latest_us):
+        """Get why an ingested edge is dropped, or None to accept it"""
+        if time_us < earliest_us:
+            return 'stale'
+        if time_us > latest_us:
+            return 'future'
+        last_us = self.last_ingest_us.get(kind)
+        if last_us is not None and time_us < last_us:
+            return 'reordered'
+        return None
+    
+    def ingest_report(self):
+        """Get the edge listener counters and latencies (µs) for /api/ingest"""
+        listener = self.edge_listener
+        if listener is None:
+            return {"listening": False}
+        report = listener.report()
+        report["rejected"] = dict(self.ingest_rejected)
+        report["ingestToLockUs"] = self.ingest_latency.summary()
+        return report
+    
+    def handle_field_edge(self, current_time, odd):
+        """Handle a FIELD pin change (current_time in microseconds), as fieldISR does"""
+        if self.last_field_change_time is not None:
+            duration = current_time - self.last_field_change_time
+            if self.field_odd:
+                self.odd_field_duration = duration
+            else:
+                self.even_field_duration = duration
+            self.field_stats[self.field_odd].add(duration)
+        self.field_odd = odd
+        self.last_field_change_time = current_time
+        self.field_edges += 1
+        self.trace.record(current_time, TRACE_FIELD, int(odd))
+    
+    def apply_vsync_lock(self, now_us):
+        """Reset both circles to start position and restart their timers at now_us"""
+        self.vsync_lock_resets += 1
+        
+        if self.fast_circle_enabled:
+            self.current_fast_led = 0
+            self.last_fast_circle_update = now_us / 1000
+            self.schedule_fast_circle(now_us + self.fast_circle_interval * 1000)
+        
+        if self.frame_circle_enabled:
+            self.frame_circle_phase = False
+            self.last_frame_circle_update = now_us / 1000
+            self.frame_anchor_time = now_us
+            self.frame_tick = 1
+            self.schedule_frame_circle(self.frame_deadline(1))
+    
+    def lock_to_vsync_edge(self, edge_us):
+        """Lock the circles to a VSYNC edge: reset them now, or steer the PLL"""
+        if self.vsync_lock_mode == 'pll':
+            self.pll.update(edge_us)
+            self.scheduler.schedule('pll', round(self.pll.next_edge_us), self.on_pll_edge_event)
+        else:
+            self.apply_vsync_lock(edge_us)
+    
+    def on_pll_edge_event(self, due_us):
+        """PLL oscillator edge: reset the circles on the filtered VSYNC timebase"""
+        self.apply_vsync_lock(due_us)
+        self.scheduler.schedule('pll', self.pll.advance(), self.on_pll_edge_event)
+        self.publish_state(due_us)
+    
+    def start_engine(self):
+        """Schedule the first events; both circles step immediately"""
+        now = self.clock.now_us()
+        self.schedule_fast_circle(now)
+        self.frame_anchor_time = now
+        self.frame_tick = 0
+        self.schedule_frame_circle(now)
+        if self.virtual_time:
+            self.start_vsync_source(now)
+    
+    def schedule_fast_circle(self, due_us):
+        """Arm the fast circle timer, or cancel it while disabled"""
+        if self.fast_circle_enabled:
+            self.scheduler.schedule('fast', due_us, self.on_fast_circle_event)
+        else:
+            self.scheduler.cancel('fast')
+    
+    def schedule_frame_circle(self, due_us):
+        """Arm the frame circle timer, or cancel it while disabled"""
+        if self.frame_circle_enabled:
+            self.scheduler.schedule('frame', due_us, self.on_frame_circle_event)
+        else:
+            self.scheduler.cancel('frame')
+    
+    def on_fast_circle_event(self, due_us):
+        """Fast circle step"""
+        if self.track_lateness:
+            self.lateness['fastCircle'].record(self.clock.now_us() - due_us)
+        self.fast_circle_steps += 1
+        self.handle_fast_circle()
+        self.trace.record(due_us, TRACE_LED, self.led_mask)
+        self.last_fast_circle_update = due_us / 1000
+        self.schedule_fast_circle(self.skip_missed_steps(due_us + self.fast_circle_interval * 1000))
+        self.publish_state(due_us)
+    
+    def skip_missed_steps(self, due_us):
+        """Move a step deadline a host stall left behind to the first one at or after now
+        
+        The skipped steps still advance the LED so the circle stays on its
+        grid. Virtual time fires every event on its deadline, so it never
+        skips.
+        """
+        late_us = self.clock.now_us() - due_us
+        if late_us <= 0:
+            return due_us
+        interval_us = self.fast_circle_interval * 1000
+        missed = -(-late_us // interval_us)
+        self.skipped_events['fastCircle'] += missed
+        self.current_fast_led = (self.current_fast_led + missed) % LED_COUNT
+        return due_us + missed * interval_us
+    
+    def frame_deadline(self, tick):
+        """Get the absolute time (us) of frame circle flip number tick"""
+        rate = self.frame_rate
+        return self.frame_anchor_time + tick * 1000000 * rate.denominator // (2 * rate.numerator)
+    
+    def reanchor_frame_circle(self):
+        """Move the flip grid anchor to the last flip (tick 1 is then the next flip)"""
+        if self.frame_tick > 0:
+            self.frame_anchor_time = self.frame_deadline(self.frame_tick - 1)
+            self.frame_tick = 1
+    
+    def rearm_frame_circle(self, now_us):
+        """Re-anchor the flip grid at the last flip after a rate or enable change"""
+        self.reanchor_frame_circle()
+        if self.frame_tick == 0 or self.frame_deadline(1) < now_us:
+            # Too long since the last flip: flip now and start a new grid
+            self.frame_anchor_time = now_us
+            self.frame_tick = 0
+        self.schedule_frame_circle(self.frame_deadline(self.frame_tick))
+    
+    def on_frame_circle_event(self, due_us):
+        """Frame circle phase flip (also drives D4)"""
+        if self.track_lateness:
+            self.lateness['frameCircle'].record(self.clock.now_us() - due_us)
+        self.frame_circle_flips += 1
+        d4_output_state = self.d4_output_state
+        self.handle_frame_circle()
+        self.trace.record(due_us, TRACE_LED, self.led_mask)
+        if self.d4_output_state != d4_output_state:
+            self.d4_toggles += 1
+            self.trace.record(due_us, TRACE_D4, int(self.d4_output_state))
+        self.last_frame_circle_update = due_us / 1000
+        self.frame_tick += 1
+        self.skip_missed_flips()
+        self.schedule_frame_circle(self.frame_deadline(self.frame_tick))
+        self.publish_state(due_us)
+    
+    def skip_missed_flips(self):
+        """Move frame_tick to the first flip at or after now if a host stall left it behind
+        
+        Skipping an odd number of flips inverts the phase, so the flips that
+        follow show the phase of their tick.
+        """
+        rate = self.frame_rate
+        elapsed_us = self.clock.now_us() - self.frame_anchor_time
+        # frame_deadline(tick) >= now from this tick on
+        first_tick = -(-elapsed_us * 2 * rate.numerator // (1000000 * rate.denominator))
+        missed = first_tick - self.frame_tick
+        if missed > 0:
+            self.skipped_events['frameCircle'] += missed
+            self.frame_tick = first_tick
+            if missed % 2:
+                self.frame_circle_phase = not self.frame_circle_phase
+    
+    def on_vsync_fall_event(self, due_us):
+        """Virtual-time VSYNC falling edge"""
+        self.take_vsync_edge(due_us)
+        
+        # Skip VSYNC simulation if detection is disabled
+        if not self.vsync_detection_enabled:
+            return
+        
+        self.handle_vsync_edge(due_us)
+        while self.vsync_lock_edges:
+            self.lock_to_vsync_edge(self.vsync_lock_edges.popleft())
+        self.scheduler.schedule('vsync_rise', due_us + self.vsync_pulse_width,
+                                self.on_vsync_rise_event)
+        self.publish_state(due_us)
+    
+    def schedule_field(self):
+        """Arm the next FIELD edge, or cancel it while the field source is off"""
+        if self.field_enabled:
+            due_us, self.next_field_odd = self.field_generator.next_edge()
+            self.scheduler.schedule('field', due_us, self.on_field_event)
+        else:
+            self.scheduler.cancel('field')
+    
+    def on_field_event(self, due_us):
+        """FIELD edge from the interlaced source"""
+        if self.track_lateness:
+            self.lateness['field'].record(self.clock.now_us() - due_us)
+        self.handle_field_edge(due_us, self.next_field_odd)
+        self.schedule_field()
+        self.publish_state(due_us)
+    
+    def on_vsync_rise_event(self, due_us):
+        """Virtual-time VSYNC rising edge"""
+        self.handle_vsync_release(due_us)
+        self.publish_state(due_us)
+    
+    def now_us(self):
+        """Get current engine time in microseconds"""
+        return self.clock.now_us()
+    
+    def advance(self, seconds):
+        """Run a virtual-time simulator forward; returns number of events fired"""
+        if not self.virtual_time:
+            raise RuntimeError("advance() requires LEDTesterSimulator(virtual_time=True)")
+        with self.wakeup:
+            self.publish_deferred = True
+            try:
+                events = self.scheduler.run_until(self.clock.now_us() + int(round(seconds * 1000000)))
+            finally:
+                self.publish_deferred = False
+            self.publish_state()
+            return events
     
     def update_frame_interval(self):
         """Update frame interval based on frame rate"""
-        self.frame_interval = 1000 / (self.frame_rate * 2)
+        self.frame_interval = float(Fraction(1000) / (self.frame_rate * 2))
     
     def main_loop(self):
-        """Main simulation loop"""
-        while self.running:
-            current_time = time.time() * 1000  # Convert to milliseconds
-            
-            # Handle VSYNC lock trigger
-            if self.vsync_lock_trigger:
-                self.vsync_lock_trigger = False
+        """Main simulation loop: sleep until the next due event or a wake-up"""
+        with self.wakeup:
+            while self.running:
+                self.engine_iterations += 1
+                now = self.clock.now_us()
                 
-                # Reset both circles to start position
-                if self.fast_circle_enabled:
-                    self.current_fast_led = 0
-                    self.last_fast_circle_update = current_time
+                # Re-anchor the circles at each queued VSYNC edge, in time
+                # order, after firing what was due before that edge
+                while self.vsync_lock_edges:
+                    edge_us = self.vsync_lock_edges.popleft()
+                    self.scheduler.run_due(edge_us - 1)
+                    self.lock_to_vsync_edge(edge_us)
+                    self.publish_state(edge_us)
+                if self.ingest_pending:
+                    locked_us = self.clock.now_us()
+                    while self.ingest_pending:
+                        self.ingest_latency.record(locked_us - self.ingest_pending.popleft())
                 
-                if self.frame_circle_enabled:
-                    self.frame_circle_phase = False
-                    self.last_frame_circle_update = current_time
-            
-            # Handle fast circle animation
-            if self.fast_circle_enabled and (current_time - self.last_fast_circle_update >= self.fast_circle_interval):
-                self.handle_fast_circle()
-                self.last_fast_circle_update = current_time
-            
-            # Handle frame circle animation
-            if self.frame_circle_enabled and (current_time - self.last_frame_circle_update >= self.frame_interval):
-                self.handle_frame_circle()
-                self.last_frame_circle_update = current_time
-            
-            time.sleep(0.001)  # 1ms delay to prevent excessive CPU usage
+                # Fire due fast circle steps and frame circle flips
+                self.scheduler.run_due(now)
+                
+                # Sleep until the next deadline; update_*() and queued VSYNC
+                # lock edges notify the condition to wake us early
+                next_due = self.scheduler.next_due()
+                if next_due is None:
+                    self.wakeup.wait()
+                    self.engine_notify_wakeups += 1
+                else:
+                    delay = next_due - self.clock.now_us()
+                    if delay > 0:
+                        if self.wakeup.wait(delay / 1000000.0):
+                            self.engine_notify_wakeups += 1
+                        else:
+                            self.engine_timer_wakeups += 1
     
     def handle_fast_circle(self):
         """Handle fast circle LED animation"""
-        # Turn off all LEDs first
-        for i in range(12):
-            self.led_states[i] = False
-        
-        # Turn on current LED
-        self.led_states[self.current_fast_led] = True
+        # Only the current LED is on (this also clears the frame circle LEDs)
+        self.led_mask = 1 << self.current_fast_led
         
         # Move to next LED
-        self.current_fast_led = (self.current_fast_led + 1) % 12
+        self.current_fast_led = (self.current_fast_led + 1) % LED_COUNT
     
     def handle_frame_circle(self):
         """Handle frame circle LED animation"""
-        # Turn off frame circle LEDs
-        self.led_states[0] = False   # LED1
-        self.led_states[6] = False   # LED7
-        self.led_states[3] = False   # LED4
-        self.led_states[9] = False   # LED10
-        
-        if self.frame_circle_phase:
-            # Phase 2: LED4 and LED10
-            self.led_states[3] = True   # LED4
-            self.led_states[9] = True   # LED10
-            # D4 output: LOW during LED4&10 phase
-            if self.d4_output_enabled:
-                self.d4_output_state = False
-        else:
-            # Phase 1: LED1 and LED7
-            self.led_states[0] = True   # LED1
-            self.led_states[6] = True   # LED7
-            # D4 output: HIGH during LED1&7 phase
-            if self.d4_output_enabled:
-                self.d4_output_state = True
+        # Phase 1: LED1 and LED7, phase 2: LED4 and LED10
+        phase = self.frame_circle_phase
+        self.led_mask = (self.led_mask & FRAME_CIRCLE_CLEAR) | FRAME_PHASE_MASKS[phase]
+        
+        # D4 output: HIGH during LED1&7 phase, LOW during LED4&10 phase
+        if self.d4_output_enabled:
+            self.d4_output_state = not phase
         
-        self.frame_circle_phase = not self.frame_circle_phase
+        self.frame_circle_phase = not phase
+    
+    @property
+    def led_states(self):
+        """LED states as a list of 12 bools (True = ON)"""
+        return led_mask_to_list(self.led_mask)
+    
+    def publish_state(self, time_us=None):
+        """Publish a new immutable state snapshot (call with the engine lock held)"""
+        if self.publish_deferred:
+            return
+        if time_us is None:
+            time_us = self.clock.now_us()
+        self.state_version += 1
+        self.state = SimulatorState(
+            self.state_version, time_us,
+            self.fast_circle_enabled, self.frame_circle_enabled, self.d4_output_enabled,
+            self.vsync_lock_enabled, self.vsync_detection_enabled, self.vsync_rate,
+            self.fast_circle_interval, self.frame_rate,
+            self.current_fast_led, self.frame_circle_phase, self.led_mask, self.d4_output_state,
+            self.vsync_active, self.vsync_detected, self.measured_frame_rate,
+            self.field_odd, self.odd_field_duration, self.even_field_duration,
+            self.vsync_lock_mode, self.pll.bandwidth_hz, self.pll.locked,
+            round(self.pll.phase_error_us, 1) + 0.0, round(self.pll.frequency_offset_ppm, 1) + 0.0,
+            self.frame_rate_estimator.stats, self.frame_rate_mismatch,
+            self.field_enabled, self.field_generator.rate, self.field_generator.asymmetry_us,
+            self.field_generator.jitter_us, self.field_stats[True].stats, self.field_stats[False].stats,
+            self.vsync_source_kind, self.vsync_impairments,
+        )
+        self.recent_states.append(self.state)
+    
+    def snapshot(self):
+        """Get the latest consistent SimulatorState without blocking the engine"""
+        return self.state
+    
+    def states_since(self, version):
+        """Get the recently published snapshots newer than version (oldest first)"""
+        recent = tuple(self.recent_states)  # atomic copy under the GIL
+        if not recent or recent[-1].version <= version:
+            return ()
+        start = max(0, len(recent) - (recent[-1].version - version))
+        return recent[start:]
     
     def get_status(self):
         """Get current status as dictionary"""
+        return status_from_state(self.state)
+    
+    def timing_report(self):
+        """Get lateness percentiles per transition type and the nominal intervals (µs)"""
+        state = self.state
         return {
-            "fastCircleEnabled": self.fast_circle_enabled,
-            "frameCircleEnabled": self.frame_circle_enabled,
-            "d4OutputEnabled": self.d4_output_enabled,
-            "vsyncLockEnabled": self.vsync_lock_enabled,
-            "vsyncDetectionEnabled": self.vsync_detection_enabled,
-            "fastCircleInterval": self.fast_circle_interval,
-            "frameRate": self.frame_rate,
-            "currentFastLED": self.current_fast_led,
-            "frameCirclePhase": self.frame_circle_phase,
-            "vsyncActive": self.vsync_active,
-            "vsyncDetected": self.vsync_detected,
-            "measuredFrameRate": self.measured_frame_rate,
-            "fieldOdd": self.field_odd,
-            "oddFieldDuration": self.odd_field_duration,
-            "evenFieldDuration": self.even_field_duration,
-            "ledStates": self.led_states,
-            "d4OutputState": self.d4_output_state
+            "virtualTime": self.virtual_time,
+            "lateness": {kind: histogram.summary() for kind, histogram in self.lateness.items()},
+            "skipped": dict(self.skipped_events),
+            "nominalUs": {
+                "fastCircle": state.fast_circle_interval * 1000,
+                "frameCircle": round(float(Fraction(1000000) / (state.frame_rate * 2)), 1),
+                "vsync": round(float(Fraction(1000000) / state.vsync_rate), 1),
+                "field": round(float(Fraction(1000000) / state.field_rate), 1),
+            },
         }
     
-    def update_fast_circle(self, enabled=None, interval=None):
-        """Update fast circle settings"""
+    def reset_timing(self):
+        """Clear the lateness histograms"""
+        for histogram in self.lateness.values():
+            histogram.reset()
+        self.ingest_latency.reset()
+        if self.edge_listener is not None:
+            self.edge_listener.transit.reset()
+    
+    def metric_families(self):
+        """Get the engine's counters and gauges for /metrics (see metrics.py)"""
+        state = self.state
+        return [
+            ('ledtester_engine_loop_iterations_total', 'counter', 'Real-time engine loop passes',
+             [({}, self.engine_iterations)]),
+            ('ledtester_engine_wakeups_total', 'counter', 'Engine wake-ups: deadline reached or notified early',
+             [({'reason': 'timer'}, self.engine_timer_wakeups),
+              ({'reason': 'notify'}, self.engine_notify_wakeups)]),
+            ('ledtester_engine_events_total', 'counter', 'Scheduler events fired',
+             [({}, self.scheduler.events_processed)]),
+            ('ledtester_transitions_total', 'counter', 'Output transitions by type',
+             [({'type': 'fast_circle'}, self.fast_circle_steps),
+              ({'type': 'frame_circle'}, self.frame_circle_flips),
+              ({'type': 'd4'}, self.d4_toggles),
+              ({'type': 'field'}, self.field_edges)]),
+            ('ledtester_vsync_edges_total', 'counter', 'VSYNC falling edges handled', [({}, self.vsync_edges)]),
+            ('ledtester_vsync_lock_resets_total', 'counter', 'Circle resets triggered by VSYNC lock',
+             [({}, self.vsync_lock_resets)]),
+            ('ledtester_measured_fps', 'gauge', 'Frame rate measured from VSYNC edges',
+             [({}, float(state.measured_frame_rate))]),
+            ('ledtester_vsync_pulse_anomalies_total', 'counter', 'VSYNC pulses judged missing or extra',
+             [({'kind': 'missed'}, state.vsync_interval_stats.missed_pulses),
+              ({'kind': 'extra'}, state.vsync_interval_stats.extra_pulses)]),
+            ('ledtester_frame_rate_mismatch', 'gauge', '1 while the measured VSYNC rate is off the frame rate',
+             [({}, int(state.frame_rate_mismatch))]),
+            ('ledtester_state_version', 'gauge', 'Version of the latest published state', [({}, state.version)]),
+            ('ledtester_trace_entries_total', 'counter', 'Entries recorded in the transition trace',
+             [({}, self.trace.next_sequence)]),
+            ('ledtester_transition_lateness_seconds', 'histogram', 'How late transitions ran behind their deadline',
+             [({'type': kind}, histogram_value(histogram)) for kind, histogram in self.lateness.items()]),
+            ('ledtester_skipped_events_total', 'counter', 'Deadlines dropped after the host stalled for over a period',
+             [({'type': kind}, count) for kind, count in self.skipped_events.items()]),
+        ] + self.ingest_metric_families()
+    
+    def ingest_metric_families(self):
+        """Get the edge listener's metric families (none without a listener)"""
+        listener = self.edge_listener
+        if listener is None:
+            return []
+        return [
+            ('ledtester_ingest_datagrams_total', 'counter', 'Datagrams received by the edge listener',
+             [({}, listener.datagrams)]),
+            ('ledtester_ingest_edges_total', 'counter', 'Edges received by the edge listener',
+             [({'kind': name}, listener.edges[kind]) for kind, name in EDGE_KINDS.items()]),
+            ('ledtester_ingest_errors_total', 'counter',
+             'Malformed datagrams, records lost in transit and edges rejected by time',
+             [({'kind': 'malformed'}, listener.malformed), ({'kind': 'lost'}, listener.lost)]
+             + [({'kind': reason}, count) for reason, count in self.ingest_rejected.items()]),
+            ('ledtester_ingest_latency_seconds', 'histogram',
+             'Edge time to arrival (transit) and arrival to VSYNC lock (lock)',
+             [({'stage': 'transit'}, histogram_value(listener.transit)),
+              ({'stage': 'lock'}, histogram_value(self.ingest_latency))]),
+        ]
+    
+    def encoded_status(self, encoder, state=None):
+        """Get a serialized status, encoded once per state version and format"""
+        if state is None:
+            state = self.state
+        version, body = self.status_cache.get(encoder, (None, b''))
+        if version != state.version:
+            body = encoder(state)
+            # Racing readers may both encode; either result is correct
+            self.status_cache[encoder] = (state.version, body)
+        return body
+    
+    def status_json(self, state=None):
+        """Get the serialized /api/status body"""
+        return self.encoded_status(encode_status_json, state)
+    
+    def status_bin(self, state=None):
+        """Get the packed /api/status.bin record (layout in status_bin.py)"""
+        return self.encoded_status(status_bin.encode, state)
+    
+    def configure_fast_circle(self, now_us, enabled=None, interval=None):
+        """Apply fast circle settings at now_us (call with the engine lock held)"""
         if enabled is not None:
             self.fast_circle_enabled = enabled
         if interval is not None:
             self.fast_circle_interval = max(1, interval)
+        
+        # Re-arm from the last step so a new interval takes effect now
+        last_us = int(self.last_fast_circle_update * 1000)
+        self.schedule_fast_circle(max(now_us, last_us + self.fast_circle_interval * 1000))
     
-    def update_frame_circle(self, enabled=None, frame_rate=None, d4_output=None, vsync_lock=None):
-        """Update frame circle settings"""
+    def configure_frame_circle(self, now_us, enabled=None, frame_rate=None, d4_output=None, vsync_lock=None,
+                               vsync_lock_mode=None, pll_bandwidth=None):
+        """Apply frame circle settings at now_us (call with the engine lock held)
+        
+        Raises ValueError, before changing anything, for an unknown vsync_lock_mode.
+        """
+        if vsync_lock_mode is not None and vsync_lock_mode not in VSYNC_LOCK_MODES:
+            raise ValueError(f"vsync_lock_mode must be one of {', '.join(VSYNC_LOCK_MODES)}")
         if enabled is not None:
             self.frame_circle_enabled = enabled
         if frame_rate is not None:
-            self.frame_rate = max(1, min(120, frame_rate))
+            # The last flip is on the old rate's grid
+            self.reanchor_frame_circle()
+            self.frame_rate = max(Fraction(1), min(Fraction(120), parse_frame_rate(frame_rate)))
             self.update_frame_interval()
+            self.pll.nominal_period_us = float(1000000 / self.frame_rate)
+            self.update_frame_rate_mismatch()
         if d4_output is not None:
             self.d4_output_enabled = d4_output
-        if vsync_lock is not None:
-            self.vsync_lock_enabled = vsync_lock
+        if pll_bandwidth is not None:
+            self.pll.bandwidth_hz = min(MAX_BANDWIDTH_HZ, max(MIN_BANDWIDTH_HZ, float(pll_bandwidth)))
+        if vsync_lock is not None or vsync_lock_mode is not None:
+            if vsync_lock is not None:
+                self.vsync_lock_enabled = vsync_lock
+            if vsync_lock_mode is not None:
+                self.vsync_lock_mode = vsync_lock_mode
+            # The PLL starts acquiring from the next edge
+            if not self.vsync_lock_enabled or self.vsync_lock_mode != 'pll':
+                self.scheduler.cancel('pll')
+                self.pll.reset()
+        
+        # Re-arm from the last flip so a new frame rate takes effect now
+        if frame_rate is not None or not self.scheduler.is_pending('frame'):
+            self.rearm_frame_circle(now_us)
+        elif not self.frame_circle_enabled:
+            self.scheduler.cancel('frame')
     
-    def update_vsync_detection(self, enabled=None):
-        """Update VSYNC detection settings"""
+    def configure_vsync(self, enabled=None, rate=None):
+        """Apply VSYNC settings (call with the engine lock held)"""
         if enabled is not None:
             self.vsync_detection_enabled = enabled
+        if rate is not None:
+            rate = max(Fraction(1), min(Fraction(120), parse_frame_rate(rate)))
+            # Continue the generated edge grid from the last edge so the new
+            # period starts from there instead of shifting past edges. The
+            # plain grid restarts from the last edge fired; through
+            # impairments, from the pending edge (already jittered or drifted)
+            self.vsync_rate = rate
+            if self.vsync_source is self.vsync_grid:
+                self.vsync_grid.set_rate(rate, self.last_vsync_fall_us)
+                self.schedule_vsync()
+            else:
+                self.vsync_grid.set_rate(rate)
+    
+    def configure_vsync_source(self, now_us, source=None, replay=None, seed=None, **impairments):
+        """Choose and impair the VSYNC edge source (call with the engine lock held)
+        
+        source is 'generated' or 'replay', replay a ReplaySource (selects it
+        unless source says otherwise) and impairments any VsyncImpairments
+        fields; None leaves a setting unchanged. Raises ValueError, changing
+        nothing, if a setting is invalid.
+        """
+        if replay is not None and source is None:
+            source = 'replay'
+        if source is not None and source not in VSYNC_SOURCES:
+            raise ValueError(f"source must be one of {', '.join(VSYNC_SOURCES)}")
+        if source == 'replay' and replay is None and self.vsync_replay is None:
+            raise ValueError("no VSYNC replay file loaded")
+        settings = self.vsync_impairments._replace(
+            **{key: value for key, value in impairments.items() if value is not None})
+        check_impairments(settings)
+        
+        if replay is not None:
+            if self.vsync_replay is not None and self.vsync_replay is not replay:
+                self.vsync_replay.close()
+            self.vsync_replay = replay
+        restart = source == 'replay' or (source is not None and source != self.vsync_source_kind)
+        if source is not None:
+            self.vsync_source_kind = source
+        if seed is not None:
+            self.vsync_seed = seed
+        self.vsync_impairments = settings
+        base = {'replay': self.vsync_replay, 'external': self.vsync_external}.get(self.vsync_source_kind,
+                                                                                   self.vsync_grid)
+        self.vsync_source = impair(base, settings, self.vsync_seed)
+        if restart:
+            # A replay plays from its first edge now; the generated pulse
+            # train starts a new grid now. Otherwise the pending edge fires
+            # as it is and new impairments apply from the one after
+            self.start_vsync_source(now_us)
+    
+    def vsync_source_report(self):
+        """Get the VSYNC source settings and counters for /api/vsyncSource"""
+        with self.wakeup:
+            report = {
+                "source": self.vsync_source_kind,
+                "impairments": impairments_to_dict(self.vsync_impairments),
+                "seed": self.vsync_seed,
+                "nextEdgeUs": self.next_vsync_us,
+            }
+            faults = self.vsync_source
+            if hasattr(faults, 'dropped'):
+                report["dropped"] = faults.dropped
+                report["duplicated"] = faults.duplicated
+            replay = self.vsync_replay
+            if replay is not None:
+                report["replay"] = {
+                    "file": replay.path,
+                    "edges": replay.edges,
+                    "loops": replay.loops,
+                    "exhausted": replay.exhausted,
+                }
+            return report
+    
+    def configure_field(self, now_us, enabled=None, rate=None, asymmetry_us=None, jitter_us=None):
+        """Apply interlaced field source settings at now_us (call with the engine lock held)"""
+        generator = self.field_generator
+        restart = enabled and not self.field_enabled
+        if rate is not None:
+            generator.rate = max(Fraction(1), min(Fraction(240), parse_frame_rate(rate)))
+            restart = True
+        if asymmetry_us is not None:
+            generator.asymmetry_us = int(asymmetry_us)
+            restart = True
+        if jitter_us is not None:
+            generator.jitter_us = max(0, int(jitter_us))
+            restart = True
+        if enabled is not None:
+            self.field_enabled = enabled
+        if restart:
+            # New cadence: start a fresh grid with an odd field now, and
+            # don't mix durations from the old settings into the statistics
+            generator.reset(now_us)
+            self.last_field_change_time = None
+            self.reset_field_stats()
+        if restart or not self.field_enabled:
+            self.schedule_field()
+    
+    def reset_field_stats(self):
+        """Clear the field duration statistics and history"""
+        for stats in self.field_stats.values():
+            stats.reset()
+    
+    def field_report(self):
+        """Get the field settings, statistics and recent durations (µs) for /api/field"""
+        with self.wakeup:
+            generator = self.field_generator
+            report = {
+                "enabled": self.field_enabled,
+                "rate": float(generator.rate),
+                "rateExact": format_frame_rate(generator.rate),
+                "asymmetryUs": generator.asymmetry_us,
+                "jitterUs": generator.jitter_us,
+            }
+            for name, odd in (("odd", True), ("even", False)):
+                stats = self.field_stats[odd]
+                report[name] = dict(field_stats_to_dict(stats.stats), historyUs=list(stats.history))
+            return report
+    
+    def update_field(self, enabled=None, rate=None, asymmetry_us=None, jitter_us=None):
+        """Update the interlaced field source"""
+        with self.wakeup:
+            self.configure_field(self.clock.now_us(), enabled, rate, asymmetry_us, jitter_us)
+            self.publish_state()
+            self.wakeup.notify()
+    
+    def update_fast_circle(self, enabled=None, interval=None):
+        """Update fast circle settings"""
+        with self.wakeup:
+            self.configure_fast_circle(self.clock.now_us(), enabled, interval)
+            self.publish_state()
+            self.wakeup.notify()
+    
+    def update_frame_circle(self, enabled=None, frame_rate=None, d4_output=None, vsync_lock=None,
+                            vsync_lock_mode=None, pll_bandwidth=None):
+        """Update frame circle settings"""
+        with self.wakeup:
+            self.configure_frame_circle(self.clock.now_us(), enabled, frame_rate, d4_output, vsync_lock,
+                                        vsync_lock_mode, pll_bandwidth)
+            self.publish_state()
+            self.wakeup.notify()
+    
+    def update_vsync_detection(self, enabled=None, rate=None):
+        """Update VSYNC detection settings and simulated VSYNC rate"""
+        with self.wakeup:
+            self.configure_vsync(enabled, rate)
+            self.publish_state()
+    
+    def update_vsync_source(self, source=None, replay=None, seed=None, **impairments):
+        """Update the VSYNC edge source (see configure_vsync_source)"""
+        with self.wakeup:
+            self.configure_vsync_source(self.clock.now_us(), source, replay, seed, **impairments)
+            self.publish_state()
+    
+    def apply_config(self, config, now_us):
+        """Apply a parsed configuration in one step (call with the engine lock held)"""
+        self.configure_vsync(**config.get('vsync', {}))
+        self.configure_frame_circle(now_us, **config.get('frame_circle', {}))
+        self.configure_fast_circle(now_us, **config.get('fast_circle', {}))
+        self.publish_state(now_us)
+        self.wakeup.notify()
+    
+    def update_config(self, config, apply='now'):
+        """Apply a parsed configuration (see parse_config) atomically
+        
+        apply is 'now', 'vsync' (the next VSYNC edge the simulator handles)
+        or an engine timestamp in microseconds; timestamps already passed
+        apply now. Returns (applied, time_us): whether it was applied before
+        returning, and the engine time it was or will be applied at (None
+        while waiting for VSYNC).
+        """
+        with self.wakeup:
+            now = self.clock.now_us()
+            if apply == 'now' or (apply != 'vsync' and apply <= now):
+                self.apply_config(config, now)
+                return True, now
+            if len(self.vsync_configs) + self.timed_configs >= MAX_PENDING_CONFIGS:
+                raise ValueError("Too many pending configurations")
+            if apply == 'vsync':
+                if not self.vsync_detection_enabled:
+                    raise ValueError("VSYNC detection is disabled")
+                self.vsync_configs.append(config)
+                return False, None
+            
+            self.timed_configs += 1
+            def on_config_event(due_us):
+                self.timed_configs -= 1
+                self.apply_config(config, due_us)
+            self.scheduler.schedule(('config', next(self.config_sequence)), apply, on_config_event)
+            self.wakeup.notify()
+            return False, apply
     
     def stop(self):
         """Stop the simulator"""
-        self.running = False
-        self.vsync_simulation_running = False
+        with self.wakeup:
+            self.running = False
+            self.vsync_simulation_running = False
+            self.wakeup.notify()
+
+
+class StateStreamer:
+    """Batches published snapshots into Server-Sent Event frames shared by all subscribers
+    
+    A single thread runs while anyone is subscribed. Every `interval` seconds
+    it collects the snapshots the engine published since the last batch,
+    encodes them once and wakes the subscribers, so the engine only pays for
+    a deque append per transition however many clients are connected.
+    """
+    
+    def __init__(self, simulator, interval=0.025, backlog=64, max_subscribers=64):
+        self.simulator = simulator
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self.frames = deque(maxlen=backlog)  # (sequence, encoded frame)
+        self.frame_sequence = 0
+        self.subscribers = 0
+        self.waiters = 0  # /api/status long-polls, sharing the subscriber slots
+        self.condition = threading.Condition()
+        self.thread = None
+        self.last_version = 0
+    
+    def encode_frame(self, states):
+        """Encode a batch of snapshots as one SSE message"""
+        latest = states[-1]
+        payload = {
+            "version": latest.version,
+            "status": status_from_state(latest),
+            # [engine time (us), LED bitmask, D4 state] for every transition
+            "transitions": [[state.time_us, state.led_mask, int(state.d4_output_state)]
+                            for state in states],
+        }
+        return f"id: {latest.version}\ndata: {json.dumps(payload)}\n\n".encode()
+    
+    def start(self):
+        """Start the batch thread if it is not running (call with the condition held)"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+    
+    def subscribe(self):
+        """Register a subscriber; returns (sequence, initial frame), or None when full"""
+        with self.condition:
+            if self.subscribers + self.waiters >= self.max_subscribers:
+                return None
+            self.subscribers += 1
+            self.start()
+            return self.frame_sequence, self.encode_frame([self.simulator.snapshot()])
+    
+    def unsubscribe(self):
+        """Unregister a subscriber"""
+        with self.condition:
+            self.subscribers -= 1
+    
+    def wait_frames(self, after_sequence, timeout):
+        """Wait for frames newer than after_sequence; slow readers skip to the backlog"""
+        with self.condition:
+            if self.frame_sequence <= after_sequence:
+                self.condition.wait(timeout)
+            return [frame for frame in self.frames if frame[0] > after_sequence]
+    
+    def wait_version(self, version, timeout):
+        """Long-poll until a snapshot newer than version is published
+        
+        Returns the latest snapshot (unchanged after a timeout), or None when
+        every subscriber slot is taken.
+        """
+        with self.condition:
+            if self.subscribers + self.waiters >= self.max_subscribers:
+                return None
+            self.waiters += 1
+            self.start()
+            try:
+                self.condition.wait_for(lambda: self.last_version > version, timeout)
+            finally:
+                self.waiters -= 1
+        return self.simulator.snapshot()
+    
+    def metric_families(self):
+        """Get subscriber gauges and the frame counter for /metrics"""
+        return [
+            ('ledtester_stream_subscribers', 'gauge', 'Open /api/stream connections', [({}, self.subscribers)]),
+            ('ledtester_long_poll_waiters', 'gauge', 'Pending /api/status long-polls', [({}, self.waiters)]),
+            ('ledtester_stream_slots', 'gauge', 'Stream and long-poll slots (--max-streams)',
+             [({}, self.max_subscribers)]),
+            ('ledtester_stream_frames_total', 'counter', 'Event stream batches encoded', [({}, self.frame_sequence)]),
+        ]
+    
+    def run(self):
+        """Batch loop; exits when the last subscriber or long-poll leaves"""
+        while True:
+            time.sleep(self.interval)
+            with self.condition:
+                if self.subscribers <= 0 and self.waiters <= 0:
+                    self.thread = None
+                    return
+            
+            states = self.simulator.states_since(self.last_version)
+            if not states:
+                continue
+            latest = states[-1].version
+            # Long-polls only need the new version, not an encoded frame
+            frame = self.encode_frame(states) if self.subscribers > 0 else None
+            
+            with self.condition:
+                self.last_version = latest
+                if frame is not None:
+                    self.frame_sequence += 1
+                    self.frames.append((self.frame_sequence, frame))
+                self.condition.notify_all()
+
+
+class StaticAsset:
+    """A static response body with its precompressed variants and ETags"""
+    
+    def __init__(self, body, content_type, cache_control='no-cache'):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        # encoding -> (bytes, etag); identity is always available
+        self.variants = {'identity': (body, f'"{digest}"')}
+        compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = (data, f'"{digest}-{encoding}"')
+    
+    def select(self, accept_encoding):
+        """Pick the smallest variant the client accepts; returns (encoding, bytes, etag)"""
+        accepted = parse_accept_encoding(accept_encoding)
+        best = 'identity'
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                if len(self.variants[encoding][0]) < len(self.variants[best][0]):
+                    best = encoding
+        body, etag = self.variants[best]
+        return best, body, etag
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    for tag in (if_none_match or '').split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == etag:
+            return True
+    return False
+
+
+def parse_accept_encoding(header):
+    """Get the set of content codings an Accept-Encoding header allows"""
+    accepted = set()
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    if '*' in accepted:
+        accepted.update(('br', 'gzip'))
+    return accepted
+
+
+class AssetCache:
+    """Static UI assets rendered and compressed once, looked up by path"""
+    
+    def __init__(self):
+        self.assets = {}
+    
+    def add(self, path, body, content_type, cache_control='no-cache'):
+        """Add (or replace) the asset served at `path`"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.assets[path] = StaticAsset(body, content_type, cache_control)
+    
+    def get(self, path):
+        """Get the asset served at `path`, or None"""
+        return self.assets.get(path)
+    
+    @classmethod
+    def for_handler(cls, handler_class):
+        """Build the cache from a handler class's static_assets()"""
+        cache = cls()
+        for path, (content_type, body) in handler_class.static_assets().items():
+            cache.add(path, body, content_type)
+        return cache
 
 
 class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
-    def __init__(self, simulator, *args, **kwargs):
+    # Persistent connections; every response carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without TCP_NODELAY a reused
+    # connection stalls ~40 ms on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+    
+    # Socket timeout so a stalled client cannot hold a worker forever
+    timeout = 30
+    # Default and maximum wait (seconds) for /api/status?since= long-polls
+    LONG_POLL_TIMEOUT = 20.0
+    LONG_POLL_TIMEOUT_MAX = 60.0
+    
+    # Maximum entries per /api/trace response
+    TRACE_LIMIT = 10000
+    
+    # Seconds between keep-alive comments on an idle stream
+    STREAM_KEEPALIVE = 15.0
+    
+    # Paths reported by name in /metrics; anything else counts as 'other'
+    METRIC_ROUTES = frozenset((
+        '/', '/api/status', '/api/status.bin', '/api/trace', '/api/timing', '/api/stream', '/metrics',
+        '/api/fastCircle', '/api/frameCircle', '/api/config', '/api/vsync', '/api/timing/reset',
+        '/api/field', '/api/vsyncSource', '/api/ingest',
+    ))
+    
+    def __init__(self, simulator, *args, streamer=None, assets=None, metrics=None, **kwargs):
         self.simulator = simulator
+        self.streamer = streamer
+        self.assets = assets
+        self.metrics = metrics
+        self.keep_alive_idle = False
+        self.response_code = None
         super().__init__(*args, **kwargs)
     
+    def handle_one_request(self):
+        """Handle one request, counting and timing it per route for /metrics"""
+        if self.metrics is None:
+            super().handle_one_request()
+            return
+        self.response_code = None
+        start = time.perf_counter_ns()
+        super().handle_one_request()
+        if self.response_code is not None:
+            self.metrics.http.observe(self.metric_route(), self.command, self.response_code,
+                                      (time.perf_counter_ns() - start) // 1000)
+    
+    def send_response(self, code, message=None):
+        """Send the status line, remembering the code for /metrics"""
+        self.response_code = code
+        super().send_response(code, message)
+    
+    def metric_route(self):
+        """Get the route label for /metrics: the path if it is a known route, else 'other'"""
+        path = urlparse(getattr(self, 'path', '')).path  # unset if the request line was malformed
+        if path in self.METRIC_ROUTES or (self.assets is not None and self.assets.get(path) is not None):
+            return path
+        return 'other'
+    
+    def handle(self):
+        """Handle requests until the connection is idle
+        
+        On a PooledHTTPServer an idle keep-alive connection is handed back
+        to the server (keep_alive_idle) instead of blocking this worker
+        while it waits for the client's next request.
+        """
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not isinstance(self.server, PooledHTTPServer) or self.request_buffered():
+                self.handle_one_request()
+            else:
+                self.keep_alive_idle = True
+                return
+    
+    def request_buffered(self):
+        """Check without blocking whether another request has already arrived"""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except (BlockingIOError, InterruptedError):
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+    
+    def send_body(self, body, content_type, status=200, headers=()):
+        """Send a complete response with Content-Length so the connection can be reused"""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urlparse(self.path)
         
-        if parsed_path.path == '/':
+        asset = self.assets.get(parsed_path.path) if self.assets is not None else None
+        if asset is not None:
+            self.serve_asset(asset)
+        elif parsed_path.path == '/':
             self.serve_main_page()
         elif parsed_path.path == '/api/status':
-            self.serve_status()
+            self.serve_status(parse_qs(parsed_path.query))
+        elif parsed_path.path == '/api/status.bin':
+            self.serve_status(parse_qs(parsed_path.query), self.simulator.status_bin,
+                              'application/octet-stream')
+        elif parsed_path.path == '/api/trace' and hasattr(self.simulator, 'trace'):
+            self.serve_trace(parse_qs(parsed_path.query))
+        elif parsed_path.path == '/api/timing' and hasattr(self.simulator, 'lateness'):
+            self.send_body(json.dumps(self.simulator.timing_report()).encode(), 'application/json')
+        elif parsed_path.path == '/api/field' and hasattr(self.simulator, 'field_report'):
+            self.send_body(json.dumps(self.simulator.field_report()).encode(), 'application/json')
+        elif parsed_path.path == '/api/vsyncSource' and hasattr(self.simulator, 'vsync_source_report'):
+            self.send_body(json.dumps(self.simulator.vsync_source_report()).encode(), 'application/json')
+        elif parsed_path.path == '/api/ingest' and hasattr(self.simulator, 'ingest_report'):
+            self.send_body(json.dumps(self.simulator.ingest_report()).encode(), 'application/json')
+        elif parsed_path.path == '/api/stream' and self.streamer is not None:
+            self.serve_stream()
+        elif parsed_path.path == '/metrics' and self.metrics is not None:
+            self.send_body(self.metrics.render(), METRICS_CONTENT_TYPE)
         else:
             self.send_error(404)
     
@@ -246,27 +1537,132 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
             self.handle_fast_circle_update()
         elif parsed_path.path == '/api/frameCircle':
             self.handle_frame_circle_update()
+        elif parsed_path.path == '/api/config':
+            self.handle_config_update()
         elif parsed_path.path == '/api/vsync':
             self.handle_vsync_update()
+        elif parsed_path.path == '/api/field' and hasattr(self.simulator, 'update_field'):
+            self.handle_field_update()
+        elif parsed_path.path == '/api/vsyncSource' and hasattr(self.simulator, 'update_vsync_source'):
+            self.handle_vsync_source_update()
+        elif parsed_path.path == '/api/timing/reset' and hasattr(self.simulator, 'lateness'):
+            self.simulator.reset_timing()
+            self.send_body(b'{"status":"ok"}', 'application/json')
         else:
             self.send_error(404)
     
     def serve_main_page(self):
         """Serve the main HTML page with enhanced LED visualization"""
         html = self.get_main_page_html()
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(html.encode())
+        self.send_body(html.encode(), 'text/html; charset=utf-8')
+    
+    def serve_asset(self, asset):
+        """Serve a cached static asset, or 304 if the client's copy is current"""
+        encoding, body, etag = asset.select(self.headers.get('Accept-Encoding'))
+        headers = [('ETag', etag), ('Cache-Control', asset.cache_control),
+                   ('Vary', 'Accept-Encoding')]
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        self.send_body(body, asset.content_type, headers=headers)
+    
+    @classmethod
+    def static_assets(cls):
+        """Get the static UI assets as {path: (content type, body)}"""
+        return {'/': ('text/html; charset=utf-8', cls.get_main_page_html())}
+    
+    def serve_status(self, query, encode=None, content_type='application/json'):
+        """Serve status API (JSON, or the binary record for /api/status.bin)
+        
+        The body is serialized once per state version and tagged "v<version>".
+        If-None-Match with the current tag gets an immediate 304; ?since=<version>
+        long-polls until a newer version is published (or ?timeout= seconds pass).
+        """
+        state = self.simulator.snapshot()
+        since = None
+        if 'since' in query:
+            try:
+                since = int(query['since'][0])
+                timeout = min(float(query.get('timeout', [self.LONG_POLL_TIMEOUT])[0]),
+                              self.LONG_POLL_TIMEOUT_MAX)
+            except ValueError:
+                self.send_error(400, "Invalid since or timeout")
+                return
+            if state.version <= since and self.streamer is not None and timeout > 0:
+                state = self.streamer.wait_version(since, timeout)
+                if state is None:
+                    self.send_error(503, "Too many status long-polls")
+                    return
+        
+        etag = f'"v{state.version}"'
+        headers = [('ETag', etag), ('Cache-Control', 'no-cache')]
+        if (since is not None and state.version <= since) or \
+                etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        if encode is None:
+            encode = self.simulator.status_json
+        self.send_body(encode(state), content_type, headers=headers)
+    
+    def serve_trace(self, query):
+        """Serve recorded transitions with sequence >= ?since= (at most ?limit=)"""
+        try:
+            since = max(0, int(query.get('since', ['0'])[0]))
+            limit = min(int(query.get('limit', [self.TRACE_LIMIT])[0]), self.TRACE_LIMIT)
+        except ValueError:
+            self.send_error(400, "Invalid since or limit")
+            return
+        first, times, kinds, values, end = self.simulator.trace.read(since, max(0, limit))
+        response = {
+            "first": first,
+            "next": end,
+            "dropped": first - since if first > since else 0,
+            "kinds": TRACE_KINDS,
+            # [engine time (us), kind index, value] for every entry
+            "events": [[time_us, kind, value] for time_us, kind, value in zip(times, kinds, values)],
+        }
+        self.send_body(json.dumps(response).encode(), 'application/json')
     
-    def serve_status(self):
-        """Serve status API"""
-        status = self.simulator.get_status()
-        response = json.dumps(status)
+    def serve_stream(self):
+        """Serve live state changes as Server-Sent Events"""
+        subscription = self.streamer.subscribe()
+        if subscription is None:
+            self.send_error(503, "Too many stream subscribers")
+            return
+        sequence, frame = subscription
+        
+        # The stream has no length, so it ends the connection when done
+        self.close_connection = True
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
         self.end_headers()
-        self.wfile.write(response.encode())
+        
+        try:
+            self.wfile.write(frame)
+            self.wfile.flush()
+            while self.simulator.running or self.simulator.virtual_time:
+                frames = self.streamer.wait_frames(sequence, self.STREAM_KEEPALIVE)
+                if frames:
+                    sequence = frames[-1][0]
+                    self.wfile.write(b''.join(frame for _, frame in frames))
+                else:
+                    self.wfile.write(b': keepalive\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            pass  # Client went away or stalled
+        finally:
+            self.streamer.unsubscribe()
+            self.close_connection = True
     
     def handle_fast_circle_update(self):
         """Handle fast circle update request"""
@@ -284,11 +1680,7 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
         
         self.simulator.update_fast_circle(enabled, interval)
         
-        response = '{"status":"ok"}'
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(response.encode())
+        self.send_body(b'{"status":"ok"}', 'application/json')
     
     def handle_frame_circle_update(self):
         """Handle frame circle update request"""
@@ -300,23 +1692,40 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
         frame_rate = None
         d4_output = None
         vsync_lock = None
+        vsync_lock_mode = None
+        pll_bandwidth = None
         
         if 'enabled' in params:
             enabled = params['enabled'][0] == 'true'
         if 'frameRate' in params:
-            frame_rate = int(params['frameRate'][0])
+            try:
+                frame_rate = parse_frame_rate(params['frameRate'][0])
+            except (ValueError, ZeroDivisionError):
+                self.send_error(400, "Invalid frameRate")
+                return
         if 'd4Output' in params:
             d4_output = params['d4Output'][0] == 'true'
         if 'vsyncLock' in params:
             vsync_lock = params['vsyncLock'][0] == 'true'
+        if 'vsyncLockMode' in params:
+            vsync_lock_mode = params['vsyncLockMode'][0]
+        if 'pllBandwidth' in params:
+            try:
+                pll_bandwidth = float(params['pllBandwidth'][0])
+            except ValueError:
+                pll_bandwidth = None
+            if pll_bandwidth is None or not pll_bandwidth > 0:
+                self.send_error(400, "Invalid pllBandwidth")
+                return
         
-        self.simulator.update_frame_circle(enabled, frame_rate, d4_output, vsync_lock)
+        try:
+            self.simulator.update_frame_circle(enabled, frame_rate, d4_output, vsync_lock,
+                                               vsync_lock_mode, pll_bandwidth)
+        except ValueError as error:  # an unknown lock mode, or one fleet devices do not support
+            self.send_error(400, str(error))
+            return
         
-        response = '{"status":"ok"}'
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(response.encode())
+        self.send_body(b'{"status":"ok"}', 'application/json')
     
     def handle_vsync_update(self):
         """Handle VSYNC update request"""
@@ -325,18 +1734,101 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
         params = parse_qs(post_data)
         
         enabled = None
+        rate = None
         if 'enabled' in params:
             enabled = params['enabled'][0] == 'true'
+        if 'rate' in params:
+            try:
+                rate = parse_frame_rate(params['rate'][0])
+            except (ValueError, ZeroDivisionError):
+                self.send_error(400, "Invalid rate")
+                return
         
-        self.simulator.update_vsync_detection(enabled)
+        self.simulator.update_vsync_detection(enabled, rate)
         
-        response = '{"status":"ok"}'
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(response.encode())
+        self.send_body(b'{"status":"ok"}', 'application/json')
+    
+    def handle_field_update(self):
+        """Handle interlaced field source update request"""
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length).decode('utf-8')
+        params = parse_qs(post_data)
+        
+        settings = {}
+        if 'enabled' in params:
+            settings['enabled'] = params['enabled'][0] == 'true'
+        try:
+            if 'rate' in params:
+                settings['rate'] = parse_frame_rate(params['rate'][0])
+                if settings['rate'] <= 0:
+                    raise ValueError
+            if 'asymmetry' in params:
+                settings['asymmetry_us'] = int(params['asymmetry'][0])
+            if 'jitter' in params:
+                settings['jitter_us'] = int(params['jitter'][0])
+                if settings['jitter_us'] < 0:
+                    raise ValueError
+        except (ValueError, ZeroDivisionError):
+            self.send_error(400, "Invalid field setting")
+            return
+        
+        self.simulator.update_field(**settings)
+        
+        self.send_body(b'{"status":"ok"}', 'application/json')
+    
+    # POST /api/vsyncSource parameters -> (update_vsync_source keyword, type)
+    VSYNC_SOURCE_PARAMS = {
+        'source': ('source', str),
+        'jitter': ('jitter_us', float),
+        'jitterModel': ('jitter_model', str),
+        'driftPpm': ('drift_ppm', float),
+        'driftPeriod': ('drift_period_s', float),
+        'drop': ('drop', float),
+        'duplicate': ('duplicate', float),
+        'seed': ('seed', int),
+    }
+    
+    def handle_vsync_source_update(self):
+        """Handle VSYNC source and impairment update request"""
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length).decode('utf-8')
+        params = parse_qs(post_data)
+        
+        try:
+            settings = {}
+            for name, (keyword, kind) in self.VSYNC_SOURCE_PARAMS.items():
+                if name in params:
+                    settings[keyword] = kind(params[name][0])
+            self.simulator.update_vsync_source(**settings)
+        except ValueError as error:
+            self.send_error(400, f"Invalid VSYNC source setting: {error}")
+            return
+        
+        self.send_body(b'{"status":"ok"}', 'application/json')
+    
+    def handle_config_update(self):
+        """Handle a batched JSON configuration, applied atomically"""
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length)
+        
+        try:
+            config, apply = parse_config(json.loads(post_data))
+            applied, applied_at = self.simulator.update_config(config, apply)
+        except ValueError as error:  # includes malformed JSON
+            body = json.dumps({"status": "error", "error": str(error)}).encode()
+            self.send_body(body, 'application/json', status=400)
+            return
+        
+        response = {
+            "status": "ok" if applied else "pending",
+            "applyAtUs": applied_at,
+            "engineTimeUs": self.simulator.now_us(),
+            "version": self.simulator.snapshot().version,
+        }
+        self.send_body(json.dumps(response).encode(), 'application/json')
     
-    def get_main_page_html(self):
+    @classmethod
+    def get_main_page_html(cls):
         """Get the main page HTML with enhanced LED visualization"""
         return '''<!DOCTYPE html>
 <html>
@@ -385,6 +1877,12 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
         .led-state { margin: 5px 0; padding: 5px; border-radius: 3px; background-color: #f8f9fa; }
         .led-state.active { background-color: #d4edda; }
         .led-state.inactive { background-color: #f8d7da; }
+        
+        /* Timing accuracy table */
+        .field-stats { color: #666; font-size: 0.9em; margin-left: 10px; }
+        .timing-table { border-collapse: collapse; margin: 10px 0; }
+        .timing-table th, .timing-table td { padding: 4px 12px; border-bottom: 1px solid #ddd; text-align: right; }
+        .timing-table th:first-child, .timing-table td:first-child { text-align: left; }
     </style>
 </head>
 <body>
@@ -439,7 +1937,7 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
             </div>
             <div class="control-group">
                 <label>Frame Rate (fps):</label>
-                <input type="number" id="frameRate" value="24" min="1" max="120">
+                <input type="text" id="frameRate" value="24" list="frameRatePresets" size="10">
                 <span id="frameRateError" class="error-text"></span>
             </div>
             <div class="control-group">
@@ -450,6 +1948,17 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
                 <label>Lock to VSYNC:</label>
                 <input type="checkbox" id="vsyncLockEnabled">
             </div>
+            <div class="control-group">
+                <label>Lock Mode:</label>
+                <select id="vsyncLockMode">
+                    <option value="reset">Reset at each edge</option>
+                    <option value="pll">PLL (filtered)</option>
+                </select>
+            </div>
+            <div class="control-group">
+                <label>PLL Bandwidth (Hz):</label>
+                <input type="number" id="pllBandwidth" value="1" min="0.01" max="20" step="0.1">
+            </div>
             <button onclick="updateFrameCircle()">Update Frame Circle</button>
         </div>
         
@@ -459,6 +1968,10 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
                 <label>Enable VSYNC Detection:</label>
                 <input type="checkbox" id="vsyncDetectionEnabled" checked onchange="updateVsyncDetection()">
             </div>
+            <div class="control-group">
+                <label>Simulated VSYNC Rate (fps):</label>
+                <input type="text" id="vsyncRate" value="24" list="frameRatePresets" size="10" onchange="updateVsyncDetection()">
+            </div>
             <div class="control-group">
                 <label>VSYNC Status:</label>
                 <span id="vsyncStatus">Not Detected</span>
@@ -467,6 +1980,14 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
                 <label>Measured Frame Rate:</label>
                 <span id="measuredFrameRate">0.0 fps</span>
             </div>
+            <div class="control-group">
+                <label>VSYNC Interval:</label>
+                <span id="vsyncIntervalStats">-</span>
+            </div>
+            <div class="control-group">
+                <label>VSYNC Source:</label>
+                <span id="vsyncSource">generated</span>
+            </div>
             <div class="control-group">
                 <label>Field Status:</label>
                 <span id="fieldStatus">Unknown</span>
@@ -474,13 +1995,48 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
             <div class="control-group">
                 <label>Odd Field Duration:</label>
                 <span id="oddFieldDuration">0 μs</span>
+                <span id="oddFieldStats" class="field-stats"></span>
             </div>
             <div class="control-group">
                 <label>Even Field Duration:</label>
                 <span id="evenFieldDuration">0 μs</span>
+                <span id="evenFieldStats" class="field-stats"></span>
+            </div>
+            <div class="control-group">
+                <label>Simulate Interlaced Fields:</label>
+                <input type="checkbox" id="fieldEnabled">
+            </div>
+            <div class="control-group">
+                <label>Field Rate (fields/s):</label>
+                <input type="text" id="fieldRate" value="59.94" size="10">
+            </div>
+            <div class="control-group">
+                <label>Odd-Even Asymmetry (μs):</label>
+                <input type="number" id="fieldAsymmetry" value="0" step="1">
+            </div>
+            <div class="control-group">
+                <label>Field Jitter (μs std):</label>
+                <input type="number" id="fieldJitter" value="0" min="0" step="1">
             </div>
+            <button onclick="updateField()">Update Field Source</button>
         </div>
         
+        <div class="section" id="timingSection">
+            <h3>Timing Accuracy</h3>
+            <table class="timing-table">
+                <thead>
+                    <tr><th>Transition</th><th>Nominal</th><th>Count</th><th>p50 late</th><th>p99 late</th><th>p99.9 late</th><th>Max late</th></tr>
+                </thead>
+                <tbody id="timingRows"></tbody>
+            </table>
+            <button onclick="resetTiming()">Reset Timing</button>
+        </div>
+        
+        <datalist id="frameRatePresets">
+            <option value="23.976"><option value="24"><option value="25"><option value="29.97">
+            <option value="30"><option value="50"><option value="59.94"><option value="60">
+        </datalist>
+        
         <div class="section">
             <h3>Status</h3>
             <div id="status"></div>
@@ -504,7 +2060,34 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
             })
             .catch(error => {
                 showStatus('Error updating Fast Circle: ' + error, 'error');
-            });
+            })
+            .finally(() => settleControls(['fastCircleEnabled', 'fastCircleInterval']));
+        }
+        
+        function formatFieldStats(stats) {
+            if (!stats.count) return '';
+            return `mean ${stats.meanUs} μs ± ${stats.stdUs} μs, ${stats.minUs}-${stats.maxUs} μs over ${stats.count} fields`;
+        }
+        
+        function updateField() {
+            const enabled = document.getElementById('fieldEnabled').checked;
+            const rate = document.getElementById('fieldRate').value;
+            const asymmetry = document.getElementById('fieldAsymmetry').value;
+            const jitter = document.getElementById('fieldJitter').value;
+            
+            fetch('/api/field', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+                body: `enabled=${enabled}&rate=${rate}&asymmetry=${asymmetry}&jitter=${jitter}`
+            })
+            .then(response => {
+                if (!response.ok) throw new Error(response.statusText);
+                showStatus('Field source updated successfully', 'success');
+            })
+            .catch(error => {
+                showStatus('Error updating field source: ' + error, 'error');
+            })
+            .finally(() => settleControls(['fieldEnabled', 'fieldRate', 'fieldAsymmetry', 'fieldJitter']));
         }
         
         function updateFrameCircle() {
@@ -512,11 +2095,14 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
             const frameRate = document.getElementById('frameRate').value;
             const d4Output = document.getElementById('d4OutputEnabled').checked;
             const vsyncLock = document.getElementById('vsyncLockEnabled').checked;
+            const vsyncLockMode = document.getElementById('vsyncLockMode').value;
+            const pllBandwidth = document.getElementById('pllBandwidth').value;
             
             fetch('/api/frameCircle', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-                body: `enabled=${enabled}&frameRate=${frameRate}&d4Output=${d4Output}&vsyncLock=${vsyncLock}`
+                body: `enabled=${enabled}&frameRate=${frameRate}&d4Output=${d4Output}&vsyncLock=${vsyncLock}` +
+                      `&vsyncLockMode=${vsyncLockMode}&pllBandwidth=${pllBandwidth}`
             })
             .then(response => response.json())
             .then(data => {
@@ -524,16 +2110,18 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
             })
             .catch(error => {
                 showStatus('Error updating Frame Circle: ' + error, 'error');
-            });
+            })
+            .finally(() => settleControls(['frameCircleEnabled', 'frameRate', 'd4OutputEnabled', 'vsyncLockEnabled', 'vsyncLockMode', 'pllBandwidth']));
         }
         
         function updateVsyncDetection() {
             const enabled = document.getElementById('vsyncDetectionEnabled').checked;
+            const rate = document.getElementById('vsyncRate').value;
             
             fetch('/api/vsync', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-                body: `enabled=${enabled}`
+                body: `enabled=${enabled}&rate=${rate}`
             })
             .then(response => response.json())
             .then(data => {
@@ -541,7 +2129,41 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
             })
             .catch(error => {
                 showStatus('Error updating VSYNC Detection: ' + error, 'error');
-            });
+            })
+            .finally(() => settleControls(['vsyncDetectionEnabled', 'vsyncRate']));
+        }
+        
+        function formatRate(rate) {
+            // 24000/1001 shows as 23.976, which the server snaps back exactly
+            return parseFloat(rate.toFixed(3));
+        }
+        
+        // Controls the user changed whose POST has not been answered yet
+        const pendingControls = new Set();
+        document.addEventListener('change', event => pendingControls.add(event.target.id));
+        
+        function settleControls(ids) {
+            ids.forEach(id => pendingControls.delete(id));
+        }
+        
+        function canSync(element) {
+            // Live updates arrive many times a second; don't overwrite a
+            // control while the user is editing it or its change is in flight
+            return document.activeElement !== element && !pendingControls.has(element.id);
+        }
+        
+        function setInputValue(id, value) {
+            const element = document.getElementById(id);
+            if (canSync(element)) {
+                element.value = value;
+            }
+        }
+        
+        function setChecked(id, checked) {
+            const element = document.getElementById(id);
+            if (canSync(element)) {
+                element.checked = checked;
+            }
         }
         
         function updateLEDDisplay(data) {
@@ -569,6 +2191,7 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
                 <div class="led-state ${data.d4OutputState ? 'active' : 'inactive'}">D4 Output: ${data.d4OutputState ? 'ON' : 'OFF'}</div>
                 <div class="led-state">Current Fast LED: ${data.currentFastLED + 1}</div>
                 <div class="led-state">Frame Phase: ${data.frameCirclePhase ? 'LED4&10' : 'LED1&7'}</div>
+                <div class="led-state">Streamed Transitions: ${transitionRate}/s</div>
             `;
             document.getElementById('system-status').innerHTML = systemStatusHtml;
         }
@@ -576,116 +2199,412 @@ class LEDTesterHTTPHandler(BaseHTTPRequestHandler):
         function updateStatus() {
             fetch('/api/status')
             .then(response => response.json())
-            .then(data => {
-                document.getElementById('fastCircleEnabled').checked = data.fastCircleEnabled;
-                document.getElementById('frameCircleEnabled').checked = data.frameCircleEnabled;
-                document.getElementById('d4OutputEnabled').checked = data.d4OutputEnabled;
-                document.getElementById('vsyncLockEnabled').checked = data.vsyncLockEnabled;
-                document.getElementById('vsyncDetectionEnabled').checked = data.vsyncDetectionEnabled;
-                document.getElementById('fastCircleInterval').value = data.fastCircleInterval;
-                document.getElementById('frameRate').value = data.frameRate;
-                
-                // Update LED display
-                updateLEDDisplay(data);
-                
-                // Update VSYNC status
-                const vsyncStatus = data.vsyncDetected ? 
-                    (data.vsyncActive ? 'Active' : 'Detected') : 'Not Detected';
-                document.getElementById('vsyncStatus').textContent = vsyncStatus;
-                document.getElementById('vsyncStatus').className = 
-                    data.vsyncDetected ? 'status-indicator status-active' : 'status-indicator status-inactive';
-                
-                // Update measured frame rate
-                document.getElementById('measuredFrameRate').textContent = 
-                    data.measuredFrameRate.toFixed(2) + ' fps';
-                
-                // Check for frame rate mismatch
-                const frameRateError = document.getElementById('frameRateError');
-                if (data.vsyncDetected && data.measuredFrameRate > 0) {
-                    const difference = Math.abs(data.measuredFrameRate - data.frameRate);
-                    if (difference > 0.5) { // Allow 0.5 fps tolerance
-                        frameRateError.textContent = `MISMATCH! (Measured: ${data.measuredFrameRate.toFixed(2)} fps)`;
-                    } else {
-                        frameRateError.textContent = '';
-                    }
-                } else {
-                    frameRateError.textContent = '';
-                }
-                
-                // Update field status
-                const fieldStatus = data.fieldOdd ? 'ODD' : 'EVEN';
-                document.getElementById('fieldStatus').textContent = fieldStatus;
-                document.getElementById('fieldStatus').className = 
-                    data.fieldOdd ? 'status-indicator status-active' : 'status-indicator status-inactive';
-                
-                // Update field durations
-                document.getElementById('oddFieldDuration').textContent = 
-                    (data.oddFieldDuration / 1000).toFixed(2) + ' ms';
-                document.getElementById('evenFieldDuration').textContent = 
-                    (data.evenFieldDuration / 1000).toFixed(2) + ' ms';
-                
-                let statusHtml = `
-                    <p><strong>Fast Circle:</strong> ${data.fastCircleEnabled ? 'Enabled' : 'Disabled'} (${data.fastCircleInterval}ms per LED)</p>
-                    <p><strong>Frame Circle:</strong> ${data.frameCircleEnabled ? 'Enabled' : 'Disabled'} (${data.frameRate}fps)</p>
-                    <p><strong>D4 Output (OUT1):</strong> ${data.d4OutputEnabled ? 'Enabled' : 'Disabled'}</p>
-                    <p><strong>VSYNC Lock:</strong> ${data.vsyncLockEnabled ? 'Enabled' : 'Disabled'}</p>
-                    <p><strong>Current Fast LED:</strong> ${data.currentFastLED + 1}</p>
-                    <p><strong>Frame Phase:</strong> ${data.frameCirclePhase ? 'LED4&10' : 'LED1&7'}</p>
-                `;
-                document.getElementById('status').innerHTML = statusHtml;
-            })
+            .then(renderStatus)
             .catch(error => {
                 showStatus('Error fetching status: ' + error, 'error');
             });
         }
         
+        // Fallback: long-poll /api/status, which answers on the next change
+        function longPollStatus(version) {
+            fetch('/api/status?since=' + version)
+            .then(response => response.status === 304 ? null : response.json())
+            .then(data => {
+                if (data) {
+                    renderStatus(data);
+                    version = data.version;
+                }
+                longPollStatus(version);
+            })
+            .catch(() => setTimeout(() => longPollStatus(version), 1000));
+        }
+        
+        function renderStatus(data) {
+            setChecked('fastCircleEnabled', data.fastCircleEnabled);
+            setChecked('frameCircleEnabled', data.frameCircleEnabled);
+            setChecked('d4OutputEnabled', data.d4OutputEnabled);
+            setChecked('vsyncLockEnabled', data.vsyncLockEnabled);
+            setInputValue('vsyncLockMode', data.vsyncLockMode);
+            setInputValue('pllBandwidth', data.pllBandwidth);
+            setChecked('vsyncDetectionEnabled', data.vsyncDetectionEnabled);
+            setInputValue('vsyncRate', formatRate(data.vsyncRate));
+            setInputValue('fastCircleInterval', data.fastCircleInterval);
+            setInputValue('frameRate', formatRate(data.frameRate));
+            
+            // Update LED display
+            updateLEDDisplay(data);
+            
+            // Update VSYNC status
+            const vsyncStatus = data.vsyncDetected ? 
+                (data.vsyncActive ? 'Active' : 'Detected') : 'Not Detected';
+            document.getElementById('vsyncStatus').textContent = vsyncStatus;
+            document.getElementById('vsyncStatus').className = 
+                data.vsyncDetected ? 'status-indicator status-active' : 'status-indicator status-inactive';
+            
+            // Update measured frame rate
+            document.getElementById('measuredFrameRate').textContent = 
+                data.measuredFrameRate.toFixed(2) + ' fps';
+            
+            // Interval statistics over the recent VSYNC edges
+            const stats = data.vsyncIntervalStats;
+            document.getElementById('vsyncIntervalStats').textContent = stats.count ?
+                `${(stats.meanUs / 1000).toFixed(3)} ms ± ${stats.stdUs.toFixed(0)} μs ` +
+                `(median ${(stats.medianUs / 1000).toFixed(3)}, ${(stats.minUs / 1000).toFixed(3)}-${(stats.maxUs / 1000).toFixed(3)} ms; ` +
+                `${stats.missedPulses} missed, ${stats.extraPulses} extra)` : '-';
+            
+            // VSYNC source and the impairments applied to it (set through /api/vsyncSource)
+            const impairments = data.vsyncImpairments;
+            const applied = [];
+            if (impairments.jitterUs) applied.push(`${impairments.jitterModel} jitter ${impairments.jitterUs} μs`);
+            if (impairments.driftPpm) applied.push(`drift ${impairments.driftPpm} ppm` +
+                (impairments.driftPeriodS ? ` over ${impairments.driftPeriodS} s` : ''));
+            if (impairments.drop) applied.push(`drop ${(impairments.drop * 100).toFixed(1)}%`);
+            if (impairments.duplicate) applied.push(`duplicate ${(impairments.duplicate * 100).toFixed(1)}%`);
+            document.getElementById('vsyncSource').textContent =
+                data.vsyncSource + (applied.length ? ` (${applied.join(', ')})` : '');
+            
+            // Frame rate mismatch is decided by the server from the interval statistics
+            document.getElementById('frameRateError').textContent = data.frameRateMismatch ?
+                `MISMATCH! (Measured: ${data.measuredFrameRate.toFixed(2)} fps)` : '';
+            
+            // Update field status
+            const fieldStatus = data.fieldOdd ? 'ODD' : 'EVEN';
+            document.getElementById('fieldStatus').textContent = fieldStatus;
+            document.getElementById('fieldStatus').className = 
+                data.fieldOdd ? 'status-indicator status-active' : 'status-indicator status-inactive';
+            
+            // Update field durations
+            document.getElementById('oddFieldDuration').textContent = 
+                (data.oddFieldDuration / 1000).toFixed(2) + ' ms';
+            document.getElementById('evenFieldDuration').textContent = 
+                (data.evenFieldDuration / 1000).toFixed(2) + ' ms';
+            document.getElementById('oddFieldStats').textContent = formatFieldStats(data.oddFieldStats);
+            document.getElementById('evenFieldStats').textContent = formatFieldStats(data.evenFieldStats);
+            setChecked('fieldEnabled', data.fieldEnabled);
+            setInputValue('fieldRate', formatRate(data.fieldRate));
+            setInputValue('fieldAsymmetry', data.fieldAsymmetryUs);
+            setInputValue('fieldJitter', data.fieldJitterUs);
+            
+            let statusHtml = `
+                <p><strong>Fast Circle:</strong> ${data.fastCircleEnabled ? 'Enabled' : 'Disabled'} (${data.fastCircleInterval}ms per LED)</p>
+                <p><strong>Frame Circle:</strong> ${data.frameCircleEnabled ? 'Enabled' : 'Disabled'} (${formatRate(data.frameRate)}fps = ${data.frameRateExact})</p>
+                <p><strong>D4 Output (OUT1):</strong> ${data.d4OutputEnabled ? 'Enabled' : 'Disabled'}</p>
+                <p><strong>VSYNC Lock:</strong> ${data.vsyncLockEnabled ? 'Enabled' : 'Disabled'} (${data.vsyncLockMode})</p>
+                ${data.vsyncLockEnabled && data.vsyncLockMode === 'pll' ? `<p><strong>PLL:</strong> ${data.pllLocked ? 'Locked' : 'Acquiring'}, phase error ${data.pllPhaseErrorUs} μs, frequency offset ${data.pllFrequencyOffsetPpm} ppm</p>` : ''}
+                <p><strong>Current Fast LED:</strong> ${data.currentFastLED + 1}</p>
+                <p><strong>Frame Phase:</strong> ${data.frameCirclePhase ? 'LED4&10' : 'LED1&7'}</p>
+            `;
+            document.getElementById('status').innerHTML = statusHtml;
+        }
+        
         function showStatus(message, type) {
             const statusDiv = document.getElementById('status');
             statusDiv.innerHTML = `<div class="status ${type}">${message}</div>`;
         }
         
+        // Live updates: the server pushes batched transitions over
+        // Server-Sent Events; poll instead where EventSource is missing
+        let transitionCount = 0;
+        let transitionRate = 0;
+        
+        function startStream() {
+            if (!window.EventSource) {
+                longPollStatus(0);
+                return;
+            }
+            const stream = new EventSource('/api/stream');
+            stream.onmessage = event => {
+                const frame = JSON.parse(event.data);
+                transitionCount += frame.transitions.length;
+                renderStatus(frame.status);
+            };
+            setInterval(() => {
+                transitionRate = transitionCount;
+                transitionCount = 0;
+            }, 1000);
+        }
+        
+        // Transition lateness histograms, refreshed every 2 s
+        const timingLabels = {fastCircle: 'Fast circle step', frameCircle: 'Frame circle flip', vsync: 'VSYNC edge', field: 'FIELD edge'};
+        
+        function updateTiming() {
+            fetch('/api/timing')
+            .then(response => {
+                if (!response.ok) {
+                    document.getElementById('timingSection').style.display = 'none';
+                    return null;
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (!data) return;
+                let rows = '';
+                for (const [kind, stats] of Object.entries(data.lateness)) {
+                    rows += `<tr><td>${timingLabels[kind] || kind}</td>
+                        <td>${data.nominalUs[kind]} μs</td><td>${stats.count}</td>
+                        <td>${stats.p50Us} μs</td><td>${stats.p99Us} μs</td>
+                        <td>${stats.p999Us} μs</td><td>${stats.maxUs} μs</td></tr>`;
+                }
+                document.getElementById('timingRows').innerHTML = rows;
+            })
+            .catch(() => {});
+        }
+        
+        function resetTiming() {
+            fetch('/api/timing/reset', {method: 'POST'}).then(updateTiming);
+        }
+        
         // Update status on page load
         updateStatus();
-        
-        // Auto-refresh status every 100ms for smooth LED updates
-        setInterval(updateStatus, 100);
+        startStream();
+        updateTiming();
+        setInterval(updateTiming, 2000);
     </script>
 </body>
 </html>'''
 
 
-def create_handler(simulator):
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that handles connections on a bounded pool of worker threads
+    
+    Accepted connections wait in a bounded queue for a worker; when the queue
+    is full new connections get an immediate 503 instead of piling up. Event
+    streams are capped by their StateStreamer and get their own share of
+    workers, so open streams never starve status polls or control POSTs.
+    Idle keep-alive connections are parked in a selector and re-queued when
+    the client sends its next request, so they do not tie up workers either.
+    """
+    
+    def __init__(self, server_address, handler, workers=16, stream_workers=0, backlog=256,
+                 keep_alive_timeout=15.0):
+        self.pending = queue.Queue(maxsize=backlog)
+        # listen() backlog; the socketserver default of 5 makes bursts of
+        # new connections wait out 1 s SYN retransmits
+        self.request_queue_size = backlog
+        super().__init__(server_address, handler)
+        
+        # Idle keep-alive connections: socket -> (client address, parked since)
+        self.keep_alive_timeout = keep_alive_timeout
+        self.parked = {}
+        self.parked_lock = threading.Lock()
+        self.selector = selectors.DefaultSelector()
+        self.selector_wakeup, self.selector_signal = socket.socketpair()
+        self.selector_wakeup.setblocking(False)
+        self.selector.register(self.selector_wakeup, selectors.EVENT_READ)
+        self.selector_running = True
+        self.selector_thread = threading.Thread(target=self.selector_loop, daemon=True)
+        self.selector_thread.start()
+        
+        self.workers = []
+        for _ in range(workers + stream_workers):
+            worker = threading.Thread(target=self.worker_loop, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+    
+    def process_request(self, request, client_address):
+        """Queue an accepted connection for the worker pool"""
+        try:
+            self.pending.put_nowait((request, client_address))
+        except queue.Full:
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                                b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+            except OSError:
+                pass
+            self.shutdown_request(request)
+    
+    def finish_request(self, request, client_address):
+        """Run the handler and return it so the worker can see if it went idle"""
+        return self.RequestHandlerClass(request, client_address, self)
+    
+    def worker_loop(self):
+        """Serve queued connections until the server is closed"""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            handler = None
+            try:
+                handler = self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            if handler is not None and handler.keep_alive_idle and self.selector_running:
+                self.park(request, client_address)
+            else:
+                self.shutdown_request(request)
+    
+    def park(self, request, client_address):
+        """Watch an idle keep-alive connection for its next request"""
+        with self.parked_lock:
+            self.parked[request] = (client_address, time.monotonic())
+            self.selector.register(request, selectors.EVENT_READ)
+        try:
+            self.selector_signal.send(b'\0')
+        except OSError:
+            pass
+    
+    def selector_loop(self):
+        """Re-queue parked connections when readable; close ones idle too long"""
+        while self.selector_running:
+            events = self.selector.select(timeout=1.0)
+            ready = []
+            with self.parked_lock:
+                for key, _ in events:
+                    if key.fileobj is self.selector_wakeup:
+                        try:
+                            self.selector_wakeup.recv(4096)
+                        except OSError:
+                            pass
+                        continue
+                    request = key.fileobj
+                    self.selector.unregister(request)
+                    ready.append((request, self.parked.pop(request)[0]))
+                
+                # Close connections the client left idle
+                cutoff = time.monotonic() - self.keep_alive_timeout
+                expired = [request for request, (_, since) in self.parked.items() if since < cutoff]
+                for request in expired:
+                    self.selector.unregister(request)
+                    del self.parked[request]
+            
+            for request in expired:
+                self.shutdown_request(request)
+            for request, client_address in ready:
+                self.process_request(request, client_address)
+    
+    def server_close(self):
+        """Stop the workers, drop parked connections and close the listening socket"""
+        super().server_close()
+        self.selector_running = False
+        for _ in self.workers:
+            self.pending.put(None)
+        with self.parked_lock:
+            parked = list(self.parked)
+            self.parked.clear()
+        for request in parked:
+            self.shutdown_request(request)
+
+
+def create_handler(simulator, handler_class=None, streamer=None):
     """Create HTTP handler with simulator reference"""
+    if handler_class is None:
+        handler_class = LEDTesterHTTPHandler
+    if streamer is None:
+        streamer = StateStreamer(simulator)
+    # Render and compress the static UI once, not per request
+    assets = AssetCache.for_handler(handler_class)
+    metrics = MetricsExporter(simulator.metric_families, streamer.metric_families)
     def handler(*args, **kwargs):
-        return LEDTesterHTTPHandler(simulator, *args, **kwargs)
+        return handler_class(simulator, *args, streamer=streamer, assets=assets, metrics=metrics, **kwargs)
     return handler
 
 
+def create_server(simulator, host='localhost', port=8080, workers=16, max_streams=64, handler_class=None):
+    """Create a pooled HTTP server for the simulator"""
+    streamer = StateStreamer(simulator, max_subscribers=max_streams)
+    handler = create_handler(simulator, handler_class, streamer)
+    return PooledHTTPServer((host, port), handler, workers=workers, stream_workers=max_streams)
+
+
+def http_arg_parser(description):
+    """Build the argument parser with the HTTP server options of every launcher, fleet included"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--host', default='localhost', help='Address to bind (default: localhost)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='Worker threads for regular requests (default: 16)')
+    return parser
+
+
+def server_arg_parser(description):
+    """Build the argument parser with the options shared by the single-device simulator launchers"""
+    parser = http_arg_parser(description)
+    parser.add_argument('--max-streams', type=int, default=64,
+                        help='Maximum concurrent /api/stream subscribers (default: 64)')
+    parser.add_argument('--trace-file', metavar='PATH',
+                        help='Record every transition to a binary trace file (see trace_file.py)')
+    parser.add_argument('--vcd-file', metavar='PATH',
+                        help='Record every transition to a VCD waveform file (see vcd_export.py)')
+    parser.add_argument('--vsync-replay', metavar='PATH',
+                        help='Replay VSYNC edges from a timestamp file (see vsync_sources.py)')
+    parser.add_argument('--vsync-replay-units', choices=sorted(REPLAY_UNITS), default='s',
+                        help='Time unit of the replay file (default: s)')
+    parser.add_argument('--vsync-replay-loop', action='store_true',
+                        help='Start the replay over when it reaches the end of the file')
+    parser.add_argument('--edge-listen', metavar='ADDRESS',
+                        help='Take VSYNC/FIELD edges from a datagram socket, unix:/path or [udp:]host:port '
+                             '(see edge_listener.py)')
+    return parser
+
+
+def parse_server_args(description):
+    """Parse the command line options shared by the simulator launchers"""
+    return server_arg_parser(description).parse_args()
+
+
+def start_recorders(simulator, args):
+    """Start the --trace-file / --vcd-file recorders asked for on the command line"""
+    recorders = []
+    with simulator.wakeup:  # no transitions between the snapshot and the first entry recorded
+        state = simulator.snapshot()
+        if args.trace_file:
+            recorders.append(TraceRecorder(simulator, TraceFileWriter(args.trace_file, state.time_us)))
+        if args.vcd_file:
+            recorders.append(TraceRecorder(simulator, VCDWriter(args.vcd_file, state, state.time_us)))
+    return recorders
+
+
+def start_vsync_replay(simulator, args):
+    """Switch VSYNC to the --vsync-replay file if one was given on the command line"""
+    if args.vsync_replay:
+        replay = ReplaySource(args.vsync_replay, args.vsync_replay_units, args.vsync_replay_loop)
+        simulator.update_vsync_source(replay=replay)
+
+
+def start_edge_listener(simulator, address):
+    """Start an edge listener on address (--edge-listen) in place of the internal VSYNC source"""
+    if not address:
+        return None
+    listener = EdgeListener(simulator, address)
+    simulator.edge_listener = listener
+    simulator.update_vsync_source(source='external')
+    listener.start()
+    return listener
+
+
 def main():
     """Main function"""
+    args = parse_server_args("ESP32 LED Tester Simulator (Web Version)")
     print("Starting ESP32 LED Tester Simulator (Web Version)...")
     
     # Create simulator
     simulator = LEDTesterSimulator()
+    start_vsync_replay(simulator, args)
+    listener = start_edge_listener(simulator, args.edge_listen)
+    recorders = start_recorders(simulator, args)
     
     # Start web server
-    port = 8080
-    handler = create_handler(simulator)
-    httpd = HTTPServer(('localhost', port), handler)
+    httpd = create_server(simulator, args.host, args.port, args.workers, args.max_streams)
+    port = httpd.server_address[1]
     
-    print(f"Web server starting on http://localhost:{port}")
+    print(f"Web server starting on http://{args.host}:{port}")
     print("Open your browser and navigate to the URL above")
+    if listener is not None:
+        print(f"Listening for VSYNC/FIELD edges on {listener.address}")
     print("Press Ctrl+C to stop")
     
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down...")
+        if listener is not None:
+            listener.stop()
         simulator.stop()
-        httpd.shutdown()
+        for recorder in recorders:
+            recorder.close()
+        httpd.server_close()
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Binary Status Record
+Fixed-layout packing of /api/status for high-rate pollers (/api/status.bin)
+
+Layout (little-endian, 40 bytes):
+
+    offset  type     field
+    0       uint8    layout version (1)
+    1       int8     current fast-circle LED index (0-11)
+    2       uint16   flags, see FLAG_* (bit 0 = fast circle enabled, ...)
+    4       uint16   outputs: bits 0-11 = LED1-LED12, bit 12 = D4 output
+    6       uint8    frame circle phase (0 = LED1&7, 1 = LED4&10)
+    7       uint8    reserved (0)
+    8       uint64   state version
+    16      uint64   engine timestamp of the state (monotonic µs)
+    24      float64  measured VSYNC frame rate (fps)
+    32      uint32   odd field duration (µs)
+    36      uint32   even field duration (µs)
+"""
+
+import http.client
+import struct
+import sys
+from collections import namedtuple
+
+LAYOUT_VERSION = 1
+RECORD = struct.Struct('<BbHHBxQQdII')
+
+# Flag bits
+FLAG_FAST_CIRCLE = 1 << 0
+FLAG_FRAME_CIRCLE = 1 << 1
+FLAG_D4_OUTPUT = 1 << 2
+FLAG_VSYNC_LOCK = 1 << 3
+FLAG_VSYNC_DETECTION = 1 << 4
+FLAG_VSYNC_ACTIVE = 1 << 5
+FLAG_VSYNC_DETECTED = 1 << 6
+FLAG_FIELD_ODD = 1 << 7
+FLAG_FRAME_RATE_MISMATCH = 1 << 8
+
+D4_OUTPUT_BIT = 1 << 12
+LED_BITS = (1 << 12) - 1
+
+StatusRecord = namedtuple('StatusRecord', (
+    'version', 'time_us', 'led_mask', 'd4_output_state', 'flags',
+    'current_fast_led', 'frame_circle_phase', 'measured_frame_rate',
+    'odd_field_duration', 'even_field_duration',
+))
+
+
+def encode(state):
+    """Pack a SimulatorState into the binary status record"""
+    flags = ((FLAG_FAST_CIRCLE if state.fast_circle_enabled else 0)
+             | (FLAG_FRAME_CIRCLE if state.frame_circle_enabled else 0)
+             | (FLAG_D4_OUTPUT if state.d4_output_enabled else 0)
+             | (FLAG_VSYNC_LOCK if state.vsync_lock_enabled else 0)
+             | (FLAG_VSYNC_DETECTION if state.vsync_detection_enabled else 0)
+             | (FLAG_VSYNC_ACTIVE if state.vsync_active else 0)
+             | (FLAG_VSYNC_DETECTED if state.vsync_detected else 0)
+             | (FLAG_FIELD_ODD if state.field_odd else 0)
+             | (FLAG_FRAME_RATE_MISMATCH if state.frame_rate_mismatch else 0))
+    outputs = state.led_mask | (D4_OUTPUT_BIT if state.d4_output_state else 0)
+    return RECORD.pack(LAYOUT_VERSION, state.current_fast_led, flags, outputs,
+                       int(state.frame_circle_phase), state.version, state.time_us,
+                       state.measured_frame_rate, state.odd_field_duration,
+                       state.even_field_duration)
+
+
+def decode(data):
+    """Unpack a binary status record into a StatusRecord"""
+    (layout, current_fast_led, flags, outputs, phase, version, time_us,
+     fps, odd_us, even_us) = RECORD.unpack_from(data)
+    if layout != LAYOUT_VERSION:
+        raise ValueError(f"Unsupported status record layout {layout}")
+    return StatusRecord(version, time_us, outputs & LED_BITS, bool(outputs & D4_OUTPUT_BIT),
+                        flags, current_fast_led, phase, fps, odd_us, even_us)
+
+
+def main():
+    """Fetch and print one binary status record: status_bin.py [host:port]"""
+    address = sys.argv[1] if len(sys.argv) > 1 else 'localhost:8080'
+    connection = http.client.HTTPConnection(address, timeout=5)
+    connection.request('GET', '/api/status.bin')
+    record = decode(connection.getresponse().read())
+    for name, value in record._asdict().items():
+        if name in ('led_mask', 'flags'):
+            value = f"{value:#06x}"
+        print(f"{name:20s}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -109,8 +109,8 @@ def update_simulator_file(simulator_file, constants):
         )
         
         content = re.sub(
-            r'self\.frame_rate = \d+',
-            f'self.frame_rate = {constants["frame_rate"]}',
+            r'self\.frame_rate = Fraction\(\d+\)',
+            f'self.frame_rate = Fraction({constants["frame_rate"]})',
             content
         )
         
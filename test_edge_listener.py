@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Edge Listener Tests
+Edge records over a Unix datagram socket, read back by EdgeListener
+
+The listener thread is not started; each test drains the socket with
+read_batch() so the counters can be checked after every datagram.
+"""
+
+import socket
+import time
+
+import pytest
+
+import simulator_web
+from edge_listener import EDGE_FIELD, EDGE_VSYNC, EdgeListener, EdgeSender, encode_edge
+
+
+@pytest.fixture
+def listener(tmp_path):
+    sim = simulator_web.LEDTesterSimulator()
+    listener = EdgeListener(sim, f"unix:{tmp_path / 'edges.sock'}")
+    yield listener
+    listener.stop()
+    sim.stop()
+
+
+def test_edges_round_trip(listener):
+    sender = EdgeSender(listener.address)
+    now_us = listener.clock.now_us()
+    sender.send([(EDGE_FIELD, 1, now_us), (EDGE_VSYNC, 1, now_us)])
+    sender.send([(EDGE_VSYNC, 0, now_us + 1000)])
+    edges = listener.read_batch()
+    sender.close()
+
+    assert [edge[:3] for edge in edges] == [
+        (EDGE_FIELD, 1, now_us), (EDGE_VSYNC, 1, now_us), (EDGE_VSYNC, 0, now_us + 1000)]
+    assert all(received_us >= now_us for *_, received_us in edges)
+    report = listener.report()
+    assert (report["datagrams"], report["batches"], report["maxBatch"]) == (2, 1, 2)
+    assert report["edges"] == {"vsync": 2, "field": 1}
+    assert (report["lost"], report["malformed"]) == (0, 0)
+    assert report["transitUs"]["count"] == 3
+
+
+def test_arrival_time_stamps(listener):
+    sender = EdgeSender(listener.address)
+    before_us = listener.clock.now_us()
+    sender.send([(EDGE_VSYNC, 1, 0)])
+    [(_, _, time_us, received_us)] = listener.read_batch()
+    sender.close()
+
+    assert before_us <= time_us == received_us
+    assert listener.transit.summary()["count"] == 0
+
+
+def test_sequence_gaps_count_as_lost(listener):
+    sender = EdgeSender(listener.address)
+    sender.send([(EDGE_VSYNC, 1, 0)])
+    sender.sequence += 3  # three records lost on the way
+    sender.send([(EDGE_VSYNC, 0, 0)])
+    sender.sequence -= 2  # a late, repeated record is not a gap
+    sender.send([(EDGE_VSYNC, 1, 0)])
+    listener.read_batch()
+    sender.close()
+
+    assert listener.lost == 3
+    assert listener.edges[EDGE_VSYNC] == 3
+
+
+def test_malformed_datagrams(listener):
+    _, path = listener.address.split(':', 1)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.connect(path)
+        sock.send(encode_edge(EDGE_VSYNC, 1, 0, 0)[:-1])  # not whole records
+        sock.send(encode_edge(7, 1, 0, 1) + encode_edge(EDGE_VSYNC, 1, 0, 2))  # unknown kind
+    edges = listener.read_batch()
+
+    assert [edge[0] for edge in edges] == [EDGE_VSYNC]
+    assert (listener.datagrams, listener.malformed, listener.lost) == (2, 2, 0)
+
+
+def test_listener_feeds_simulator(tmp_path):
+    sim = simulator_web.LEDTesterSimulator()
+    listener = simulator_web.start_edge_listener(sim, f"unix:{tmp_path / 'edges.sock'}")
+    sender = EdgeSender(listener.address)
+    try:
+        now_us = sim.now_us()
+        sender.send([(EDGE_FIELD, 1, now_us), (EDGE_VSYNC, 1, now_us)])
+        deadline = time.monotonic() + 5
+        while sim.field_edges == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        sender.close()
+        listener.stop()
+        sim.stop()
+
+    assert sim.field_edges == 1
+    assert listener.edges == {EDGE_VSYNC: 1, EDGE_FIELD: 1}
+
+
+def test_virtual_time_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        EdgeListener(simulator_web.LEDTesterSimulator(virtual_time=True), f"unix:{tmp_path / 'edges.sock'}")
+
+
+def test_edges_outside_the_clock_window_are_rejected():
+    sim = simulator_web.LEDTesterSimulator()
+    try:
+        sim.update_vsync_source(source='external')
+        sim.update_frame_circle(vsync_lock=True)
+        now_us = sim.now_us()
+        steps = sim.fast_circle_steps
+        sim.ingest_edges([(EDGE_VSYNC, 1, now_us + 60000000, now_us),
+                          (EDGE_VSYNC, 1, now_us - 20000000, now_us),
+                          (EDGE_FIELD, 1, now_us + 60000000, now_us)])
+        rejected = dict(sim.ingest_rejected)
+        time.sleep(0.05)
+        state = sim.snapshot()
+    finally:
+        sim.stop()
+
+    assert rejected == {'stale': 1, 'future': 2, 'reordered': 0}
+    assert sim.field_edges == 0
+    assert sim.last_vsync_time < now_us
+    # The engine kept running at its own pace: no burst of catch-up steps
+    assert sim.fast_circle_steps - steps < 200
+    assert state.time_us <= sim.now_us()
+
+
+def test_reordered_edges_are_rejected():
+    sim = simulator_web.LEDTesterSimulator()
+    try:
+        sim.update_vsync_source(source='external')
+        now_us = sim.now_us()
+        sim.ingest_edges([(EDGE_FIELD, 1, now_us - 40000, now_us), (EDGE_FIELD, 0, now_us - 20000, now_us),
+                          (EDGE_FIELD, 1, now_us - 30000, now_us),  # out of order
+                          (EDGE_VSYNC, 1, now_us - 30000, now_us), (EDGE_VSYNC, 0, now_us - 29000, now_us),
+                          (EDGE_VSYNC, 1, now_us - 31000, now_us)])  # out of order
+    finally:
+        sim.stop()
+
+    assert sim.ingest_rejected == {'stale': 0, 'future': 0, 'reordered': 2}
+    assert sim.field_edges == 2
+    assert sim.odd_field_duration == 20000
+    assert sim.field_stats[True].count == 1
+    assert sim.last_vsync_time == now_us - 30000
+    assert not sim.vsync_active
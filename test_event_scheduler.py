@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Event Scheduler Tests
+Ordering, re-scheduling and virtual time of EventScheduler
+"""
+
+from event_scheduler import EventScheduler, VirtualClock
+
+
+def test_events_fire_in_time_order_at_their_due_times():
+    clock = VirtualClock()
+    scheduler = EventScheduler(clock)
+    fired = []
+    for name, due_us in (('c', 300), ('a', 100), ('b', 200)):
+        scheduler.schedule(name, due_us, lambda due_us, name=name: fired.append((name, due_us, clock.now_us())))
+
+    assert scheduler.run_until(250) == 2
+    assert fired == [('a', 100, 100), ('b', 200, 200)]
+    assert clock.now_us() == 250
+    assert scheduler.next_due() == 300
+
+
+def test_rescheduling_replaces_the_pending_event():
+    clock = VirtualClock()
+    scheduler = EventScheduler(clock)
+    fired = []
+    scheduler.schedule('timer', 100, fired.append)
+    scheduler.schedule('timer', 500, fired.append)
+    scheduler.schedule('other', 200, fired.append)
+    scheduler.cancel('other')
+
+    assert scheduler.run_until(1000) == 1
+    assert fired == [500]
+    assert not scheduler.is_pending('timer')
+    assert scheduler.next_due() is None
+
+
+def test_callbacks_can_rearm_their_timer():
+    clock = VirtualClock()
+    scheduler = EventScheduler(clock)
+    fired = []
+    def on_tick(due_us):
+        fired.append(due_us)
+        scheduler.schedule('tick', due_us + 1000, on_tick)
+    scheduler.schedule('tick', 0, on_tick)
+
+    assert scheduler.run_until(10000) == 11
+    assert fired == list(range(0, 10001, 1000))
+    assert scheduler.events_processed == 11
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Frame Rate Estimator Tests
+Window statistics and missed/extra pulse judgement
+"""
+
+import random
+import statistics
+
+from frame_rate_estimator import FrameRateEstimator, rate_mismatch
+
+
+def feed(estimator, edges):
+    """Add edges; returns how many were judged extra pulses"""
+    return sum(1 for edge in edges if not estimator.add_edge(edge))
+
+
+def test_window_statistics_match_exact_ones():
+    rng = random.Random(1)
+    edges = [round(k * 41708 + rng.gauss(0, 300)) for k in range(1000)]
+    estimator = FrameRateEstimator(window=32)
+    feed(estimator, edges)
+    window = [b - a for a, b in zip(edges, edges[1:])][-32:]
+
+    stats = estimator.stats
+    assert stats.count == 32
+    assert abs(stats.mean_us - statistics.mean(window)) < 1e-6
+    assert abs(stats.std_us - statistics.stdev(window)) < 1e-6
+    assert stats.median_us == statistics.median(window)
+    assert (stats.min_us, stats.max_us) == (min(window), max(window))
+    assert (stats.missed_pulses, stats.extra_pulses) == (0, 0)
+
+
+def test_missed_and_extra_pulses():
+    period = 41708
+    edges = [k * period for k in range(40)]
+    del edges[20]  # one missed pulse
+    edges.insert(30, edges[29] + period // 5)  # one extra pulse
+    estimator = FrameRateEstimator(window=64)
+    extra = feed(estimator, edges)
+
+    assert extra == 1
+    assert (estimator.stats.missed_pulses, estimator.stats.extra_pulses) == (1, 1)
+    # 39 real edges: 37 one-period intervals plus the gap, recorded once as one period
+    assert estimator.stats.count == 38
+    assert estimator.stats.max_us == period
+    assert abs(estimator.rate - 1000000 / period) < 1e-9
+    assert not rate_mismatch(estimator.median_rate, 24)
+    assert rate_mismatch(estimator.median_rate, 25)
+
+
+def test_rate_change_starts_over():
+    edges = [k * 41708 for k in range(40)]
+    edges += [edges[-1] + k * 16683 for k in range(1, 40)]  # 24 -> 59.94 fps
+    estimator = FrameRateEstimator()
+    feed(estimator, edges)
+
+    assert (estimator.stats.missed_pulses, estimator.stats.extra_pulses) == (0, 0)
+    assert estimator.median_us == 16683
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Latency Histogram Tests
+Bucket bounds and percentiles of LatencyHistogram
+"""
+
+import random
+
+from latency_histogram import BUCKETS, MAX_VALUE, LatencyHistogram, bucket_index, bucket_range
+
+
+def test_buckets_cover_every_value_within_one_64th():
+    values = list(range(5000)) + [random.Random(1).randrange(MAX_VALUE) for _ in range(5000)] + [MAX_VALUE]
+    for value in values:
+        index = bucket_index(value)
+        low, high = bucket_range(index)
+        assert 0 <= index < BUCKETS
+        assert low <= value <= high
+        assert high - low <= max(0, value // 64)
+
+
+def test_percentiles_never_understate():
+    rng = random.Random(1)
+    values = [int(rng.expovariate(1 / 200)) for _ in range(100000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    histogram.record(-5)  # early: counted as 0
+    values.append(0)
+    values.sort()
+
+    summary = histogram.summary()
+    assert summary["count"] == len(values)
+    assert summary["maxUs"] == values[-1]
+    for fraction, key in ((0.5, "p50Us"), (0.99, "p99Us"), (0.999, "p999Us")):
+        exact = values[int(fraction * len(values)) - 1]
+        assert exact <= summary[key] <= exact + exact // 64 + 1
+    assert histogram.cumulative([100, 1000])[-1] == len(values)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Metrics Tests
+Prometheus text rendering and scrape caching
+"""
+
+import metrics
+from latency_histogram import LatencyHistogram
+
+
+def test_render_families():
+    histogram = LatencyHistogram()
+    for value in (40, 40, 300, 20000000):
+        histogram.record(value)
+    body = metrics.render_families([
+        ('ledtester_edges_total', 'counter', 'Edges', [({'kind': 'a"b\\c'}, 3)]),
+        ('ledtester_rate', 'gauge', 'Rate', [({}, 23.976)]),
+        ('ledtester_lateness_seconds', 'histogram', 'Lateness', [({'type': 'vsync'}, metrics.histogram_value(histogram))]),
+    ]).decode()
+    lines = body.splitlines()
+
+    assert body.endswith('\n')
+    assert lines[:6] == [
+        '# HELP ledtester_edges_total Edges',
+        '# TYPE ledtester_edges_total counter',
+        'ledtester_edges_total{kind="a\\"b\\\\c"} 3',
+        '# HELP ledtester_rate Rate',
+        '# TYPE ledtester_rate gauge',
+        'ledtester_rate 23.976',
+    ]
+    assert 'ledtester_lateness_seconds_bucket{type="vsync",le="5e-05"} 2' in lines
+    assert 'ledtester_lateness_seconds_bucket{type="vsync",le="0.0005"} 3' in lines
+    assert 'ledtester_lateness_seconds_bucket{type="vsync",le="10.0"} 3' in lines
+    assert 'ledtester_lateness_seconds_bucket{type="vsync",le="+Inf"} 4' in lines
+    assert 'ledtester_lateness_seconds_count{type="vsync"} 4' in lines
+    assert 'ledtester_lateness_seconds_sum{type="vsync"} 20.00038' in lines
+
+
+def test_exporter_caches_renders():
+    counter = [0]
+    exporter = metrics.MetricsExporter(
+        lambda: [('ledtester_ticks_total', 'counter', 'Ticks', [({}, counter[0])])], cache_seconds=60)
+    exporter.http.observe('/api/status', 'GET', 200, 150)
+    first = exporter.render()
+    counter[0] = 5
+    assert exporter.render() is first
+    assert (exporter.scrapes, exporter.renders) == (2, 1)
+    assert b'ledtester_http_requests_total{route="/api/status",method="GET",code="200"} 1' in first
+
+    exporter.cache_seconds = 0
+    assert b'ledtester_ticks_total 5' in exporter.render()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Fleet Tests
+Fleet devices against the event-driven LEDTesterSimulator, in virtual time
+"""
+
+from fractions import Fraction
+
+import simulator_fleet
+import simulator_web
+
+
+def outputs(state):
+    """Get the LED and D4 outputs of a SimulatorState"""
+    return state.led_mask, state.d4_output_state, state.current_fast_led, state.frame_circle_phase
+
+
+def test_closed_form_device_matches_event_driven_simulator():
+    fleet = simulator_fleet.FleetSimulator(3, virtual_time=True)
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    # Configure after the start step and flip have fired in both
+    fleet.advance(0.0001)
+    sim.advance(0.0001)
+    for target in (fleet.devices[0], sim):
+        target.update_fast_circle(interval=3)
+        target.update_frame_circle(frame_rate=Fraction(30000, 1001), d4_output=True, vsync_lock=True)
+        target.update_vsync_detection(rate=Fraction(24000, 1001))
+
+    for _ in range(1000):
+        fleet.advance(0.00731)
+        sim.advance(0.00731)
+        device, expected = fleet.devices[0].snapshot(), sim.snapshot()
+        assert device.time_us == expected.time_us
+        assert outputs(device) == outputs(expected)
+    assert fleet.vsync_lock_resets == sim.vsync_lock_resets > 100
+
+
+def test_pll_lock_mode_is_rejected():
+    fleet = simulator_fleet.FleetSimulator(1, virtual_time=True)
+    device = fleet.devices[0]
+    for update in (lambda: device.update_frame_circle(vsync_lock=True, vsync_lock_mode='pll'),
+                   lambda: device.update_config({'frame_circle': {'vsync_lock_mode': 'pll'}})):
+        try:
+            update()
+        except ValueError:
+            continue
+        raise AssertionError("pll lock mode was accepted")
+
+    device.update_frame_circle(vsync_lock=True, vsync_lock_mode='reset', pll_bandwidth=2.5)
+    state = device.snapshot()
+    assert (state.vsync_lock_enabled, state.vsync_lock_mode, state.pll_bandwidth) == (True, 'reset', 2.5)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Engine Tests
+Exact timing checks of LEDTesterSimulator in virtual time
+
+Run with python3 -m pytest. Virtual time makes every edge, step and flip
+deterministic, so these tests compare timestamps for equality.
+"""
+
+from fractions import Fraction
+
+import simulator_web
+from call_recorder import record_calls, record_fires
+
+
+def first_fire_after(fires, edge_us):
+    """Get the first (due_us, fired_us) due after edge_us"""
+    return next(fire for fire in fires if fire[0] > edge_us)
+
+
+def test_vsync_lock_steps_from_edge():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    fires = record_fires(sim, 'on_fast_circle_event')
+    edges = record_calls(sim, 'lock_to_vsync_edge')
+    sim.update_fast_circle(interval=7)
+    sim.update_frame_circle(enabled=False, vsync_lock=True)
+    sim.update_vsync_detection(rate=Fraction(24000, 1001))
+    sim.advance(10)
+
+    assert len(edges) >= 200
+    for edge_us in edges[:-1]:
+        assert first_fire_after(fires, edge_us) == (edge_us + 7000, edge_us + 7000)
+
+
+def test_vsync_lock_flips_from_edge():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    fires = record_fires(sim, 'on_frame_circle_event')
+    edges = record_calls(sim, 'lock_to_vsync_edge')
+    sim.update_fast_circle(enabled=False)
+    sim.update_frame_circle(frame_rate=Fraction(60000, 1001), vsync_lock=True)
+    sim.update_vsync_detection(rate=Fraction(24000, 1001))
+    sim.advance(10)
+
+    assert len(edges) >= 200
+    for edge_us in edges[:-1]:
+        # Flip 1 of the grid anchored at the edge: half a frame, floored
+        flip_us = edge_us + 1000000 * 1001 // (2 * 60000)
+        assert first_fire_after(fires, edge_us) == (flip_us, flip_us)
+    assert sim.vsync_lock_resets == len(edges)
+
+
+class LateWakeup:
+    """Stands in for the engine's condition so main_loop() runs on a virtual clock
+    
+    wait() moves the clock instead of sleeping and always wakes late_us
+    after the deadline or VSYNC edge it was waiting for. Edges are handled
+    when due, as the real-time VSYNC thread does, so they reach main_loop
+    through its queue, after it overslept. The loop stops at end_us.
+    """
+    
+    def __init__(self, sim, edges, late_us, end_us):
+        self.sim = sim
+        self.edges = list(edges)
+        self.late_us = late_us
+        self.end_us = end_us
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def notify(self):
+        pass
+    
+    def wait(self, timeout=None):
+        clock = self.sim.clock
+        wake_us = self.end_us if timeout is None else clock.now_us() + round(timeout * 1000000)
+        if self.edges:
+            wake_us = min(wake_us, self.edges[0])
+        wake_us += self.late_us
+        notified = False
+        while self.edges and self.edges[0] <= wake_us:
+            self.sim.handle_vsync_edge(self.edges.pop(0))
+            notified = True
+        clock.advance_to(wake_us)
+        if wake_us >= self.end_us:
+            self.sim.running = False
+        return notified
+
+
+def test_main_loop_locks_queued_edges():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(interval=7)
+    sim.update_frame_circle(frame_rate=Fraction(60000, 1001), vsync_lock=True)
+    sim.scheduler.cancel('vsync')  # edges come from LateWakeup instead
+    events = []  # (callback name, due or edge time, engine time)
+    for name in ('on_fast_circle_event', 'on_frame_circle_event', 'lock_to_vsync_edge'):
+        record_calls(sim, name, lambda time_us, name=name: (name, time_us, sim.clock.now_us()), events)
+    edges = [5000 + k * 1000000 * 1001 // 24000 for k in range(1, 121)]
+    sim.wakeup = LateWakeup(sim, edges, late_us=1500, end_us=edges[-1] + 100000)
+    sim.running = True
+    sim.main_loop()
+
+    locks = [index for index, event in enumerate(events) if event[0] == 'lock_to_vsync_edge']
+    assert [events[index][1] for index in locks] == edges
+    first_offsets = {'on_fast_circle_event': 7000, 'on_frame_circle_event': 1000000 * 1001 // (2 * 60000)}
+    overslept = 0
+    for index in locks:
+        edge_us = events[index][1]
+        before = [event for event in events[:index] if event[0] != 'lock_to_vsync_edge']
+        # Events due before the edge fired before the lock, even those the
+        # engine only reached after the edge ...
+        assert all(due_us < edge_us for _, due_us, _ in before)
+        overslept += sum(fired_us > edge_us for _, _, fired_us in before)
+        # ... and each circle's first event after the lock is on the edge's grid
+        for name, offset_us in first_offsets.items():
+            assert next(due_us for event, due_us, _ in events[index:] if event == name) == edge_us + offset_us
+    assert overslept > 0
+    assert sim.vsync_lock_resets == len(edges)
+
+
+def test_stalled_circles_skip_to_the_next_deadline():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.scheduler.cancel('vsync')
+    start_us = sim.now_us()
+    steps = record_fires(sim, 'on_fast_circle_event')
+    flips = record_fires(sim, 'on_frame_circle_event')
+    masks = record_calls(sim, 'handle_frame_circle', lambda: sim.led_mask, after=True)
+    # Every wake-up comes 50 ms after the deadline it waited for
+    sim.wakeup = LateWakeup(sim, [], late_us=50000, end_us=start_us + 1000000)
+    sim.running = True
+    sim.main_loop()
+
+    # At most two steps and flips per wake-up (the one it waited for and
+    # the one due at the wake-up time) instead of a catch-up burst
+    wakeups = 1000000 // 51000 + 1
+    assert len(steps) <= 2 * wakeups and len(flips) <= 2 * wakeups
+    # Steps and flips run or skipped, plus the first ones (armed before
+    # record_fires() wrapped the callbacks, so not in steps and flips)
+    covered_steps = 1 + len(steps) + sim.skipped_events['fastCircle']
+    covered_flips = 1 + len(flips) + sim.skipped_events['frameCircle']
+    assert covered_steps > 950 and covered_flips > 45
+    # The skipped events still moved both circles along their grids
+    assert len(masks) == len(flips) + 1
+    for (due_us, _), mask in zip(flips, masks[1:]):
+        tick = round((due_us - start_us) * 48 / 1000000)
+        assert due_us == start_us + tick * 1000000 // 48
+        phase_mask = simulator_web.FRAME_PHASE_MASKS[tick % 2]
+        assert mask & phase_mask == phase_mask
+    for due_us, _ in steps:
+        assert (due_us - start_us) % 1000 == 0
+    assert sim.current_fast_led == covered_steps % 12 == ((steps[-1][0] - start_us) // 1000 + 1) % 12
+    assert sim.frame_tick == covered_flips
+    assert sim.frame_circle_phase == bool(covered_flips % 2)
+
+
+def test_vsync_edges_on_absolute_deadlines():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    edges = record_calls(sim, 'handle_vsync_edge')
+    sim.update_fast_circle(enabled=False)
+    sim.update_vsync_detection(rate=Fraction(30000, 1001))
+    start_us = sim.now_us()
+    sim.advance(1000)
+
+    assert len(edges) == 1000 * 30000 // 1001
+    for k, edge_us in enumerate(edges, 1):
+        assert edge_us == start_us + k * 1000000 * 1001 // 30000
+    # No accumulated error: the last edge is within 1 us of the exact period
+    assert abs(edges[-1] - start_us - len(edges) * Fraction(1000000 * 1001, 30000)) < 1
+
+
+def test_frame_flips_on_tick_deadlines():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    fires = record_fires(sim, 'on_frame_circle_event')
+    sim.update_fast_circle(enabled=False)
+    sim.update_frame_circle(frame_rate=Fraction(24000, 1001))
+    anchor_us = sim.frame_anchor_time
+    sim.advance(1000)
+
+    assert len(fires) == 1000 * 2 * 24000 // 1001 + 1
+    for k, (due_us, fired_us) in enumerate(fires):
+        assert due_us == fired_us == anchor_us + k * 1000000 * 1001 // (2 * 24000)
+
+
+def test_parse_frame_rate_snaps_ntsc_decimals():
+    assert simulator_web.parse_frame_rate('23.976') == Fraction(24000, 1001)
+    assert simulator_web.parse_frame_rate(29.97) == Fraction(30000, 1001)
+    assert simulator_web.parse_frame_rate('59.94') == Fraction(60000, 1001)
+    assert simulator_web.parse_frame_rate('24000/1001') == Fraction(24000, 1001)
+    assert simulator_web.parse_frame_rate(25) == Fraction(25)
+    assert simulator_web.parse_frame_rate('12.5') == Fraction(25, 2)
+    assert simulator_web.format_frame_rate(Fraction(24000, 1001)) == '24000/1001'
+
+
+def test_led_mask_to_list():
+    for mask in range(1 << simulator_web.LED_COUNT):
+        assert simulator_web.led_mask_to_list(mask) == [bool(mask >> i & 1) for i in range(12)]
+
+
+def test_fast_step_and_frame_flip_masks():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(interval=300)
+    sim.update_frame_circle(frame_rate=1)  # flips at 0, 500 and 1000 ms
+    masks = []
+    for seconds in (0.4, 0.15, 0.2, 0.3):
+        sim.advance(seconds)
+        masks.append(sim.led_mask)
+
+    assert masks == [
+        1 << 0,  # 400 ms: the step at 300 ms lit LED1 alone
+        simulator_web.FRAME_PHASE_MASKS[1],  # 550 ms: the flip moved to LED4 and LED10, clearing LED1
+        1 << 1,  # 750 ms: the step at 600 ms lit LED2 alone
+        (1 << 2) | simulator_web.FRAME_PHASE_MASKS[0],  # 1050 ms: LED3, then the flip to LED1 and LED7
+    ]
+    assert simulator_web.led_mask_to_list(masks[-1]) == [True, False, True] + [False] * 3 + [True] + [False] * 5
+
+
+def test_snapshots_are_immutable_and_versioned():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    first = sim.snapshot()
+    fields = tuple(first)
+    sim.advance(1)
+    latest = sim.snapshot()
+
+    assert tuple(first) == fields
+    assert latest.version > first.version
+    assert (latest.time_us, latest.led_mask, latest.current_fast_led) == \
+        (sim.now_us(), sim.led_mask, sim.current_fast_led)
+    assert sim.states_since(first.version)[-1] is latest
+    assert sim.states_since(latest.version) == ()
+
+
+def test_parse_config():
+    config, apply = simulator_web.parse_config(
+        {"frameRate": "23.976", "d4OutputEnabled": True, "fastCircleInterval": 5, "apply": "vsync"})
+    assert apply == 'vsync'
+    assert config == {'frame_circle': {'frame_rate': Fraction(24000, 1001), 'd4_output': True},
+                      'fast_circle': {'interval': 5}}
+    for document in ({"ledCount": 12}, {"fastCircleInterval": True}, {"fastCircleInterval": 0},
+                     {"d4OutputEnabled": 1}, {"vsyncLockMode": "hold"}, {"frameRate": "fast"},
+                     {"apply": -1}, []):
+        try:
+            simulator_web.parse_config(document)
+        except ValueError:
+            continue
+        raise AssertionError(f"{document} was accepted")
+
+
+def test_config_applies_atomically_at_vsync_and_at_a_timestamp():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    edges = record_calls(sim, 'handle_vsync_edge')
+    sim.advance(0.01)
+    config, _ = simulator_web.parse_config({"frameRate": 30, "fastCircleInterval": 5})
+    assert sim.update_config(config, 'vsync') == (False, None)
+    sim.advance(0.02)
+    assert (sim.frame_rate, sim.fast_circle_interval) == (24, 1)
+    sim.advance(0.02)  # past the second edge at 41.666 ms
+    assert len(edges) == 2
+    assert (sim.frame_rate, sim.fast_circle_interval) == (30, 5)
+
+    config, _ = simulator_web.parse_config({"frameRate": 50, "fastCircleInterval": 7})
+    apply_us = sim.now_us() + 1000
+    assert sim.update_config(config, apply_us) == (False, apply_us)
+    sim.advance(0.000999)
+    assert (sim.frame_rate, sim.fast_circle_interval) == (30, 5)
+    sim.advance(0.000001)
+    assert (sim.frame_rate, sim.fast_circle_interval) == (50, 7)
+
+
+def test_unknown_lock_mode_is_rejected():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    version = sim.snapshot().version
+    try:
+        sim.update_frame_circle(enabled=False, vsync_lock=True, vsync_lock_mode='hold')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("vsync_lock_mode='hold' was accepted")
+
+    assert (sim.frame_circle_enabled, sim.vsync_lock_enabled, sim.vsync_lock_mode) == (True, False, 'reset')
+    assert sim.snapshot().version == version
+    sim.update_frame_circle(vsync_lock_mode='pll')
+    assert sim.vsync_lock_mode == 'pll'
+
+
+def reset_intervals(mode, seconds=60, **impairments):
+    """Run VSYNC lock in mode against an impaired VSYNC; returns (simulator, settled reset intervals)"""
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(enabled=False)
+    sim.update_frame_circle(vsync_lock=True, vsync_lock_mode=mode)
+    sim.update_vsync_source(seed=1, **impairments)
+    resets = record_calls(sim, 'apply_vsync_lock')
+    sim.advance(seconds)
+    intervals = [b - a for a, b in zip(resets, resets[1:])]
+    return sim, intervals[len(intervals) // 4:]  # skip acquisition
+
+
+def deviation(values):
+    """Population standard deviation"""
+    mean = sum(values) / len(values)
+    return (sum((value - mean) ** 2 for value in values) / len(values)) ** 0.5
+
+
+def test_pll_filters_vsync_jitter():
+    _, hard = reset_intervals('reset', jitter_us=500)
+    sim, filtered = reset_intervals('pll', jitter_us=500)
+
+    assert len(filtered) > 1000
+    assert deviation(filtered) < deviation(hard) / 5
+    assert sim.get_status()['pllLocked']
+
+
+def test_pll_tracks_frequency_offset():
+    sim, intervals = reset_intervals('pll', jitter_us=200, drift_ppm=200, drift_period_s=0)
+    status = sim.get_status()
+
+    assert status['pllLocked']
+    assert abs(status['pllFrequencyOffsetPpm'] - 200) < 50
+    assert abs(sum(intervals) / len(intervals) - 1000000 / 24 / (1 + 200e-6)) < 1
+
+
+def test_field_source_durations():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(enabled=False)
+    sim.update_field(enabled=True, rate=Fraction(60000, 1001), asymmetry_us=200)
+    sim.advance(100)
+    report = sim.field_report()
+    odd, even = report["odd"], report["even"]
+
+    assert odd["count"] + even["count"] == 100 * 60000 // 1001  # edges at 0 .. 100 s
+    # Fields alternate on the 16683.3 us grid, odd ones 200 us longer
+    assert (odd["minUs"], odd["maxUs"]) == (16783, 16784)
+    assert (even["minUs"], even["maxUs"]) == (16583, 16584)
+    assert abs(odd["meanUs"] - even["meanUs"] - 200) < 1
+    assert len(odd["historyUs"]) == 120
+
+
+def test_field_source_jitter():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(enabled=False)
+    sim.update_field(enabled=True, jitter_us=100)
+    sim.advance(100)
+    report = sim.field_report()
+
+    # Each duration spans two independently jittered edges
+    for parity in ("odd", "even"):
+        assert abs(report[parity]["stdUs"] - 100 * 2 ** 0.5) < 10
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Binary Status Record Tests
+Round trips of /api/status.bin records
+"""
+
+import simulator_web
+import status_bin
+
+
+def test_round_trip():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_frame_circle(d4_output=True)
+    sim.advance(1)
+    state = sim.snapshot()
+    record = status_bin.decode(status_bin.encode(state))
+
+    assert len(status_bin.encode(state)) == status_bin.RECORD.size == 40
+    assert record.version == state.version
+    assert record.time_us == state.time_us
+    assert record.led_mask == state.led_mask
+    assert record.d4_output_state == state.d4_output_state
+    assert record.current_fast_led == state.current_fast_led
+    assert record.frame_circle_phase == state.frame_circle_phase
+    assert record.flags & status_bin.FLAG_D4_OUTPUT
+    assert record.flags & status_bin.FLAG_FAST_CIRCLE
+    assert not record.flags & status_bin.FLAG_VSYNC_LOCK
+
+
+def test_field_durations_round_trip():
+    state = simulator_web.LEDTesterSimulator(virtual_time=True).snapshot()
+    record = status_bin.decode(status_bin.encode(
+        state._replace(odd_field_duration=16783, even_field_duration=16583, measured_frame_rate=59.94)))
+
+    assert (record.odd_field_duration, record.even_field_duration) == (16783, 16583)
+    assert record.measured_frame_rate == 59.94
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Trace File Tests
+Binary trace files written from a virtual-time run and read back
+"""
+
+from array import array
+
+import simulator_web
+from trace_file import BLOCK_RECORDS, TraceFileReader, TraceFileWriter, TraceRecorder
+from transition_trace import TRACE_LED
+
+
+def test_round_trip_and_time_search(tmp_path):
+    path = tmp_path / 'run.ledtrace'
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    recorder = TraceRecorder(sim, TraceFileWriter(path, sim.now_us()))
+    for _ in range(10):
+        sim.advance(1)
+        recorder.poll()
+    recorder.close()
+    expected = [(time_us, kind, value) for _, time_us, kind, value in sim.trace.entries()]
+
+    with TraceFileReader(path) as reader:
+        assert reader.blocks > 2  # the search crosses block boundaries
+        assert len(reader) == len(expected) > 2 * BLOCK_RECORDS
+        assert reader.dropped == reader.late == 0
+        assert list(reader.records()) == expected
+        assert reader.time_span() == (expected[0][0], expected[-1][0])
+        assert list(reader.records(4000000, 6000000)) == [
+            record for record in expected if 4000000 <= record[0] < 6000000]
+
+
+def test_reorder_window_sorts_entries(tmp_path):
+    path = tmp_path / 'reordered.ledtrace'
+    writer = TraceFileWriter(path, 0, reorder_window_us=1000)
+    writer.add(array('Q', [100, 300, 200]), array('B', [TRACE_LED] * 3), array('I', [1, 3, 2]))
+    writer.add(array('Q', [250, 5000]), array('B', [TRACE_LED] * 2), array('I', [4, 5]))
+    writer.close()
+
+    with TraceFileReader(path) as reader:
+        assert [value for _, _, value in reader.records()] == [1, 2, 4, 3, 5]
+        assert reader.late == 0
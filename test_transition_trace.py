@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Transition Trace Tests
+Ring buffer wrap-around and loss reporting
+"""
+
+from array import array
+
+from transition_trace import TRACE_LED, TRACE_VSYNC, TransitionTrace
+
+
+def test_read_reports_overwritten_entries():
+    trace = TransitionTrace(capacity=8)
+    for i in range(20):
+        trace.record(1000 + i, TRACE_LED if i % 2 else TRACE_VSYNC, i)
+
+    first, times, kinds, values, end = trace.read(since=5)
+    assert (first, end) == (12, 20)  # entries 5-11 were overwritten
+    assert list(times) == list(range(1012, 1020))
+    assert list(values) == list(range(12, 20))
+    assert list(kinds) == [TRACE_VSYNC, TRACE_LED] * 4
+    assert trace.oldest_sequence == 12
+
+
+def test_entries_in_pages_and_until():
+    trace = TransitionTrace(capacity=10000)
+    for i in range(9000):
+        trace.record(i, TRACE_LED, i & 0xFFF)
+
+    entries = list(trace.entries(since=100))
+    assert len(entries) == 8900
+    assert entries[0] == (100, 100, TRACE_LED, 100)
+    assert [sequence for sequence, _, _, _ in entries] == list(range(100, 9000))
+    assert list(trace.entries(until=2))[-1][1] == 2
+    first, times, _, _, end = trace.read(since=9000)  # nothing new
+    assert (first, len(times), end) == (9000, 0, 9000)
+
+
+def test_read_drops_entry_being_rewritten():
+    trace = TransitionTrace(capacity=8)
+    for i in range(20):
+        trace.record(1000 + i, TRACE_LED, i)
+    reads = []
+
+    class ReadingArray(array):
+        """Runs a reader between record()'s time and kind stores"""
+        def __setitem__(self, index, value):
+            reads.append(trace.read())
+            super().__setitem__(index, value)
+
+    trace.kinds = ReadingArray('B', trace.kinds)
+    trace.record(5000, TRACE_VSYNC, 99)
+
+    # Entry 12's slot already holds the new time but the old kind and value
+    [(first, times, kinds, values, end)] = reads
+    assert (first, end) == (13, 20)
+    assert list(times) == list(range(1013, 1020))
+    assert list(values) == list(range(13, 20))
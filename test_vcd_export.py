@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - VCD Export Tests
+Value changes written for LED, D4, VSYNC and FIELD entries
+"""
+
+from vcd_export import VCDWriter
+from transition_trace import TRACE_D4, TRACE_FIELD, TRACE_LED, TRACE_VSYNC
+
+
+def read_vcd(path):
+    """Get ({identifier: name}, [(time, {name: level})]) from a VCD file"""
+    names = {}
+    changes = []
+    for line in path.read_text().splitlines():
+        if line.startswith('$var'):
+            _, _, _, code, name, _ = line.split()
+            names[code] = name
+        elif line.startswith('#'):
+            changes.append((int(line[1:]), {}))
+        elif changes and line[:1] in '01x' and line[1:] in names:
+            changes[-1][1][names[line[1:]]] = line[0]
+    return names, changes
+
+
+def test_only_changed_signals_are_written(tmp_path):
+    path = tmp_path / 'out.vcd'
+    writer = VCDWriter(path, origin_us=1000)
+    writer.append(1000, TRACE_LED, 0b000001000001)  # LED1 and LED7
+    writer.append(1500, TRACE_VSYNC, 1)              # VSYNC active: pin low
+    writer.append(1500, TRACE_FIELD, 1)
+    writer.append(2000, TRACE_LED, 0b000001000010)   # LED1 off, LED2 on
+    writer.append(2000, TRACE_D4, 1)
+    writer.append(2500, TRACE_VSYNC, 0)
+    writer.append(2600, TRACE_D4, 1)                 # no change: no line
+    writer.close()
+    names, changes = read_vcd(path)
+
+    assert len(names) == 15
+    assert 'GPIO13_LED1' in names.values() and 'GPIO34_VSYNC' in names.values()
+    leds = {f'GPIO{pin}_LED{number}': '1' if number in (1, 7) else '0'
+            for number, pin in enumerate((13, 14, 27, 26, 25, 33, 32, 16, 17, 18, 19, 23), 1)}
+    assert changes == [
+        # No initial state: signals start as x, the LEDs change at #0
+        (0, dict(leds, GPIO4_D4='x', GPIO34_VSYNC='x', GPIO35_FIELD='x')),
+        (500, {'GPIO34_VSYNC': '0', 'GPIO35_FIELD': '1'}),
+        (1000, {'GPIO13_LED1': '0', 'GPIO14_LED2': '1', 'GPIO4_D4': '1'}),
+        (1500, {'GPIO34_VSYNC': '1'}),
+        (1600, {}),
+    ]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - VSYNC Source Tests
+Generated, replayed and impaired VSYNC edge streams
+"""
+
+import math
+from fractions import Fraction
+
+import simulator_web
+from vsync_sources import (
+    NO_IMPAIRMENTS, DriftSource, GridSource, PulseFaultSource, ReplaySource, check_impairments, impair,
+)
+
+
+def take(source, count):
+    """Get the next count edges of a source"""
+    return [source.next_edge() for _ in range(count)]
+
+
+def test_grid_rate_change_continues_from_last_edge():
+    grid = GridSource(24)
+    grid.reset(1000)
+    assert take(grid, 3) == [1000, 42666, 84333]
+    grid.set_rate(Fraction(30000, 1001))
+    assert take(grid, 2) == [84333 + 33366, 84333 + 66733]
+
+
+def test_replay_skips_headers_and_filters_levels(tmp_path):
+    path = tmp_path / 'capture.csv'
+    path.write_text("# logic analyzer export\nTime [s],VSYNC\n"
+                    "0.000000,0\n0.001000,1\n0.041708,0\n0.042708,1\n\n0.083417,0\n0.084417,1\n")
+    replay = ReplaySource(str(path), units='s', loop=True)
+    replay.reset(5000)
+
+    # Falling edges at 0, 41708 and 83417 us; each loop starts one last
+    # interval (41709 us) after the final edge
+    assert take(replay, 7) == [5000, 46708, 88417, 130126, 171834, 213543, 255252]
+    assert replay.loops == 2
+    replay.close()
+
+
+def test_replay_without_loop_ends(tmp_path):
+    path = tmp_path / 'edges.txt'
+    path.write_text("100\n200\n350\n")
+    replay = ReplaySource(str(path), units='us')
+    replay.reset(0)
+    assert take(replay, 4) == [0, 100, 250, None]
+    assert replay.exhausted
+
+
+def test_replay_skips_non_finite_times(tmp_path):
+    path = tmp_path / 'edges.txt'
+    path.write_text("100\nnan\n200\ninf\n-inf\n1e400\n350\n")
+    replay = ReplaySource(str(path), units='us')
+    replay.reset(0)
+    assert take(replay, 4) == [0, 100, 250, None]
+
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_vsync_source(source='replay', replay=ReplaySource(str(path), units='us', loop=True))
+    sim.advance(1)
+    assert sim.vsync_edges > 1000
+
+
+def test_drift_is_closed_form():
+    drift = DriftSource(GridSource(24), drift_ppm=100, drift_period_s=600)
+    drift.reset(0)
+    edges = take(drift, 24 * 1200 + 1)
+    nominal = [k * 1000000 // 24 for k in range(len(edges))]
+    offsets = [edge - ideal for edge, ideal in zip(edges, nominal)]
+    # Peak shift of a 100 ppm sinusoid over 600 s: 2 * 100e-6 / omega
+    peak = 2 * 100e-6 * 600e6 / (2 * math.pi)
+    assert abs(min(offsets) + peak) < 1
+    assert abs(offsets[-1]) <= 1  # back on the grid after whole periods
+
+
+def test_fault_counts_match_missed_and_extra_pulses():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    sim.update_fast_circle(enabled=False)
+    sim.update_vsync_source(drop=0.01, duplicate=0.01, seed=3)
+    sim.advance(600)
+    faults = sim.vsync_source
+    while not isinstance(faults, PulseFaultSource):
+        faults = faults.source
+    stats = sim.get_status()["vsyncIntervalStats"]
+
+    assert faults.dropped > 50 and faults.duplicated > 50
+    assert stats["missedPulses"] == faults.dropped
+    assert stats["extraPulses"] == faults.duplicated
+
+
+def test_impairment_checks():
+    check_impairments(NO_IMPAIRMENTS)
+    for change in ({'jitter_us': -1}, {'jitter_model': 'pink'}, {'drift_ppm': 1e6},
+                   {'drop': 1.0}, {'duplicate': 1.5}, {'drift_period_s': -1}):
+        try:
+            check_impairments(NO_IMPAIRMENTS._replace(**change))
+        except ValueError:
+            continue
+        raise AssertionError(f"{change} was accepted")
+    assert isinstance(impair(GridSource(24), NO_IMPAIRMENTS), GridSource)
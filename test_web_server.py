@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Web Server Tests
+HTTP routes of simulator_web.py served by a pooled server on a free port
+
+The simulator runs in virtual time, so state only changes when a test
+calls advance(); the server itself runs in real threads.
+"""
+
+import gzip
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import simulator_web
+from call_recorder import record_calls
+
+
+@pytest.fixture
+def served():
+    """Get (simulator, server) with the server running on a free localhost port"""
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    server = simulator_web.create_server(sim, port=0, workers=2, max_streams=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield sim, server
+    server.shutdown()
+    server.server_close()
+
+
+def connect(server, timeout=5):
+    """Open a client connection to server"""
+    return http.client.HTTPConnection(*server.server_address, timeout=timeout)
+
+
+def read_event(response):
+    """Read one Server-Sent Event; returns (id, decoded data)"""
+    fields = {}
+    while True:
+        line = response.readline().decode()
+        assert line.endswith('\n')
+        if line == '\n':
+            return int(fields['id']), json.loads(fields['data'])
+        name, _, value = line.rstrip('\n').partition(': ')
+        fields[name] = value
+
+
+def test_stream_sends_versions_in_order(served):
+    sim, server = served
+    conn = connect(server)
+    conn.request('GET', '/api/stream')
+    response = conn.getresponse()
+    assert response.status == 200
+    assert response.getheader('Content-type') == 'text/event-stream'
+
+    # The first event is the current state
+    version, payload = read_event(response)
+    assert version == payload["version"] == sim.snapshot().version
+    assert payload["transitions"] == [[sim.snapshot().time_us, sim.snapshot().led_mask, 0]]
+
+    # Every later event carries the transitions published since the last one
+    seen = [version]
+    for _ in range(3):
+        sim.advance(0.0105)
+        state = sim.snapshot()
+        while seen[-1] < state.version:
+            version, payload = read_event(response)
+            seen.append(version)
+        assert payload["status"] == simulator_web.status_from_state(state)
+        assert payload["transitions"][-1] == [state.time_us, state.led_mask, int(state.d4_output_state)]
+    assert seen == sorted(set(seen))
+    conn.close()
+
+
+def test_stream_subscribers_are_capped(served):
+    _, server = served
+    streams = [connect(server) for _ in range(2)]
+    for conn in streams:
+        conn.request('GET', '/api/stream')
+        assert conn.getresponse().status == 200
+    conn = connect(server)
+    conn.request('GET', '/api/stream')
+    response = conn.getresponse()
+
+    assert response.status == 503
+    for conn in streams + [conn]:
+        conn.close()
+
+
+def wait_until(predicate, timeout=5):
+    """Poll predicate until it is true; fail after timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_open_streams_do_not_block_requests(served):
+    _, server = served
+    streams = [connect(server) for _ in range(2)]
+    for conn in streams:
+        conn.request('GET', '/api/stream')
+        assert conn.getresponse().status == 200
+    conn = connect(server)
+    conn.request('POST', '/api/fastCircle', 'interval=5',
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    assert conn.getresponse().read() == b'{"status":"ok"}'
+    conn.request('GET', '/api/status')
+    response = conn.getresponse()
+
+    assert json.loads(response.read())["fastCircleInterval"] == 5
+    for conn in streams + [conn]:
+        conn.close()
+
+
+def test_full_queue_gets_503():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    server = simulator_web.PooledHTTPServer(('localhost', 0), simulator_web.create_handler(sim),
+                                            workers=1, backlog=1)
+    accepted = record_calls(server, 'process_request', lambda request, client_address: client_address)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # The only worker waits for the first client's request line; the
+        # second client fills the queue and the third is turned away
+        stalled = socket.create_connection(server.server_address, timeout=5)
+        wait_until(lambda: accepted and server.pending.empty())
+        queued = socket.create_connection(server.server_address, timeout=5)
+        wait_until(lambda: server.pending.full())
+        with socket.create_connection(server.server_address, timeout=5) as refused:
+            assert refused.recv(4096).startswith(b"HTTP/1.1 503 ")
+
+        for sock in (stalled, queued):
+            sock.sendall(b"GET /api/status HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")
+            assert sock.recv(4096).startswith(b"HTTP/1.1 200 ")
+            sock.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_bad_frame_circle_settings_get_400(served):
+    sim, server = served
+    conn = connect(server)
+    form = {'Content-Type': 'application/x-www-form-urlencoded'}
+    for body in ('vsyncLockMode=hold', 'frameRate=fast', 'pllBandwidth=-1'):
+        conn.request('POST', '/api/frameCircle', body, form)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 400, body
+    assert sim.vsync_lock_mode == 'reset'
+    conn.close()
+
+
+def test_keep_alive_on_every_route(served):
+    _, server = served
+    conn = connect(server)
+    form = {'Content-Type': 'application/x-www-form-urlencoded'}
+    requests = [('GET', '/', None), ('GET', '/api/status', None), ('GET', '/api/status.bin', None),
+                ('POST', '/api/fastCircle', 'interval=3'), ('POST', '/api/frameCircle', 'enabled=true'),
+                ('POST', '/api/vsync', 'enabled=true'), ('GET', '/api/status', None)]
+    sock = None
+    for method, path, body in requests:
+        conn.request(method, path, body, form if body is not None else {})
+        response = conn.getresponse()
+        data = response.read()
+        assert response.status == 200, path
+        assert int(response.getheader('Content-Length')) == len(data)
+        assert not response.will_close
+        assert sock is None or conn.sock is sock
+        sock = conn.sock
+    conn.close()
+
+
+def test_idle_keep_alive_connections_release_the_worker():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    server = simulator_web.create_server(sim, port=0, workers=1, max_streams=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        clients = [connect(server) for _ in range(3)]
+        for _ in range(3):
+            for conn in clients:
+                conn.request('GET', '/api/status')
+                assert conn.getresponse().read()
+        assert len(set(conn.sock for conn in clients)) == 3
+        wait_until(lambda: len(server.parked) == 3)
+        for conn in clients:
+            conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_asset_variants():
+    body = b'<html>' + b'LED ' * 1000 + b'</html>'
+    asset = simulator_web.StaticAsset(body, 'text/html')
+    encoding, data, etag = asset.select('gzip;q=1.0, identity;q=0.5')
+    assert (encoding, gzip.decompress(data)) == ('gzip', body)
+    assert asset.select('gzip;q=0')[1:] == (body, asset.variants['identity'][1])
+    assert asset.select(None)[0] == 'identity'
+    assert etag != asset.variants['identity'][1]
+    # Bodies that do not shrink are only kept as identity
+    assert set(simulator_web.StaticAsset(b'x', 'text/plain').variants) == {'identity'}
+
+
+def test_parse_accept_encoding():
+    assert simulator_web.parse_accept_encoding('GZip, br;q=0, deflate;q=0.1') == {'gzip', 'deflate'}
+    assert simulator_web.parse_accept_encoding('*') == {'*', 'br', 'gzip'}
+    assert simulator_web.parse_accept_encoding('gzip;q=bad') == set()
+    assert simulator_web.parse_accept_encoding(None) == set()
+
+
+def test_main_page_is_cached_and_conditional(served):
+    _, server = served
+    conn = connect(server)
+    conn.request('GET', '/', headers={'Accept-Encoding': 'gzip'})
+    response = conn.getresponse()
+    page = gzip.decompress(response.read())
+    etag = response.getheader('ETag')
+
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert response.getheader('Vary') == 'Accept-Encoding'
+    assert response.getheader('Cache-Control') == 'no-cache'
+    assert page == simulator_web.LEDTesterHTTPHandler.get_main_page_html().encode()
+
+    conn.request('GET', '/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"other", W/{etag}'})
+    response = conn.getresponse()
+    assert (response.status, response.read(), response.getheader('ETag')) == (304, b'', etag)
+
+    # The identity variant has its own tag
+    conn.request('GET', '/', headers={'If-None-Match': etag})
+    response = conn.getresponse()
+    assert (response.status, response.read()) == (200, page)
+    assert response.getheader('ETag') != etag
+    conn.close()
+
+
+def test_status_serialized_once_per_version():
+    sim = simulator_web.LEDTesterSimulator(virtual_time=True)
+    body = sim.status_json()
+    assert sim.status_json() is body
+    assert json.loads(body) == sim.get_status()
+    sim.advance(0.01)
+    assert sim.status_json() is not body
+    assert json.loads(sim.status_json())["version"] == sim.snapshot().version
+
+
+def test_status_conditional_request(served):
+    sim, server = served
+    conn = connect(server)
+    conn.request('GET', '/api/status')
+    response = conn.getresponse()
+    response.read()
+    etag = response.getheader('ETag')
+    assert etag == f'"v{sim.snapshot().version}"'
+
+    conn.request('GET', '/api/status', headers={'If-None-Match': etag})
+    response = conn.getresponse()
+    assert (response.status, response.read()) == (304, b'')
+    sim.advance(0.01)
+    conn.request('GET', '/api/status', headers={'If-None-Match': etag})
+    response = conn.getresponse()
+    assert json.loads(response.read())["version"] == sim.snapshot().version
+    conn.close()
+
+
+def test_status_long_poll_times_out(served):
+    sim, server = served
+    version = sim.snapshot().version
+    conn = connect(server)
+    start = time.monotonic()
+    conn.request('GET', f'/api/status?since={version}&timeout=0.2')
+    response = conn.getresponse()
+
+    assert (response.status, response.read()) == (304, b'')
+    assert time.monotonic() - start >= 0.2
+    assert response.getheader('ETag') == f'"v{version}"'
+    conn.close()
+
+
+def test_status_long_poll_wakes_on_change(served):
+    sim, server = served
+    version = sim.snapshot().version
+    timer = threading.Timer(0.1, sim.advance, (0.01,))
+    timer.start()
+    conn = connect(server)
+    start = time.monotonic()
+    conn.request('GET', f'/api/status?since={version}&timeout=10')
+    response = conn.getresponse()
+    status = json.loads(response.read())
+    timer.join()
+
+    assert response.status == 200
+    assert status["version"] == version + 1
+    assert time.monotonic() - start < 5
+    # A version the client is behind on is answered at once
+    conn.request('GET', f'/api/status?since={version}&timeout=10')
+    assert json.loads(conn.getresponse().read())["version"] == version + 1
+    conn.close()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Binary Trace Files
+Streaming capture of the transition trace to disk, with a memory-mapped reader
+
+File layout (little-endian):
+
+    file header, 64 bytes
+        0   8s   magic b'LEDTRACE'
+        8   H    format version (1)
+        10  H    record size (16)
+        12  I    block size in bytes
+        16  I    records per block
+        20  4x   reserved
+        24  Q    engine time (µs) when the capture started
+        32  Q    wall-clock time (µs since the epoch) at the same instant
+        40  Q    entries lost because the trace ring overwrote them first
+        48  Q    entries that arrived after the reorder window (out of order)
+        56  8x   reserved
+    blocks, each exactly `block size` bytes
+        block header, 32 bytes
+            0   Q    time of the first record (µs)
+            8   Q    time of the last record (µs)
+            16  Q    index of the first record in the file
+            24  I    number of records in the block
+            28  4x   reserved
+        records, 16 bytes each
+            0   Q    engine time (µs)
+            8   I    value (see transition_trace.TRACE_*)
+            12  B    kind
+            13  3x   reserved
+
+Blocks are written whole, so the block headers form a time index at fixed
+offsets: the reader binary-searches block headers, then the times inside one
+block, touching only the pages it needs. The writer holds one block and a
+short reorder window in memory however long the capture runs.
+TraceRecorder feeds any TraceSink (see also vcd_export.VCDWriter) from a
+running simulator.
+"""
+
+import bisect
+import mmap
+import operator
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from transition_trace import TRACE_KINDS
+
+MAGIC = b'LEDTRACE'
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct('<8sHHII4xQQQQ8x')
+BLOCK_HEADER = struct.Struct('<QQQI4x')
+RECORD = struct.Struct('<QIB3x')
+BLOCK_SIZE = 65536
+BLOCK_RECORDS = (BLOCK_SIZE - BLOCK_HEADER.size) // RECORD.size
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([('time', '<u8'), ('value', '<u4'), ('kind', 'u1'), ('reserved', 'V3')])
+
+
+class TraceSink:
+    """Base class for writers fed by TraceRecorder
+
+    Entries are held back for `reorder_window_us` and passed to append() in
+    time order, so entries recorded slightly out of order by different
+    threads still come out sorted. Subclasses implement append().
+    """
+
+    def __init__(self, reorder_window_us=100000):
+        self.reorder_window_us = reorder_window_us
+        self.dropped = 0  # entries lost before they reached the sink
+        self.late = 0     # entries that arrived after the reorder window
+        self.records = 0
+        self.last_time = 0
+
+        # Entries waiting out the reorder window
+        self.pending_times = array('Q')
+        self.pending_kinds = array('B')
+        self.pending_values = array('I')
+        self.pending_sorted = True
+
+    def add(self, times, kinds, values):
+        """Queue a run of entries (parallel arrays, as returned by TransitionTrace.read)"""
+        if not len(times):
+            return
+        pending = self.pending_times
+        if self.pending_sorted:
+            self.pending_sorted = ((not pending or pending[-1] <= times[0])
+                                   and all(map(operator.le, times, times[1:])))
+        pending.extend(times)
+        self.pending_kinds.extend(kinds)
+        self.pending_values.extend(values)
+        self.write_ready(max(times) - self.reorder_window_us)
+
+    def write_ready(self, until_us):
+        """Append pending entries at or before until_us in time order"""
+        if not self.pending_sorted:
+            order = sorted(range(len(self.pending_times)), key=self.pending_times.__getitem__)
+            self.pending_times = array('Q', map(self.pending_times.__getitem__, order))
+            self.pending_kinds = array('B', map(self.pending_kinds.__getitem__, order))
+            self.pending_values = array('I', map(self.pending_values.__getitem__, order))
+            self.pending_sorted = True
+        ready = bisect.bisect_right(self.pending_times, until_us)
+        for time_us, kind, value in zip(self.pending_times[:ready], self.pending_kinds[:ready],
+                                        self.pending_values[:ready]):
+            self.append(time_us, kind, value)
+        del self.pending_times[:ready], self.pending_kinds[:ready], self.pending_values[:ready]
+
+    def append(self, time_us, kind, value):
+        """Write one entry (entries arrive in time order unless late)"""
+        raise NotImplementedError
+
+    def flush(self, final=False):
+        """Push written entries to disk (final: drain the reorder window too)"""
+        if final:
+            self.write_ready(float('inf'))
+
+    def close(self):
+        """Drain pending entries and close the output"""
+        self.flush(final=True)
+
+
+class TraceFileWriter(TraceSink):
+    """Append transitions to a trace file in fixed-size, time-indexed blocks"""
+
+    def __init__(self, path, engine_time_us, reorder_window_us=100000):
+        super().__init__(reorder_window_us)
+        self.file = open(path, 'w+b')
+        self.engine_time_us = engine_time_us
+        self.wall_time_us = time.time_ns() // 1000
+
+        # The block being filled, rewritten in place until it is full
+        self.block = bytearray(BLOCK_SIZE)
+        self.block_index = 0
+        self.block_count = 0
+        self.block_first = 0
+        self.block_sequence = 0
+        self.write_header()
+
+    def write_header(self):
+        """Write the file header"""
+        self.file.seek(0)
+        self.file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size, BLOCK_SIZE, BLOCK_RECORDS,
+                                         self.engine_time_us, self.wall_time_us, self.dropped, self.late))
+
+    def append(self, time_us, kind, value):
+        """Append one record to the current block"""
+        if time_us < self.last_time:
+            self.late += 1
+        self.last_time = max(self.last_time, time_us)
+        if self.block_count == 0:
+            self.block_first = time_us
+            self.block_sequence = self.records
+        RECORD.pack_into(self.block, BLOCK_HEADER.size + self.block_count * RECORD.size, time_us, value, kind)
+        self.block_count += 1
+        self.records += 1
+        if self.block_count == BLOCK_RECORDS:
+            self.write_block()
+            self.block_index += 1
+            self.block_count = 0
+
+    def write_block(self):
+        """Write the current block (full or partial) at its place in the file"""
+        BLOCK_HEADER.pack_into(self.block, 0, self.block_first, self.last_time,
+                               self.block_sequence, self.block_count)
+        self.file.seek(FILE_HEADER.size + self.block_index * BLOCK_SIZE)
+        self.file.write(self.block)
+
+    def flush(self, final=False):
+        """Write everything written so far to disk (final: drain the reorder window too)"""
+        super().flush(final)
+        if self.block_count:
+            self.write_block()
+        self.write_header()
+        self.file.flush()
+
+    def close(self):
+        """Drain pending entries and close the file"""
+        super().close()
+        self.file.close()
+
+
+class TraceRecorder:
+    """Copy a simulator's transition trace to a TraceSink in the background"""
+
+    def __init__(self, simulator, sink, interval=0.1):
+        self.simulator = simulator
+        self.sink = sink
+        self.since = simulator.trace.next_sequence
+        self.interval = interval
+        self.running = not simulator.virtual_time
+        self.thread = None
+        if self.running:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def poll(self):
+        """Copy new trace entries to the sink (virtual time: call after advance())"""
+        while True:
+            first, times, kinds, values, end = self.simulator.trace.read(self.since, BLOCK_RECORDS)
+            if first >= end:
+                return
+            self.sink.dropped += first - self.since
+            self.sink.add(times, kinds, values)
+            self.since = end
+
+    def run(self):
+        """Background copy loop"""
+        flushed = time.monotonic()
+        while self.running:
+            time.sleep(self.interval)
+            self.poll()
+            if time.monotonic() - flushed >= 1.0:
+                self.sink.flush()
+                flushed = time.monotonic()
+
+    def close(self):
+        """Stop recording and close the file"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        self.poll()
+        self.sink.close()
+
+
+class TraceFileReader:
+    """Memory-mapped reader with binary search by engine timestamp"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, record_size, block_size, block_records, self.engine_time_us,
+         self.wall_time_us, self.dropped, self.late) = FILE_HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} LED tester trace")
+        if record_size != RECORD.size:
+            raise ValueError(f"Unsupported record size {record_size}")
+        self.block_size = block_size
+        self.block_records = block_records
+        self.blocks = (len(self.map) - FILE_HEADER.size) // block_size
+
+    def close(self):
+        """Unmap and close the file"""
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def block_header(self, block):
+        """Get (first time, last time, first record index, count) of a block"""
+        return BLOCK_HEADER.unpack_from(self.map, FILE_HEADER.size + block * self.block_size)
+
+    def __len__(self):
+        """Number of records in the file"""
+        if not self.blocks:
+            return 0
+        _, _, first, count = self.block_header(self.blocks - 1)
+        return first + count
+
+    def record_offset(self, block, index):
+        """Get the file offset of record `index` in `block`"""
+        return FILE_HEADER.size + block * self.block_size + BLOCK_HEADER.size + index * RECORD.size
+
+    def record_time(self, block, index):
+        """Get the timestamp of one record"""
+        return struct.unpack_from('<Q', self.map, self.record_offset(block, index))[0]
+
+    def find(self, time_us):
+        """Get (block, index) of the first record at or after time_us"""
+        low, high = 0, self.blocks
+        while low < high:
+            middle = (low + high) // 2
+            if self.block_header(middle)[1] < time_us:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.blocks:
+            return self.blocks, 0
+        count = self.block_header(low)[3]
+        if np is not None:
+            return low, int(np.searchsorted(self.block_view(low)['time'], time_us))
+        first, last = 0, count
+        while first < last:
+            middle = (first + last) // 2
+            if self.record_time(low, middle) < time_us:
+                first = middle + 1
+            else:
+                last = middle
+        return low, first
+
+    def block_view(self, block):
+        """Get a block's records as a NumPy structured array backed by the map"""
+        count = self.block_header(block)[3]
+        return np.frombuffer(self.map, dtype=RECORD_DTYPE, count=count,
+                             offset=self.record_offset(block, 0))
+
+    def slices(self, start_us, end_us):
+        """Yield the records with start_us <= time < end_us, one block at a time
+
+        With NumPy each slice is a structured-array view into the map
+        (fields time, value, kind); otherwise a list of (time, kind, value).
+        """
+        block, index = self.find(start_us)
+        while block < self.blocks:
+            first, _, _, count = self.block_header(block)
+            if first >= end_us:
+                return
+            if np is not None:
+                view = self.block_view(block)
+                stop = int(np.searchsorted(view['time'], end_us))
+                if index < stop:
+                    yield view[index:stop]
+            else:
+                records = []
+                offset = self.record_offset(block, index)
+                for time_us, value, kind in RECORD.iter_unpack(self.map[offset:self.record_offset(block, count)]):
+                    if time_us >= end_us:
+                        break
+                    records.append((time_us, kind, value))
+                if records:
+                    yield records
+            block += 1
+            index = 0
+
+    def records(self, start_us=0, end_us=None):
+        """Iterate over (time_us, kind, value) with start_us <= time < end_us"""
+        if end_us is None:
+            end_us = 1 << 64
+        for part in self.slices(start_us, end_us):
+            if np is not None:
+                yield from zip(part['time'].tolist(), part['kind'].tolist(), part['value'].tolist())
+            else:
+                yield from part
+
+    def read(self, start_us, end_us):
+        """Get the records with start_us <= time < end_us in one array (or list)"""
+        parts = list(self.slices(start_us, end_us))
+        if np is not None:
+            return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+        return [record for part in parts for record in part]
+
+    def time_span(self):
+        """Get (first, last) record time, or None for an empty file"""
+        if not len(self):
+            return None
+        return self.block_header(0)[0], self.block_header(self.blocks - 1)[1]
+
+
+def main():
+    """Summarise a trace file, or print its records in a range:
+    trace_file.py capture.trace [start_us end_us]"""
+    if len(sys.argv) not in (2, 4):
+        print(main.__doc__)
+        sys.exit(1)
+    with TraceFileReader(sys.argv[1]) as reader:
+        span = reader.time_span()
+        size = os.path.getsize(sys.argv[1])
+        print(f"{len(reader)} records in {reader.blocks} blocks ({size} bytes), "
+              f"{reader.dropped} dropped, {reader.late} out of order")
+        if span:
+            print(f"engine time {span[0]} - {span[1]} us ({(span[1] - span[0]) / 1e6:.3f} s)")
+        if len(sys.argv) == 4:
+            for time_us, kind, value in reader.records(int(sys.argv[2]), int(sys.argv[3])):
+                print(f"{time_us} {TRACE_KINDS[kind]} {value:#x}")
+
+
+if __name__ == "__main__":
+    main()
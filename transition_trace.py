@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - Transition Trace
+Fixed-capacity ring buffer of output and input edges with µs timestamps
+
+Entries live in preallocated parallel arrays (timestamp, kind and value as
+raw C integers), so recording an edge stores into existing slots instead of
+creating a Python object per event. Every entry has a sequence number;
+readers ask for entries since a sequence number and are told how many were
+overwritten before they could read them.
+"""
+
+from array import array
+
+# Entry kinds and their values
+TRACE_LED = 0    # LED bitmask (bit i = LED i+1)
+TRACE_D4 = 1     # D4 output level
+TRACE_VSYNC = 2  # 1 = VSYNC active (falling edge), 0 = released (rising edge)
+TRACE_FIELD = 3  # 1 = odd field, 0 = even field
+TRACE_KINDS = ("led", "d4", "vsync", "field")
+
+
+class TransitionTrace:
+    """Ring buffer of (time_us, kind, value) entries with sequence numbers
+
+    A single writer (the engine, holding its lock) calls record(); readers
+    need no lock. A reader that races the writer around the ring drops the
+    entries that were overwritten while it copied them, including one the
+    writer was still in the middle of replacing.
+    """
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.times = array('Q', [0]) * capacity
+        self.kinds = array('B', [0]) * capacity
+        self.values = array('I', [0]) * capacity
+        self.next_sequence = 0  # sequence number of the next entry
+        self.writing = -1  # sequence number of the last entry record() started
+
+    def record(self, time_us, kind, value):
+        """Append one entry, overwriting the oldest when full"""
+        index = self.next_sequence % self.capacity
+        self.writing = self.next_sequence  # before the slot is touched
+        self.times[index] = time_us
+        self.kinds[index] = kind
+        self.values[index] = value
+        self.next_sequence += 1
+
+    @property
+    def oldest_sequence(self):
+        """Sequence number of the oldest entry still in the buffer"""
+        return max(0, self.next_sequence - self.capacity)
+
+    def read(self, since=0, limit=None):
+        """Copy entries with sequence >= since
+
+        Returns (first, times, kinds, values, end): the sequence number of the
+        first copied entry, three parallel arrays and the sequence number to
+        pass as `since` next time. first > since means entries were lost.
+        """
+        end = self.next_sequence
+        first = max(since, end - self.capacity)
+        if limit is not None:
+            end = min(end, first + limit)
+        if first >= end:
+            return end, array('Q'), array('B'), array('I'), end
+
+        start = first % self.capacity
+        stop = start + (end - first)
+        if stop <= self.capacity:
+            times = self.times[start:stop]
+            kinds = self.kinds[start:stop]
+            values = self.values[start:stop]
+        else:
+            stop -= self.capacity
+            times = self.times[start:] + self.times[:stop]
+            kinds = self.kinds[start:] + self.kinds[:stop]
+            values = self.values[start:] + self.values[:stop]
+
+        # Drop anything the writer overwrote, or started to, while we were
+        # copying: a slot is reused by the entry `capacity` sequences later
+        overwritten = self.writing + 1 - self.capacity - first
+        if overwritten > 0:
+            del times[:overwritten], kinds[:overwritten], values[:overwritten]
+            first += overwritten
+        return first, times, kinds, values, end
+
+    def __iter__(self):
+        """Iterate over every retained entry as (sequence, time_us, kind, value)"""
+        return self.entries()
+
+    def entries(self, since=0, until=None):
+        """Iterate over (sequence, time_us, kind, value), optionally up to engine time `until`"""
+        while True:
+            first, times, kinds, values, end = self.read(since, limit=4096)
+            for offset, time_us in enumerate(times):
+                if until is not None and time_us > until:
+                    return
+                yield first + offset, time_us, kinds[offset], values[offset]
+            if end == since or end >= self.next_sequence:
+                return
+            since = end
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - VCD Export
+Streams LED, D4, VSYNC and FIELD transitions as a Value Change Dump
+
+Signals are named after the firmware's GPIO mapping (src/main.cpp), e.g.
+GPIO13_LED1 or GPIO34_VSYNC, and carry pin levels: VSYNC is active low as on
+the board, FIELD is high during the odd field. Times are in µs relative to
+the start of the export; the absolute engine time of #0 is in a $comment.
+Output goes through a large write buffer and only the current level of each
+signal is kept, so captures of any length export in constant memory.
+"""
+
+import sys
+from datetime import datetime
+
+from trace_file import TraceSink, TraceFileReader
+from transition_trace import TRACE_LED, TRACE_D4, TRACE_VSYNC, TRACE_FIELD
+
+# GPIO mapping from src/main.cpp
+LED_PINS = (13, 14, 27, 26, 25, 33, 32, 16, 17, 18, 19, 23)
+OUTPUT_PIN = 4
+VSYNC_PIN = 34
+FIELD_PIN = 35
+
+WRITE_BUFFER = 1 << 20
+
+
+def identifier(index):
+    """Get the VCD identifier code for signal number `index`"""
+    code = ''
+    while True:
+        code += chr(33 + index % 94)
+        index //= 94
+        if not index:
+            return code
+
+
+class VCDWriter(TraceSink):
+    """Write transitions to a VCD file as they arrive
+
+    `state` (a SimulatorState) gives the levels at `origin_us`; without it the
+    signals start as x until their first transition. Without `origin_us` the
+    dump starts at the first entry.
+    """
+
+    def __init__(self, path, state=None, origin_us=None, led_pins=LED_PINS, reorder_window_us=100000):
+        super().__init__(reorder_window_us)
+        self.file = open(path, 'w', buffering=WRITE_BUFFER)
+        self.led_pins = led_pins
+        self.origin_us = None
+        self.time_us = None  # time of the last '#' line
+
+        # Pre-built value change lines: lines[signal][level]
+        count = len(led_pins)
+        self.lines = [(f"0{identifier(i)}\n", f"1{identifier(i)}\n") for i in range(count + 3)]
+        self.signals = {TRACE_D4: count, TRACE_VSYNC: count + 1, TRACE_FIELD: count + 2}
+        self.led_mask = None
+        self.levels = {}
+        if state is not None:
+            self.led_mask = state.led_mask
+            self.levels = {TRACE_D4: int(state.d4_output_state),
+                           TRACE_VSYNC: 0 if state.vsync_active else 1,
+                           TRACE_FIELD: int(state.field_odd)}
+        if origin_us is not None:
+            self.start(origin_us)
+
+    def signal_names(self):
+        """Get the wire names in identifier order"""
+        names = [f"GPIO{pin}_LED{number}" for number, pin in enumerate(self.led_pins, 1)]
+        return names + [f"GPIO{OUTPUT_PIN}_D4", f"GPIO{VSYNC_PIN}_VSYNC", f"GPIO{FIELD_PIN}_FIELD"]
+
+    def start(self, origin_us):
+        """Write the header and initial values with #0 at engine time origin_us"""
+        self.origin_us = origin_us
+        self.last_time = origin_us
+        self.time_us = origin_us
+        write = self.file.write
+        write(f"$date {datetime.now().isoformat(timespec='seconds')} $end\n")
+        write("$version ESP32 LED Tester Simulator $end\n")
+        write(f"$comment engine time at #0: {origin_us} us $end\n")
+        write("$timescale 1us $end\n")
+        write("$scope module esp32 $end\n")
+        for index, name in enumerate(self.signal_names()):
+            write(f"$var wire 1 {identifier(index)} {name} $end\n")
+        write("$upscope $end\n$enddefinitions $end\n#0\n$dumpvars\n")
+        for index in range(len(self.led_pins)):
+            if self.led_mask is None:
+                write(f"x{identifier(index)}\n")
+            else:
+                write(self.lines[index][(self.led_mask >> index) & 1])
+        for kind, index in self.signals.items():
+            level = self.levels.get(kind)
+            write(f"x{identifier(index)}\n" if level is None else self.lines[index][level])
+        write("$end\n")
+
+    def append(self, time_us, kind, value):
+        """Write the value changes of one entry"""
+        if self.origin_us is None:
+            self.start(time_us)
+        if time_us < self.last_time:
+            self.late += 1
+            time_us = self.last_time
+        self.last_time = time_us
+        write = self.file.write
+        if time_us != self.time_us:
+            write(f"#{time_us - self.origin_us}\n")
+            self.time_us = time_us
+        self.records += 1
+
+        if kind == TRACE_LED:
+            changed = value ^ self.led_mask if self.led_mask is not None else (1 << len(self.led_pins)) - 1
+            self.led_mask = value
+            lines = self.lines
+            while changed:
+                index = (changed & -changed).bit_length() - 1
+                write(lines[index][(value >> index) & 1])
+                changed &= changed - 1
+            return
+
+        level = (0 if value else 1) if kind == TRACE_VSYNC else int(bool(value))
+        if self.levels.get(kind) != level:
+            self.levels[kind] = level
+            write(self.lines[self.signals[kind]][level])
+
+    def flush(self, final=False):
+        """Push buffered output to disk (final: drain the reorder window too)"""
+        super().flush(final)
+        self.file.flush()
+
+    def close(self):
+        """Drain pending entries and close the file"""
+        super().close()
+        if self.origin_us is None:
+            self.start(0)
+        self.file.close()
+
+
+def export_trace_file(trace_path, vcd_path, start_us=None, end_us=None):
+    """Convert a recorded trace file (or a time range of it) to VCD; returns the record count"""
+    with TraceFileReader(trace_path) as reader:
+        if start_us is None:
+            start_us = reader.engine_time_us
+        writer = VCDWriter(vcd_path, origin_us=start_us)
+        append = writer.append
+        for time_us, kind, value in reader.records(start_us, end_us):
+            append(time_us, kind, value)
+        writer.close()
+        return writer.records
+
+
+def main():
+    """Convert a trace file to VCD: vcd_export.py capture.trace out.vcd [start_us end_us]"""
+    if len(sys.argv) not in (3, 5):
+        print(main.__doc__)
+        sys.exit(1)
+    start_us, end_us = (int(sys.argv[3]), int(sys.argv[4])) if len(sys.argv) == 5 else (None, None)
+    count = export_trace_file(sys.argv[1], sys.argv[2], start_us, end_us)
+    print(f"Wrote {count} transitions to {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
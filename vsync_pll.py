@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - VSYNC PLL
+Phase-locked loop that turns noisy VSYNC edges into a smooth edge timebase
+
+The loop keeps an oscillator (period and time of its next edge). Each
+reference edge is numbered by the oscillator period, so dropped and extra
+pulses are recognised, and a least-squares line through the last `window`
+edges gives the reference period and a jitter-filtered time for the edge.
+The oscillator then moves a fraction of the way toward both, with the
+fraction set by the loop bandwidth: 1 - exp(-2π × bandwidth × period).
+"""
+
+import math
+from collections import deque
+
+DEFAULT_BANDWIDTH_HZ = 1.0
+MIN_BANDWIDTH_HZ = 0.01
+MAX_BANDWIDTH_HZ = 20.0
+DEFAULT_WINDOW = 16
+
+LOCK_TOLERANCE = 0.05  # filtered phase error, as a fraction of the period
+LOCK_EDGES = 8         # consecutive edges within tolerance to report lock
+HOLDOVER_EDGES = 2     # oscillator edges without a reference before lock is lost
+
+
+class VsyncPLL:
+    """Oscillator steered by reference VSYNC edges (times in µs)"""
+
+    def __init__(self, period_us, bandwidth_hz=DEFAULT_BANDWIDTH_HZ, window=DEFAULT_WINDOW):
+        self.nominal_period_us = float(period_us)
+        self.bandwidth_hz = bandwidth_hz
+        self.edges = deque(maxlen=max(2, window))  # (reference edge number, time_us)
+        self.reset()
+
+    def reset(self):
+        """Forget the reference and go back to acquisition"""
+        self.edges.clear()
+        self.period_us = self.nominal_period_us
+        self.next_edge_us = None  # time of the oscillator's next edge
+        self.phase_error_us = 0.0  # last reference edge minus the nearest oscillator edge
+        self.in_tolerance = 0
+        self.holdover = 0
+        self.locked = False
+        self.duplicates = 0
+
+    @property
+    def frequency_offset_ppm(self):
+        """Oscillator frequency against the nominal period, in parts per million"""
+        return (self.nominal_period_us / self.period_us - 1) * 1000000
+
+    def gain(self, period_us):
+        """Fraction of the error corrected per reference edge"""
+        bandwidth = min(MAX_BANDWIDTH_HZ, max(MIN_BANDWIDTH_HZ, self.bandwidth_hz))
+        return 1 - math.exp(-2 * math.pi * bandwidth * period_us / 1000000)
+
+    def fit(self):
+        """Least-squares line through the window: (period, fitted time of the newest edge)"""
+        last_number, last_time = self.edges[-1]
+        count = len(self.edges)
+        xs = [number - last_number for number, _ in self.edges]
+        ys = [time_us - last_time for _, time_us in self.edges]
+        x_mean = sum(xs) / count
+        y_mean = sum(ys) / count
+        sxx = sum((x - x_mean) ** 2 for x in xs)
+        sxy = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys))
+        slope = sxy / sxx
+        return slope, last_time + y_mean - slope * x_mean
+
+    def update(self, time_us):
+        """Steer the oscillator with one reference edge"""
+        self.holdover = 0
+        if not self.edges:
+            # Acquisition: the first two edges set the phase directly
+            self.edges.append((0, time_us))
+            self.next_edge_us = float(time_us)
+            return
+        last_number, last_time = self.edges[-1]
+        if len(self.edges) == 1:
+            self.edges.append((1, time_us))
+            self.period_us = float(max(1, time_us - last_time))
+            self.next_edge_us = float(time_us)
+            return
+
+        steps = round((time_us - last_time) / self.period_us)
+        if steps < 1:
+            self.duplicates += 1  # extra pulse within half a period of the last
+            return
+        self.edges.append((last_number + steps, time_us))
+
+        # Oscillator edge nearest to the reference (already fired or upcoming)
+        nearest = self.next_edge_us + round((time_us - self.next_edge_us) / self.period_us) * self.period_us
+        self.phase_error_us = time_us - nearest
+        period, fitted = self.fit()
+        half = self.period_us / 2
+        error = min(half, max(-half, fitted - nearest))
+
+        gain = self.gain(self.period_us)
+        self.next_edge_us += gain * error
+        self.period_us += gain * (period - self.period_us)
+
+        if abs(error) <= LOCK_TOLERANCE * self.period_us:
+            self.in_tolerance += 1
+        else:
+            self.in_tolerance = 0
+        self.locked = self.in_tolerance >= LOCK_EDGES
+
+    def advance(self):
+        """Move past the oscillator edge that just fired; returns the next edge time (µs)"""
+        self.next_edge_us += self.period_us
+        self.holdover += 1
+        if self.holdover > HOLDOVER_EDGES:
+            self.locked = False
+            self.in_tolerance = 0
+        return round(self.next_edge_us)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+ESP32 LED Tester Simulator - VSYNC Sources
+Pluggable VSYNC falling edge streams: generated, replayed and impaired
+
+A source hands out edge times (integer µs, engine clock) one at a time from
+next_edge(), and None once it has no more. The engine pulls the next edge
+only after firing the previous one, so a source never holds more than a
+few edges and every implementation works the same in real and virtual time.
+
+GridSource is the generated pulse train (edge k at anchor + k periods),
+ReplaySource streams timestamps from a capture file line by line and
+ExternalSource stands in while edges come from another process. The
+impairment wrappers (JitterSource, DriftSource, PulseFaultSource) take any
+source and distort its edges; impair() stacks them from VsyncImpairments.
+"""
+
+import math
+import random
+from collections import namedtuple
+from fractions import Fraction
+
+JITTER_MODELS = ('gaussian', 'uniform')
+REPLAY_UNITS = {'s': 1000000, 'ms': 1000, 'us': 1, 'ns': Fraction(1, 1000)}
+DUPLICATE_DELAY = (0.1, 0.4)  # duplicate pulse delay after its edge, in periods
+MAX_JITTER_US = 1000000
+MAX_DRIFT_PPM = 100000
+MAX_DRIFT_PERIOD_S = 1000000
+
+# jitter_us: Gaussian standard deviation, or uniform half-width (µs)
+# drift_ppm: peak frequency offset; drift_period_s: period of its sinusoidal
+#   wander (0 = a constant offset)
+# drop, duplicate: probability of each edge being lost or doubled
+VsyncImpairments = namedtuple('VsyncImpairments', [
+    'jitter_us', 'jitter_model', 'drift_ppm', 'drift_period_s', 'drop', 'duplicate',
+])
+NO_IMPAIRMENTS = VsyncImpairments(0.0, 'gaussian', 0.0, 600.0, 0.0, 0.0)
+
+
+def check_impairments(impairments):
+    """Raise ValueError if any impairment setting is out of range"""
+    if not 0 <= impairments.jitter_us <= MAX_JITTER_US:
+        raise ValueError(f"jitter must be in [0, {MAX_JITTER_US}] us")
+    if impairments.jitter_model not in JITTER_MODELS:
+        raise ValueError(f"jitter model must be one of {', '.join(JITTER_MODELS)}")
+    if not abs(impairments.drift_ppm) <= MAX_DRIFT_PPM:
+        raise ValueError(f"drift must be within +/-{MAX_DRIFT_PPM} ppm")
+    if not 0 <= impairments.drift_period_s <= MAX_DRIFT_PERIOD_S:
+        raise ValueError(f"drift period must be in [0, {MAX_DRIFT_PERIOD_S}] s")
+    if not 0 <= impairments.drop < 1:
+        raise ValueError("drop must be in [0, 1)")
+    if not 0 <= impairments.duplicate <= 1:
+        raise ValueError("duplicate must be in [0, 1]")
+
+
+def impairments_to_dict(impairments):
+    """Convert VsyncImpairments to the /api/status dictionary"""
+    return {
+        "jitterUs": impairments.jitter_us,
+        "jitterModel": impairments.jitter_model,
+        "driftPpm": impairments.drift_ppm,
+        "driftPeriodS": impairments.drift_period_s,
+        "drop": impairments.drop,
+        "duplicate": impairments.duplicate,
+    }
+
+
+def impair(source, impairments, seed=None):
+    """Wrap source in the wrappers impairments asks for (drift, then jitter, then faults)"""
+    rng = random.Random(seed)
+    if impairments.drift_ppm:
+        source = DriftSource(source, impairments.drift_ppm, impairments.drift_period_s)
+    if impairments.jitter_us:
+        source = JitterSource(source, impairments.jitter_us, impairments.jitter_model, rng)
+    if impairments.drop or impairments.duplicate:
+        source = PulseFaultSource(source, impairments.drop, impairments.duplicate, rng)
+    return source
+
+
+class GridSource:
+    """Generated pulse train: edge k at anchor + k periods of an exact rate (fps)"""
+
+    def __init__(self, rate):
+        self.rate = Fraction(rate)
+        self.reset(0)
+
+    @property
+    def period_us(self):
+        """Nominal edge spacing (µs)"""
+        return 1000000 / self.rate
+
+    def reset(self, start_us):
+        """Start the grid with edge 0 at start_us"""
+        self.anchor_us = start_us
+        self.index = 0
+        self.last_us = None  # last edge handed out
+
+    def set_rate(self, rate, last_edge_us=None):
+        """Change the rate, continuing the grid from last_edge_us
+
+        By default the grid continues from the last edge handed out, so the
+        new period starts there instead of shifting past edges; a consumer
+        that holds that edge unfired can pass the edge before it instead.
+        """
+        self.rate = Fraction(rate)
+        if last_edge_us is None:
+            last_edge_us = self.last_us
+        if last_edge_us is not None:
+            self.anchor_us = last_edge_us
+            self.index = 1
+
+    def next_edge(self):
+        """Get the time (µs) of the next edge and move past it"""
+        rate = self.rate
+        time_us = self.anchor_us + self.index * 1000000 * rate.denominator // rate.numerator
+        self.index += 1
+        self.last_us = time_us
+        return time_us
+
+
+class ExternalSource:
+    """No edges of its own: VSYNC arrives from another process (edge_listener.py)"""
+
+    period_us = 0.0
+
+    def reset(self, start_us):
+        pass
+
+    def next_edge(self):
+        return None
+
+
+class ReplaySource:
+    """Edges replayed from a timestamp file, read lazily line by line
+
+    Each line holds a time in `units` as its first field, separated by
+    commas, semicolons or whitespace. Blank lines, '#' comments and lines
+    that do not start with a number (CSV headers) are skipped. If a line has
+    a second field it is the signal level after a transition, as in logic
+    analyzer exports, and only transitions to `level` (0: falling edges of
+    the active-low VSYNC) are used. The first edge plays at the start time
+    given to reset(); with `loop` the file starts over one last interval
+    after its final edge.
+    """
+
+    def __init__(self, path, units='s', loop=False, level=0):
+        if units not in REPLAY_UNITS:
+            raise ValueError(f"units must be one of {', '.join(REPLAY_UNITS)}")
+        self.path = path
+        self.scale = REPLAY_UNITS[units]
+        self.loop = loop
+        self.level = level
+        self.file = None
+        with open(path):  # fail now, not at the first edge, if it can't be read
+            pass
+        self.reset(0)
+
+    def reset(self, start_us):
+        """Play the file from its first edge, at start_us"""
+        self.close()
+        self.file = open(self.path)
+        self.start_us = start_us
+        self.offset_us = None  # engine time minus file time, known at the first edge
+        self.first_us = None  # first and last file times, for looping
+        self.last_us = None
+        self.period_us = 0.0  # last interval; 0 until two edges were read
+        self.edges = 0
+        self.loops = 0
+        self.exhausted = False
+
+    def close(self):
+        """Close the file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def parse(self, line):
+        """Get the file time (µs) of an edge line, or None to skip the line"""
+        fields = line.replace(',', ' ').replace(';', ' ').split()
+        if not fields or fields[0].startswith('#'):
+            return None
+        try:
+            value = int(fields[0])
+        except ValueError:
+            try:
+                value = float(fields[0])
+            except ValueError:
+                return None  # header
+            if not math.isfinite(value):
+                return None  # nan, inf or out of float range
+        if len(fields) > 1:
+            try:
+                if float(fields[1]) != self.level:
+                    return None
+            except ValueError:
+                return None
+        return round(value * self.scale)
+
+    def next_edge(self):
+        """Get the time (µs) of the next edge, or None at the end of the file"""
+        while not self.exhausted:
+            for line in self.file:
+                file_us = self.parse(line)
+                if file_us is None:
+                    continue
+                if self.offset_us is None:
+                    self.offset_us = self.start_us - file_us
+                    self.first_us = file_us
+                elif file_us > self.last_us:
+                    self.period_us = float(file_us - self.last_us)
+                self.last_us = file_us
+                self.edges += 1
+                return file_us + self.offset_us
+            if not self.loop or self.offset_us is None or self.last_us == self.first_us:
+                self.exhausted = True
+                self.close()
+                break
+            # Start over, one last interval after the final edge
+            self.offset_us += self.last_us - self.first_us + round(self.period_us)
+            self.last_us = self.first_us - round(self.period_us)
+            self.loops += 1
+            self.file.seek(0)
+        return None
+
+
+class JitterSource:
+    """Adds Gaussian (standard deviation) or uniform (half-width) jitter to every edge"""
+
+    def __init__(self, source, jitter_us, model='gaussian', rng=None):
+        self.source = source
+        self.jitter_us = jitter_us
+        self.uniform = model == 'uniform'
+        self.random = rng or random.Random()
+
+    @property
+    def period_us(self):
+        return self.source.period_us
+
+    def reset(self, start_us):
+        self.source.reset(start_us)
+
+    def next_edge(self):
+        time_us = self.source.next_edge()
+        if time_us is None:
+            return None
+        if self.uniform:
+            return time_us + round(self.random.uniform(-self.jitter_us, self.jitter_us))
+        return time_us + round(self.random.gauss(0, self.jitter_us))
+
+
+class DriftSource:
+    """Slow frequency wander of drift_ppm peak, sinusoidal over drift_period_s
+
+    A frequency offset of f(t) ppm moves an edge by minus its integral, so
+    edge times are shifted by a closed form of the time since the first edge
+    and no error accumulates however long the run. A period of 0 is a
+    constant offset.
+    """
+
+    def __init__(self, source, drift_ppm, drift_period_s=600.0):
+        self.source = source
+        self.drift_ppm = drift_ppm
+        self.drift_period_us = drift_period_s * 1000000
+        self.start_us = None
+
+    @property
+    def period_us(self):
+        return self.source.period_us
+
+    def reset(self, start_us):
+        self.source.reset(start_us)
+        self.start_us = None
+
+    def offset_us(self, elapsed_us):
+        """Edge shift (µs) after elapsed_us of nominal time"""
+        scale = self.drift_ppm / 1000000
+        if not self.drift_period_us:
+            return -scale * elapsed_us
+        omega = 2 * math.pi / self.drift_period_us
+        return -scale * (1 - math.cos(omega * elapsed_us)) / omega
+
+    def next_edge(self):
+        time_us = self.source.next_edge()
+        if time_us is None:
+            return None
+        if self.start_us is None:
+            self.start_us = time_us
+        return time_us + round(self.offset_us(time_us - self.start_us))
+
+
+class PulseFaultSource:
+    """Drops edges, or doubles them with a second pulse 0.1-0.4 periods later"""
+
+    def __init__(self, source, drop=0.0, duplicate=0.0, rng=None):
+        self.source = source
+        self.drop = drop
+        self.duplicate = duplicate
+        self.random = rng or random.Random()
+        self.pending_us = None  # duplicate pulse still to hand out
+        self.dropped = 0
+        self.duplicated = 0
+
+    @property
+    def period_us(self):
+        return self.source.period_us
+
+    def reset(self, start_us):
+        self.source.reset(start_us)
+        self.pending_us = None
+
+    def next_edge(self):
+        if self.pending_us is not None:
+            time_us, self.pending_us = self.pending_us, None
+            return time_us
+        time_us = self.source.next_edge()
+        while time_us is not None and self.random.random() < self.drop:
+            self.dropped += 1
+            time_us = self.source.next_edge()
+        if time_us is not None and self.random.random() < self.duplicate:
+            self.duplicated += 1
+            self.pending_us = time_us + max(1, round(self.random.uniform(*DUPLICATE_DELAY) * self.period_us))
+        return time_us